@@ -1,9 +1,11 @@
 from __future__ import annotations
 
 from datetime import datetime
+from functools import partial
 from pathlib import Path
 import shutil
 import sys
+import uuid
 
 import streamlit as st
 
@@ -13,49 +15,47 @@ REPO_ROOT = Path(__file__).resolve().parents[1]
 if str(REPO_ROOT) not in sys.path:
     sys.path.insert(0, str(REPO_ROOT))
 
-from src.config import ScoringConfig
-from src.io_excel import read_prices_excel
-from src.llm_summary import (
-    generate_analysis_ibex,
-    generate_portfolio_suggestion,
-    generate_sector_comparison,
-    join_sections,
-)
-from src.metrics import compute_metrics
-from src.pipeline import quality_flags
+from src.charts import DEFAULT_CACHE_DIR as CHART_CACHE_SUBDIR, report_chart_specs, write_charts
+from src.incremental import STATE_FILENAME, MetricState
+from src.jobs import FAILED, Job, JobManager, JobView
+from src.llm_cache import DEFAULT_CACHE_DIR as LLM_CACHE_DIR, LLMCache, get_llm_cache, set_llm_cache
+from src.llm_summary import write_usage_log
+from src.portfolio import PortfolioAnalytics
+from src.price_cache import DEFAULT_CACHE_DIR
 from src.reporting import (
-    adjust_weights_in_report,
     build_pdf,
     df_to_excel_bytes,
-    plot_portfolio_series,
-    plot_price_series,
+    report_chart_drawings,
 )
-from src.scoring import add_score
-from src.sectors import DEFAULT_SOURCE_URL, load_sectors
+from src.sectors import DEFAULT_SOURCE_URL
+from src.stages import report_params
 
 
-def _show_plot(fig) -> None:
-    """Muestra un grafico en Streamlit y cierra el objeto de Matplotlib."""
-    if fig is None:
+def _show_chart(png: bytes | None) -> None:
+    """Muestra un PNG ya renderizado (sin pasar por pyplot)."""
+    if png is None:
+        st.info("Sin datos suficientes para la grafica.")
         return
-    st.pyplot(fig)
-    try:
-        import matplotlib.pyplot as plt
+    st.image(png, use_container_width=True)
+
 
-        plt.close(fig)
-    except Exception:
-        pass
+@st.cache_resource
+def _job_manager() -> JobManager:
+    """Trabajos y memo de etapas compartidos por todas las sesiones del servidor."""
+    return JobManager()
 
 
 OUTPUTS_DIR = Path("outputs")
 SECTORS_FILENAME = "ibex35_ticker_sector_bmex.xlsx"
 DEFAULT_MODEL = "gemini-flash-latest"
+EXCEL_FILENAME = "ibex35_metrics_scoring_2025.xlsx"
+PDF_FILENAME = "ibex35_summary.pdf"
 
 
 def _init_run_dir() -> Path:
-    """Crea la carpeta de salida con timestamp para la ejecucion actual."""
+    """Crea la carpeta de salida de la ejecucion (timestamp + sufijo unico, que es el ID del trabajo)."""
     run_ts = datetime.now().strftime("%Y%m%d_%H%M%S")
-    run_dir = OUTPUTS_DIR / run_ts
+    run_dir = OUTPUTS_DIR / f"{run_ts}_{uuid.uuid4().hex[:6]}"
     run_dir.mkdir(parents=True, exist_ok=True)
     return run_dir
 
@@ -72,6 +72,195 @@ def _persist_inputs(uploaded_file, run_dir: Path) -> tuple[Path, Path]:
     return prices_path, sectors_path
 
 
+def _write_artifacts(job: Job, run_dir: Path, model: str) -> None:
+    """Ultimo paso del trabajo (en su hilo): persistimos resultados para trazabilidad."""
+    out = job.outputs["table"]
+    prices = job.outputs["prices"]
+    report = job.outputs["report"]
+    with job.profiler.stage("export"):
+        write_charts(job.outputs["charts"], run_dir)
+        write_charts(job.outputs["portfolio_chart"], run_dir)
+        (run_dir / "informe.md").write_text(report.text, encoding="utf-8")
+        out.to_excel(run_dir / EXCEL_FILENAME, index=True)
+        write_usage_log(job.outputs["sections"], model, run_dir)
+
+    # Estado de metricas para actualizaciones incrementales (CLI --incremental).
+    with job.profiler.stage("state"):
+        MetricState.from_prices(prices).save(run_dir / STATE_FILENAME)
+
+    # En el PDF las graficas van como dibujos vectoriales (sin releer los PNG).
+    with job.profiler.stage("pdf"):
+        images = report_chart_drawings(prices, report_chart_specs(out, report.tickers, report.weights))
+        pdf_bytes = build_pdf(report.text, out, images)
+        (run_dir / PDF_FILENAME).write_bytes(pdf_bytes)
+    job.profiler.write(run_dir, job.outputs["sections"])
+    job.add_artifact("pdf_bytes", pdf_bytes)
+    job.add_artifact("run_dir", run_dir)
+
+LLM_STEPS = [
+    ("Paso 9. Analisis top/bottom y panorama general (LLM)", "Razonamiento: LLM con temperatura 0, sin datos externos."),
+    ("Paso 10. Comparativa por sectores (LLM)", "Razonamiento: LLM con temperatura 0, comparativa interna."),
+    ("Paso 11. Sugerencia de cartera diversificada (LLM)", "Razonamiento: LLM con temperatura 0, sin conclusiones causales."),
+]
+
+
+def _pending(view: JobView) -> None:
+    if view.status == FAILED:
+        st.caption("No disponible (el trabajo ha fallado).")
+    else:
+        st.caption("En curso...")
+
+
+def _render_job(view: JobView) -> None:
+    """Pinta cada paso en cuanto el trabajo publica su etapa."""
+    out = view.outputs
+    reused = [name for name, (hit, _) in view.stages.items() if hit]
+    st.caption(
+        f"Trabajo {view.job_id} | Estado: {view.status} | {view.elapsed_s:.1f} s"
+        + (f" | Etapas reutilizadas: {', '.join(reused)}" if reused else "")
+    )
+    if view.status == FAILED:
+        st.error(f"El trabajo ha fallado: {view.error}")
+
+    st.subheader("Paso 1. Carga y validacion (determinista)")
+    # Paso 1: lectura del Excel + validaciones basicas (cacheada por contenido).
+    if "prices" in out:
+        prices = out["prices"]
+        st.write(f"Filas: {len(prices)} | Columnas (tickers): {len(prices.columns)}")
+        st.write("Razonamiento: simbolico/determinista (reglas de carga).")
+        st.dataframe(prices.head(5))
+    else:
+        _pending(view)
+
+    deterministic = [
+        # Paso 2: formula por ticker (rentabilidad, volatilidad, drawdown).
+        ("Paso 2. Metricas (determinista)", "metrics", "Razonamiento: simbolico/determinista (formulas)."),
+        # Paso 3: scoring determinista con reglas y pesos fijos.
+        ("Paso 3. Scoring y hard stops (determinista)", "scored", "Razonamiento: simbolico/determinista (reglas y pesos)."),
+        # Paso 4: banderas simples para trazabilidad (NA, drawdown > 0).
+        ("Paso 4. Flags de calidad (determinista)", "flags", "Razonamiento: simbolico/determinista (control de NA y drawdown)."),
+        # Paso 5: ranking estable para asegurar trazabilidad.
+        ("Paso 5. Ranking (determinista)", "ranked", "Razonamiento: simbolico/determinista (orden estable)."),
+    ]
+    for title, name, reasoning in deterministic:
+        st.subheader(title)
+        if name in out:
+            st.write(reasoning)
+            st.dataframe(out[name].head(10))
+        else:
+            _pending(view)
+
+    st.subheader("Paso 6. Sectorizacion (externo controlado)")
+    # Paso 6: enriquecimiento con sectores desde archivo local.
+    if "table" in out:
+        table = out["table"]
+        st.write("Razonamiento: enriquecimiento externo (solo reporting).")
+        if "sector" in table.columns and table["sector"].nunique(dropna=False) == 1:
+            st.warning(
+                "Todos los sectores son iguales. Revisa el archivo de sectores "
+                "porque no hay clasificacion real."
+            )
+        st.dataframe(table.head(10))
+    else:
+        _pending(view)
+
+    # Pasos 7-8: se renderizan a la vez que se consulta a Gemini.
+    for title, filename in (
+        ("Paso 7. Grafica top 5 (determinista)", "grafica_top5.png"),
+        ("Paso 8. Grafica bottom 5 (determinista)", "grafica_bottom5.png"),
+    ):
+        st.subheader(title)
+        if "charts" in out:
+            _show_chart(out["charts"][filename])
+        else:
+            _pending(view)
+
+    # Pasos 9-11: los tres prompts son independientes; se lanzan en paralelo
+    # y el texto se pinta a trozos segun llega (streaming).
+    sections = out.get("sections")
+    for i, (title, reasoning) in enumerate(LLM_STEPS):
+        st.subheader(title)
+        st.write(reasoning)
+        if sections is not None:
+            section = sections[i]
+            st.code(section.text)
+            if view.stages["sections"][0]:
+                st.caption("Reutilizado de un trabajo anterior (sin llamar a Gemini).")
+            else:
+                tokens = (
+                    "cache" if section.usage.cached
+                    else f"{section.usage.prompt_tokens} entrada / {section.usage.output_tokens} salida"
+                )
+                st.caption(
+                    f"Primer texto: {section.first_chunk_s or section.elapsed_s:.1f} s | "
+                    f"Total: {section.elapsed_s:.1f} s | Tokens: {tokens}"
+                )
+        elif view.partial[i]:
+            st.code(view.partial[i])
+        else:
+            st.code("Generando..." if not view.finished else "Sin respuesta.")
+    if sections is not None:
+        stats = get_llm_cache().stats()
+        st.caption(f"Cache LLM del servidor: {stats['hits']} aciertos / {stats['misses']} fallos (acumulado).")
+
+    st.subheader("Paso 12. Informe final unificado")
+    # Paso 12: consolidar secciones y forzar pesos validos si hace falta.
+    report = out.get("report")
+    if report is not None:
+        st.code(report.text)
+    else:
+        _pending(view)
+
+    st.subheader("Paso 13. Grafica cartera propuesta (determinista)")
+    # Paso 13: grafica con la cartera propuesta.
+    if "portfolio_chart" in out:
+        _show_chart(out["portfolio_chart"].get("grafica_cartera.png"))
+        if report.tickers:
+            try:
+                analytics = PortfolioAnalytics(out["prices"], report.tickers)
+                # Como en la grafica: los tickers sin precios se quitan y los pesos se renormalizan.
+                weights = dict(zip(report.tickers, report.weights))
+                st.write("Riesgo de la cartera (determinista):")
+                st.dataframe(analytics.evaluate(weights))
+                st.dataframe(analytics.risk_contributions(weights))
+            except ValueError as exc:
+                st.warning(f"No se pudo calcular el riesgo de la cartera: {exc}")
+    else:
+        _pending(view)
+
+    if view.finished and "pdf_bytes" in view.artifacts:
+        st.subheader("Descargas")
+        st.download_button(
+            "Descargar Excel",
+            data=df_to_excel_bytes(out["table"]),
+            file_name=EXCEL_FILENAME,
+            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        )
+
+        st.download_button(
+            "Descargar resumen PDF",
+            data=view.artifacts["pdf_bytes"],
+            file_name=PDF_FILENAME,
+            mime="application/pdf",
+        )
+        st.caption(f"Salida almacenada en: {view.artifacts['run_dir']}")
+
+
+@st.fragment(run_every=1.0)
+def _poll_job(job_id: str) -> None:
+    """Refresca solo este bloque cada segundo mientras el trabajo sigue en curso."""
+    job = _job_manager().get(job_id)
+    if job is None or job.view().finished:
+        st.rerun()
+    _render_job(job.view())
+
+
+CHARTS_CACHE_DIR = REPO_ROOT / CHART_CACHE_SUBDIR
+
+# La cache LLM vive en la raiz del repo aunque la app se lance desde otra carpeta.
+if get_llm_cache().cache_dir != REPO_ROOT / LLM_CACHE_DIR:
+    set_llm_cache(LLMCache(REPO_ROOT / LLM_CACHE_DIR))
+
 st.set_page_config(page_title="IBEX 35 Demo", layout="wide")
 
 st.title("Demo: agente con razonamiento hibrido (LLM + reglas)")
@@ -79,6 +268,7 @@ st.markdown(
     "Flujo didactico paso a paso: calculo determinista, reglas y resumen LLM."
 )
 
+manager = _job_manager()
 left, right = st.columns([1, 2], gap="large")
 
 with left:
@@ -98,173 +288,65 @@ with left:
         value=180,
         step=30,
     )
+    use_llm_cache = st.checkbox(
+        "Reutilizar respuestas LLM cacheadas",
+        value=True,
+        help="Misma tabla + mismo modelo = misma respuesta (temperatura 0).",
+    )
     st.caption(
         "Usa la variable de entorno GEMINI_API_KEY. Modelos validos: pega el nombre "
         "sin el prefijo 'models/'."
     )
     run_btn = st.button("Ejecutar pipeline", type="primary", use_container_width=True)
 
-with right:
     if run_btn:
-        # Limpiamos resultados previos para evitar confusiones visuales.
-        st.session_state.pop("result_df", None)
-        st.session_state.pop("summary_text", None)
-
         if uploaded is None:
             st.error("Falta el archivo de precios.")
         else:
+            # La ejecucion pasa a segundo plano: la pagina solo guarda su ID.
             run_dir = _init_run_dir()
             prices_path, sectors_path = _persist_inputs(uploaded, run_dir)
-
-            st.subheader("Paso 1. Carga y validacion (determinista)")
-            # Paso 1: lectura del Excel + validaciones basicas.
-            prices = read_prices_excel(prices_path)
-            st.write(f"Filas: {len(prices)} | Columnas (tickers): {len(prices.columns)}")
-            st.write("Razonamiento: simbolico/determinista (reglas de carga).")
-            st.dataframe(prices.head(5))
-
-            st.subheader("Paso 2. Metricas (determinista)")
-            # Paso 2: formula por ticker (rentabilidad, volatilidad, drawdown).
-            metrics = compute_metrics(prices)
-            st.write("Razonamiento: simbolico/determinista (formulas).")
-            st.dataframe(metrics.head(10))
-
-            st.subheader("Paso 3. Scoring y hard stops (determinista)")
-            # Paso 3: scoring determinista con reglas y pesos fijos.
-            cfg = ScoringConfig()
-            scored = add_score(metrics, cfg)
-            st.write("Razonamiento: simbolico/determinista (reglas y pesos).")
-            st.dataframe(scored.head(10))
-
-            st.subheader("Paso 4. Flags de calidad (determinista)")
-            # Paso 4: banderas simples para trazabilidad (NA, drawdown > 0).
-            flags = quality_flags(prices, metrics)
-            st.write("Razonamiento: simbolico/determinista (control de NA y drawdown).")
-            st.dataframe(flags.head(10))
-
-            st.subheader("Paso 5. Ranking (determinista)")
-            # Paso 5: ranking estable para asegurar trazabilidad.
-            out = scored.join(flags)
-            out = out.sort_values(
-                by=["score", "return_pct", "vol_pct", "max_drawdown_pct"],
-                ascending=[False, False, True, False],
-                kind="mergesort",
-            )
-            out["rank"] = range(1, len(out) + 1)
-            st.write("Razonamiento: simbolico/determinista (orden estable).")
-            st.dataframe(out.head(10))
-
-            st.subheader("Paso 6. Sectorizacion (externo controlado)")
-            # Paso 6: enriquecimiento con sectores desde archivo local.
-            sectors = load_sectors(sectors_path, DEFAULT_SOURCE_URL)
-            out = out.join(sectors, how="left")
-            st.write("Razonamiento: enriquecimiento externo (solo reporting).")
-            if "sector" in out.columns and out["sector"].nunique(dropna=False) == 1:
-                st.warning(
-                    "Todos los sectores son iguales. Revisa el archivo de sectores "
-                    "porque no hay clasificacion real."
-                )
-            st.dataframe(out.head(10))
-
-            st.subheader("Paso 7. Grafica top 5 (determinista)")
-            # Paso 7: grafica determinista con top 5.
-            top5 = out.sort_values("rank").head(5).index.tolist()
-            top5_path = run_dir / "grafica_top5.png"
-            fig = plot_price_series(prices, top5, "Top 5 por scoring (base 100)", top5_path)
-            _show_plot(fig)
-
-            st.subheader("Paso 8. Grafica bottom 5 (determinista)")
-            # Paso 8: grafica determinista con bottom 5.
-            bottom5 = out.sort_values("rank").tail(5).index.tolist()
-            bottom5_path = run_dir / "grafica_bottom5.png"
-            fig = plot_price_series(prices, bottom5, "Bottom 5 por scoring (base 100)", bottom5_path)
-            _show_plot(fig)
-
-            st.subheader("Paso 9. Analisis top/bottom y panorama general (LLM)")
-            # Paso 9: texto generado por LLM (sin datos externos).
-            analysis_text = generate_analysis_ibex(out, model=model, timeout_s=timeout_s)
-            st.write("Razonamiento: LLM con temperatura 0, sin datos externos.")
-            st.code(analysis_text)
-
-            st.subheader("Paso 10. Comparativa por sectores (LLM)")
-            # Paso 10: comparativa interna por sectores.
-            sector_text = generate_sector_comparison(out, model=model, timeout_s=timeout_s)
-            st.write("Razonamiento: LLM con temperatura 0, comparativa interna.")
-            st.code(sector_text)
-
-            st.subheader("Paso 11. Sugerencia de cartera diversificada (LLM)")
-            # Paso 11: propuesta preliminar con reglas estrictas.
-            portfolio_text = generate_portfolio_suggestion(out, model=model, timeout_s=timeout_s)
-            st.write("Razonamiento: LLM con temperatura 0, sin conclusiones causales.")
-            st.code(portfolio_text)
-
-            st.subheader("Paso 12. Informe final unificado")
-            # Paso 12: consolidar secciones y forzar pesos validos si hace falta.
-            report = join_sections(
-                [
-                    ("Analisis IBEX 2025", analysis_text),
-                    ("Comparativa por sectores", sector_text),
-                    ("Sugerencia de cartera", portfolio_text),
-                ]
-            )
-            report, tickers_used, weights_used = adjust_weights_in_report(
-                report,
-                fallback_tickers=out.sort_values("rank").head(8).index.tolist(),
+            params = report_params(
+                prices_path,
+                sectors_path,
+                model=model,
+                source_url=DEFAULT_SOURCE_URL,
+                cache_dir=REPO_ROOT / DEFAULT_CACHE_DIR,
+                chart_cache_dir=CHARTS_CACHE_DIR,
+                timeout_s=int(timeout_s),
+                use_llm_cache=use_llm_cache,
             )
-            st.code(report)
-
-            st.subheader("Paso 13. Grafica cartera propuesta (determinista)")
-            # Paso 13: grafica con la cartera propuesta.
-            portfolio_path = run_dir / "grafica_cartera.png"
-            fig = plot_portfolio_series(
-                prices,
-                tickers_used,
-                weights_used,
-                "Cartera propuesta (base 100)",
-                portfolio_path,
+            job_id = manager.submit(
+                params,
+                refresh=set() if use_llm_cache else {"sections"},
+                finish=partial(_write_artifacts, run_dir=run_dir, model=model),
+                job_id=run_dir.name,
             )
-            _show_plot(fig)
-
-            # Persistimos resultados para trazabilidad.
-            report_path = run_dir / "informe.md"
-            report_path.write_text(report, encoding="utf-8")
-
-            excel_path = run_dir / "ibex35_metrics_scoring_2025.xlsx"
-            out.to_excel(excel_path, index=True)
-
-            images = [
-                ("Top 5 por scoring (base 100)", top5_path),
-                ("Bottom 5 por scoring (base 100)", bottom5_path),
-                ("Cartera propuesta (base 100)", portfolio_path),
-            ]
-            pdf_bytes = build_pdf(report, out, images)
-            pdf_path = run_dir / "ibex35_summary.pdf"
-            pdf_path.write_bytes(pdf_bytes)
-
-            # Guardamos artefactos en session_state para descargas.
-            st.session_state["result_df"] = out
-            st.session_state["summary_text"] = report
-            st.session_state["pdf_bytes"] = pdf_bytes
-            st.session_state["run_dir"] = run_dir
-
-    if "result_df" in st.session_state:
-        st.subheader("Descargas")
-        result_df = st.session_state["result_df"]
-        pdf_bytes = st.session_state.get("pdf_bytes", b"")
-        run_dir = st.session_state.get("run_dir")
-
-        st.download_button(
-            "Descargar Excel",
-            data=df_to_excel_bytes(result_df),
-            file_name="ibex35_metrics_scoring_2025.xlsx",
-            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+            st.session_state["job_id"] = job_id
+            st.query_params["job"] = job_id
+
+    jobs = manager.jobs()
+    if jobs:
+        st.subheader("Trabajos")
+        ids = [job.job_id for job in jobs]
+        current = st.session_state.get("job_id") or st.query_params.get("job")
+        selected = st.selectbox(
+            "Trabajos en este servidor",
+            ids,
+            index=ids.index(current) if current in ids else 0,
         )
+        if selected != current:
+            st.session_state["job_id"] = selected
+            st.query_params["job"] = selected
 
-        st.download_button(
-            "Descargar resumen PDF",
-            data=pdf_bytes,
-            file_name="ibex35_summary.pdf",
-            mime="application/pdf",
-        )
-        if run_dir:
-            st.caption(f"Salida almacenada en: {run_dir}")
+with right:
+    job_id = st.session_state.get("job_id") or st.query_params.get("job")
+    job = manager.get(job_id) if job_id else None
+    if job_id and job is None:
+        st.warning(f"El trabajo {job_id} ya no esta disponible en este servidor.")
+    elif job is not None:
+        view = job.view()
+        if view.finished:
+            _render_job(view)
+        else:
+            _poll_job(job.job_id)
@@ -0,0 +1,96 @@
+"""Presupuesto de tiempo de arranque: CLI y modulos que carga la app.
+
+Cada objetivo se ejecuta en un interprete nuevo (mejor de N). Falla (codigo 1)
+si supera su presupuesto o si carga alguna dependencia pesada que solo deben
+importar las etapas que la usan (reportlab, matplotlib, requests, openpyxl).
+
+Uso:
+    python benchmarks/bench_import.py
+    python benchmarks/bench_import.py --repeat 10 --scale 2 --top 15
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+from pathlib import Path
+import subprocess
+import sys
+import time
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+
+HEAVY = ("reportlab", "matplotlib", "requests", "openpyxl")
+
+# nombre: (codigo, presupuesto en segundos, modulos que no deben cargarse)
+TARGETS: dict[str, tuple[str, float, tuple[str, ...]]] = {
+    "python": ("pass", 0.10, ()),
+    "cli_help": (
+        "import runpy, sys\n"
+        "sys.argv = ['run_pipeline.py', '--help']\n"
+        "try:\n"
+        "    runpy.run_path('run_pipeline.py', run_name='__main__')\n"
+        "except SystemExit:\n"
+        "    pass",
+        0.25,
+        HEAVY + ("pandas", "numpy", "src"),
+    ),
+    "stages": ("import src.stages", 1.0, HEAVY),
+    "jobs": ("import src.jobs", 1.0, HEAVY),
+    "batch": ("import src.batch", 1.0, HEAVY),
+}
+# Al final de cada objetivo: modulos de primer nivel cargados, en JSON.
+_REPORT = "\nimport json as _j, sys as _s\nprint(_j.dumps(sorted({m.split('.')[0] for m in _s.modules})))"
+
+
+def _run(code: str, importtime: bool = False) -> tuple[float, set[str], str]:
+    """(segundos de pared, modulos cargados, stderr) de un interprete nuevo."""
+    cmd = [sys.executable, *(["-X", "importtime"] if importtime else []), "-c", code + _REPORT]
+    t0 = time.perf_counter()
+    proc = subprocess.run(cmd, cwd=REPO_ROOT, capture_output=True, text=True, check=True)
+    elapsed = time.perf_counter() - t0
+    return elapsed, set(json.loads(proc.stdout.strip().splitlines()[-1])), proc.stderr
+
+
+def top_imports(code: str, n: int) -> list[tuple[str, float]]:
+    """Los `n` modulos con mas tiempo acumulado segun `-X importtime`."""
+    _, _, stderr = _run(code, importtime=True)
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        if cumulative.strip().isdigit():
+            rows.append((name.strip(), int(cumulative) / 1e6))
+    return sorted(rows, key=lambda r: r[1], reverse=True)[:n]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--targets", nargs="+", default=list(TARGETS), choices=list(TARGETS))
+    parser.add_argument("--repeat", type=int, default=5, help="Interpretes por objetivo (se guarda el mejor)")
+    parser.add_argument("--scale", type=float, default=1.0, help="Multiplica los presupuestos (maquinas lentas)")
+    parser.add_argument("--top", type=int, default=0, help="Muestra los N imports mas caros de cada objetivo")
+    args = parser.parse_args()
+
+    failed = False
+    print(f"{'objetivo':>10} {'mejor (s)':>10} {'presupuesto':>12}  estado")
+    for name in args.targets:
+        code, budget, forbidden = TARGETS[name]
+        best, loaded = float("inf"), set()
+        for _ in range(args.repeat):
+            elapsed, loaded, _ = _run(code)
+            best = min(best, elapsed)
+        budget *= args.scale
+        problems = [f"carga {m}" for m in forbidden if m in loaded]
+        if best > budget:
+            problems.insert(0, "fuera de presupuesto")
+        failed = failed or bool(problems)
+        print(f"{name:>10} {best:>10.3f} {budget:>12.2f}  {'; '.join(problems) or 'ok'}")
+        for module, seconds in top_imports(code, args.top) if args.top else []:
+            print(f"{'':>12}{seconds:>8.3f}  {module}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+"""Benchmark extremo a extremo del camino LLM contra el servidor local de Gemini.
+
+Mide throughput y latencias de cola (p50/p95/p99) al generar informes completos
+(`generate_summary` o los pasos 9-12 de la app) segun el modo de llamada, la
+cache y el numero de informes en vuelo.
+
+Uso:
+    python benchmarks/bench_llm.py --reports 12 --concurrency 1 4 --latency 0.5 --rate-429 0.05
+"""
+
+from __future__ import annotations
+
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+import os
+from pathlib import Path
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+from benchmarks.mock_gemini import MockConfig, MockGeminiServer
+from src.llm_cache import LLMCache, set_llm_cache
+from src.llm_summary import (
+    SUMMARY_SECTIONS,
+    LLMScheduler,
+    RetryPolicy,
+    generate_section,
+    generate_summary,
+    join_sections,
+    set_llm_scheduler,
+    stream_sections,
+)
+from src.pipeline import run_deterministic_pipeline
+from src.reporting import adjust_weights_in_report
+from src.sectors import load_sectors
+
+MODES = ("summary", "secuencial", "streaming")
+CACHE_MODES = ("sin cache", "fria", "caliente")
+
+
+def _report_table(prices_path: str, sectors_path: str) -> pd.DataFrame:
+    df = run_deterministic_pipeline(prices_path)
+    if Path(sectors_path).exists():
+        df = df.join(load_sectors(sectors_path), how="left")
+    return df
+
+
+def _variant(df: pd.DataFrame, i: int) -> pd.DataFrame:
+    """Copia con un cambio minimo en la tabla: cada informe tiene prompts distintos."""
+    out = df.copy()
+    out["return_pct"] = out["return_pct"] + 0.01 * i
+    return out
+
+
+def _step12(df: pd.DataFrame, sections: list[tuple[str, str]]) -> str:
+    """Paso 12 de la app: informe unificado con pesos validos."""
+    report = join_sections(sections)
+    report, _, _ = adjust_weights_in_report(report, fallback_tickers=df.sort_values("rank").head(8).index.tolist())
+    return report
+
+
+def run_report(df: pd.DataFrame, mode: str, use_cache: bool) -> tuple[float, float | None]:
+    """Genera un informe completo. Devuelve (latencia total, tiempo al primer texto)."""
+    t0 = time.perf_counter()
+    first = None
+    if mode == "summary":
+        summary = generate_summary(df, model="mock", use_cache=use_cache)
+        _step12(df, [("Resumen", summary)])
+    elif mode == "secuencial":
+        results = [generate_section(title, build(df), "mock", use_cache=use_cache) for title, build in SUMMARY_SECTIONS]
+        _step12(df, [(r.title, r.text) for r in results])
+    else:
+        texts = {}
+        for event in stream_sections(df, model="mock", use_cache=use_cache):
+            if first is None and event.chunk:
+                first = time.perf_counter() - t0
+            if event.done:
+                texts[event.index] = (event.title, event.text)
+        _step12(df, [texts[i] for i in sorted(texts)])
+    return time.perf_counter() - t0, first
+
+
+def run_scenario(
+    frames: list[pd.DataFrame],
+    mode: str,
+    cache_mode: str,
+    concurrency: int,
+    server: MockGeminiServer,
+    args: argparse.Namespace,
+) -> dict:
+    with tempfile.TemporaryDirectory() as cache_dir:
+        set_llm_cache(LLMCache(cache_dir, enabled=cache_mode != "sin cache"))
+        set_llm_scheduler(
+            LLMScheduler(rpm=args.rpm, tpm=args.tpm, retry=RetryPolicy(base_delay_s=args.backoff))
+        )
+        use_cache = cache_mode != "sin cache"
+        if cache_mode == "caliente":
+            for df in frames:
+                run_report(df, mode, use_cache)
+
+        before = dict(server.stats)
+        t0 = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            timings = list(pool.map(lambda df: run_report(df, mode, use_cache), frames))
+        wall = time.perf_counter() - t0
+
+    latencies = np.array([t for t, _ in timings])
+    firsts = np.array([f for _, f in timings if f is not None])
+    served = {k: server.stats[k] - before[k] for k in before}
+    return {
+        "modo": mode,
+        "cache": cache_mode,
+        "concurrencia": concurrency,
+        "informes": len(frames),
+        "total_s": wall,
+        "informes_min": 60.0 * len(frames) / wall,
+        "p50_s": np.percentile(latencies, 50),
+        "p95_s": np.percentile(latencies, 95),
+        "p99_s": np.percentile(latencies, 99),
+        "primer_texto_p50_s": np.percentile(firsts, 50) if len(firsts) else np.nan,
+        "peticiones": served["requests"],
+        "429": served["throttled"],
+        "5xx": served["errors"],
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--input", default=str(REPO_ROOT / "data" / "ibex35_components_prices_2025.xlsx"))
+    parser.add_argument("--sectors", default=str(REPO_ROOT / "data" / "ibex35_ticker_sector_bmex.xlsx"))
+    parser.add_argument("--reports", type=int, default=12, help="Informes por escenario")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4], help="Informes en vuelo")
+    parser.add_argument("--modes", nargs="+", default=list(MODES), choices=MODES)
+    parser.add_argument("--cache", nargs="+", default=list(CACHE_MODES), choices=CACHE_MODES)
+    parser.add_argument("--latency", type=float, default=0.5)
+    parser.add_argument("--jitter", type=float, default=0.2)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-429", type=float, default=0.0)
+    parser.add_argument("--retry-after", type=float, default=0.5)
+    parser.add_argument("--rpm", type=float, default=600, help="Limite de peticiones por minuto del planificador")
+    parser.add_argument("--tpm", type=float, default=4_000_000, help="Limite de tokens por minuto del planificador")
+    parser.add_argument("--backoff", type=float, default=0.25, help="Retardo base de los reintentos (s)")
+    parser.add_argument("--out", default=None, help="CSV opcional con los resultados")
+    args = parser.parse_args()
+
+    base = _report_table(args.input, args.sectors)
+    frames = [_variant(base, i) for i in range(args.reports)]
+    config = MockConfig(args.latency, args.jitter, args.error_rate, args.rate_429, args.retry_after)
+
+    rows = []
+    with MockGeminiServer(config) as server:
+        os.environ["GEMINI_BASE_URL"] = server.base_url
+        os.environ.setdefault("GEMINI_API_KEY", "mock")
+        for mode in args.modes:
+            for cache_mode in args.cache:
+                for concurrency in args.concurrency:
+                    rows.append(run_scenario(frames, mode, cache_mode, concurrency, server, args))
+                    print(f"  {mode} / {cache_mode} / {concurrency}: {rows[-1]['total_s']:.2f} s", file=sys.stderr)
+
+    table = pd.DataFrame(rows)
+    with pd.option_context("display.width", 200, "display.max_columns", None):
+        print(table.round(3).to_string(index=False))
+    if args.out:
+        table.to_csv(args.out, index=False)
+
+
+if __name__ == "__main__":
+    main()
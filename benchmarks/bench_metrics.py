@@ -0,0 +1,55 @@
+"""Benchmark de compute_metrics: motor vectorizado frente al bucle por ticker.
+
+Uso:
+    python benchmarks/bench_metrics.py --sizes 35x250 600x2520 3000x2520
+"""
+
+from __future__ import annotations
+
+import argparse
+from pathlib import Path
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+from benchmarks.synthetic import parse_size, synthetic_prices
+from src.metrics import compute_metrics, compute_metrics_loop
+
+
+def _best_of(fn, df: pd.DataFrame, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn(df)
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", nargs="+", default=["35x250", "600x2520", "3000x2520"], help="tickers x dias")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--skip-loop-above", type=int, default=3000, help="No medir el bucle por encima de N tickers")
+    args = parser.parse_args()
+
+    print(f"{'tamano':>12} {'vectorizado (s)':>16} {'bucle (s)':>10} {'speedup':>8} {'max |diff|':>11}")
+    for size in args.sizes:
+        n_tickers, n_days = parse_size(size)
+        df = synthetic_prices(n_tickers, n_days)
+        t_vec = _best_of(compute_metrics, df, args.repeat)
+        if n_tickers > args.skip_loop_above:
+            print(f"{size:>12} {t_vec:>16.4f} {'-':>10} {'-':>8} {'-':>11}")
+            continue
+        t_loop = _best_of(compute_metrics_loop, df, 1)
+        diff = np.nanmax(np.abs(compute_metrics(df).to_numpy() - compute_metrics_loop(df).to_numpy()))
+        print(f"{size:>12} {t_vec:>16.4f} {t_loop:>10.4f} {t_loop / t_vec:>8.1f} {diff:>11.2e}")
+
+
+if __name__ == "__main__":
+    main()
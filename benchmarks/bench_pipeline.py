@@ -0,0 +1,242 @@
+"""Suite de benchmarks del camino determinista sobre universos sinteticos.
+
+Mide cada paso (lectura del Excel, metricas, scoring, flags, ranking, sectores,
+graficas y PDF) desde 35x250 hasta 5000x5000 y guarda los resultados en
+`benchmarks/results/<fecha>_<commit>.json` para comparar entre commits.
+
+La lectura de precios a gran escala se mide con el fichero largo (`io_long`) y
+con la cache de precios ya caliente: el Excel solo se lee hasta
+`--excel-max-cells` (openpyxl tarda ~11 s por millon de celdas) y, si un tamano
+lo supera, se avisa por pantalla.
+
+Uso:
+    python benchmarks/bench_pipeline.py --sizes 35x250 500x1000 2000x2520 5000x5000
+    python benchmarks/bench_pipeline.py --baseline benchmarks/results/20261001_ab12cd3.json
+    python benchmarks/bench_pipeline.py --compare VIEJO.json NUEVO.json
+"""
+
+from __future__ import annotations
+
+import argparse
+from datetime import datetime
+import json
+import os
+from pathlib import Path
+import platform
+import subprocess
+import sys
+import time
+from typing import Any, Callable
+
+import numpy as np
+import pandas as pd
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+from benchmarks.synthetic import DEFAULT_DIR, parse_size, synthetic_prices, write_long_prices, write_universe
+from src.charts import render_chart_bytes, report_chart_specs
+from src.config import ScoringConfig
+from src.io_excel import read_prices_excel
+from src.io_long import read_prices_long
+from src.metrics import compute_metrics
+from src.pipeline import quality_flags, rank_results
+from src.price_cache import load_prices_cached
+from src.reporting import build_pdf, report_chart_drawings
+from src.scoring import add_score
+from src.sectors import load_sectors
+
+RESULTS_DIR = REPO_ROOT / "benchmarks" / "results"
+DEFAULT_SIZES = ["35x250", "500x1000", "2000x2520", "5000x5000"]
+CASES = [
+    "read_prices_excel",
+    "read_prices_long",
+    "load_prices_cached",
+    "load_sectors",
+    "compute_metrics",
+    "add_score",
+    "quality_flags",
+    "rank_results",
+    "render_charts",
+    "build_pdf",
+]
+# Texto fijo con la forma del informe (tres secciones con parrafos y listas).
+SUMMARY = "\n\n".join(
+    f"## Seccion {i}\n\n" + "Texto de ejemplo del informe sintetico. " * 40 + "\n\n- punto uno\n- punto dos"
+    for i in range(1, 4)
+)
+
+
+def _measure(fn: Callable[[], Any], repeat: int, budget_s: float) -> tuple[float, int]:
+    """Mejor tiempo de hasta `repeat` ejecuciones; para antes si se agota `budget_s`."""
+    best, runs, spent = float("inf"), 0, 0.0
+    while runs < repeat and (runs == 0 or spent < budget_s):
+        t0 = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - t0
+        best, runs, spent = min(best, elapsed), runs + 1, spent + elapsed
+    return best, runs
+
+
+def _git(*args: str) -> str:
+    try:
+        return subprocess.run(["git", *args], cwd=REPO_ROOT, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def environment() -> dict[str, Any]:
+    """Commit y entorno con los que se ha medido (para no comparar peras con manzanas)."""
+    commit = _git("rev-parse", "--short", "HEAD") or "sin-git"
+    dirty = bool(_git("status", "--porcelain", "--untracked-files=no"))
+    return {
+        "commit": commit + ("-dirty" if dirty else ""),
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def bench_size(
+    size: str,
+    seed: int,
+    repeat: int,
+    budget_s: float,
+    excel_max_cells: int,
+    data_dir: Path,
+    cases: list[str],
+) -> list[dict[str, Any]]:
+    """Mide los `cases` para un tamano; devuelve una fila por caso."""
+    n_tickers, n_days = parse_size(size)
+    with_excel = n_tickers * n_days <= excel_max_cells
+    prices_path, sectors_path = write_universe(n_tickers, n_days, seed, data_dir, with_prices=with_excel and "read_prices_excel" in cases)
+    long_path = None
+    if {"read_prices_long", "load_prices_cached"} & set(cases):
+        long_path = write_long_prices(n_tickers, n_days, seed, data_dir)
+        # Cache caliente: se mide la carga ya cacheada (hash del fichero + np.load).
+        cache_dir = data_dir / "price_cache"
+        load_prices_cached(long_path, cache_dir, reader=read_prices_long)
+
+    prices = synthetic_prices(n_tickers, n_days, seed)
+    metrics = compute_metrics(prices)
+    cfg = ScoringConfig()
+    scored = add_score(metrics, cfg)
+    flags = quality_flags(prices, metrics)
+    ranked = rank_results(scored, flags)
+    table = ranked.join(load_sectors(str(sectors_path)), how="left")
+    top = ranked.sort_values("rank").index[:5].tolist()
+    specs = report_chart_specs(ranked, top, [1.0 / len(top)] * len(top))
+
+    runs: dict[str, Callable[[], Any]] = {
+        "read_prices_excel": lambda: read_prices_excel(prices_path),
+        "read_prices_long": lambda: read_prices_long(long_path),
+        "load_prices_cached": lambda: load_prices_cached(long_path, cache_dir, reader=read_prices_long),
+        "load_sectors": lambda: load_sectors(str(sectors_path)),
+        "compute_metrics": lambda: compute_metrics(prices),
+        "add_score": lambda: add_score(metrics, cfg),
+        "quality_flags": lambda: quality_flags(prices, metrics),
+        "rank_results": lambda: rank_results(scored, flags),
+        # Sin cache ni pool: mide el dibujo de las tres graficas.
+        "render_charts": lambda: render_chart_bytes(prices, specs, cache_dir=None, workers=1),
+        "build_pdf": lambda: build_pdf(SUMMARY, table, report_chart_drawings(prices, specs)),
+    }
+    rows = []
+    for case in cases:
+        row: dict[str, Any] = {"case": case, "size": size, "tickers": n_tickers, "days": n_days}
+        if case == "read_prices_excel" and prices_path is None:
+            row.update(seconds=None, runs=0, note=f"omitido: mas de {excel_max_cells} celdas")
+            print(
+                f"AVISO: read_prices_excel omitido en {size} ({n_tickers * n_days:,} celdas > "
+                f"--excel-max-cells {excel_max_cells:,}; ~{n_tickers * n_days * 11e-6:.0f} s por lectura). "
+                "La lectura a este tamano queda medida por read_prices_long y load_prices_cached.",
+                file=sys.stderr,
+                flush=True,
+            )
+        else:
+            row["seconds"], row["runs"] = _measure(runs[case], repeat, budget_s)
+        rows.append(row)
+        shown = "-" if row["seconds"] is None else f"{row['seconds']:.4f}"
+        print(f"{size:>10} {case:>18} {shown:>10} s  ({row['runs']} ejec.)", flush=True)
+    return rows
+
+
+def save_results(rows: list[dict[str, Any]], out: str | Path | None = None) -> Path:
+    env = environment()
+    if out is None:
+        stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        out = RESULTS_DIR / f"{stamp}_{env['commit']}.json"
+    out = Path(out)
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps({"env": env, "results": rows}, indent=2), encoding="utf-8")
+    return out
+
+
+def compare(old: dict[str, Any], new: dict[str, Any], threshold: float) -> pd.DataFrame:
+    """Tabla caso x tamano con tiempos viejo/nuevo, ratio y marca de regresion."""
+    def frame(data: dict[str, Any]) -> pd.DataFrame:
+        df = pd.DataFrame(data["results"])
+        return df.dropna(subset=["seconds"]).set_index(["case", "size"])["seconds"]
+
+    out = pd.concat({"old_s": frame(old), "new_s": frame(new)}, axis=1, join="inner")
+    out["ratio"] = out["new_s"] / out["old_s"]
+    out["regression"] = out["ratio"] > threshold
+    return out
+
+
+def _print_comparison(old: dict[str, Any], new: dict[str, Any], threshold: float) -> bool:
+    table = compare(old, new, threshold)
+    print(f"\n{old['env']['commit']} -> {new['env']['commit']} (regresion si ratio > {threshold})")
+    print(table.to_string(float_format=lambda x: f"{x:.4f}"))
+    regressions = table.index[table["regression"]].tolist()
+    if regressions:
+        print("Regresiones:", ", ".join(f"{case} {size}" for case, size in regressions))
+    return bool(regressions)
+
+
+def _load(path: str) -> dict[str, Any]:
+    return json.loads(Path(path).read_text(encoding="utf-8"))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", nargs="+", default=DEFAULT_SIZES, help="tickers x dias")
+    parser.add_argument("--cases", nargs="+", default=CASES, choices=CASES, help="Pasos a medir")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=5, help="Ejecuciones por caso (se guarda la mejor)")
+    parser.add_argument("--budget", type=float, default=5.0, help="No repetir un caso tras N segundos")
+    parser.add_argument(
+        "--excel-max-cells",
+        type=int,
+        default=1_000_000,
+        help="Por encima no se escribe ni lee el Excel de precios (openpyxl: ~11 s por millon de celdas)",
+    )
+    parser.add_argument("--data-dir", default=str(DEFAULT_DIR), help="Carpeta de los Excel sinteticos")
+    parser.add_argument("--out", default=None, help="JSON de resultados (por defecto benchmarks/results/)")
+    parser.add_argument("--baseline", default=None, help="JSON previo con el que comparar esta ejecucion")
+    parser.add_argument("--compare", nargs=2, metavar=("VIEJO", "NUEVO"), help="Solo compara dos JSON")
+    parser.add_argument("--threshold", type=float, default=1.2, help="Ratio nuevo/viejo que cuenta como regresion")
+    args = parser.parse_args()
+
+    if args.compare:
+        sys.exit(1 if _print_comparison(_load(args.compare[0]), _load(args.compare[1]), args.threshold) else 0)
+
+    rows = []
+    for size in args.sizes:
+        rows.extend(
+            bench_size(size, args.seed, args.repeat, args.budget, args.excel_max_cells, Path(args.data_dir), args.cases)
+        )
+    out = save_results(rows, args.out)
+    skipped = [f"{r['case']} {r['size']}" for r in rows if r["seconds"] is None]
+    if skipped:
+        print("AVISO: casos omitidos:", ", ".join(skipped), file=sys.stderr)
+    print("Resultados:", out)
+    if args.baseline:
+        sys.exit(1 if _print_comparison(_load(args.baseline), _load(str(out)), args.threshold) else 0)
+
+
+if __name__ == "__main__":
+    main()
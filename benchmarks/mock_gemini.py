@@ -0,0 +1,209 @@
+"""Servidor local que imita `generateContent` / `streamGenerateContent` de Gemini.
+
+Sirve respuestas enlatadas con latencia, tasa de errores 5xx y de 429
+configurables, para medir `llm_summary` sin llamar a Google:
+
+    python benchmarks/mock_gemini.py --port 8765 --latency 0.8 --rate-429 0.05
+    $env:GEMINI_BASE_URL="http://127.0.0.1:8765/v1beta"
+    $env:GEMINI_API_KEY="mock"
+"""
+
+from __future__ import annotations
+
+import argparse
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import random
+import re
+import threading
+import time
+from urllib.parse import urlparse
+
+_PATH = re.compile(r"^/v1beta/models/(?P<model>[^/:]+):(?P<method>generateContent|streamGenerateContent)$")
+_TICKER_ROW = re.compile(r"^([A-Z0-9][A-Z0-9.\-]{0,11})\|", re.MULTILINE)
+
+
+@dataclass
+class MockConfig:
+    latency_s: float = 0.5
+    jitter_s: float = 0.2
+    error_rate: float = 0.0
+    rate_429: float = 0.0
+    retry_after_s: float = 1.0
+    stream_chunks: int = 8
+    seed: int = 0
+
+
+def canned_text(prompt: str) -> str:
+    """Respuesta determinista con la estructura que espera el informe (incluida la tabla de pesos)."""
+    tickers = list(dict.fromkeys(_TICKER_ROW.findall(prompt)))[:5] or ["AAA", "BBB", "CCC", "DDD", "EEE"]
+    lines = [
+        "### Hechos",
+        f"La tabla incluye {prompt.count(chr(10))} lineas de contexto.",
+        "### Interpretacion",
+        "Respuesta simulada por el servidor local de pruebas.",
+        "",
+        "| Ticker | Peso (%) |",
+        "| --- | --- |",
+        *(f"| {t} | 20% |" for t in tickers),
+        "| TOTAL | 100% |",
+        "",
+        "Limitacion: texto sintetico, sin valor analitico.",
+    ]
+    return "\n".join(lines)
+
+
+def _usage(prompt: str, text: str) -> dict:
+    prompt_tokens, output_tokens = len(prompt) // 4, len(text) // 4
+    return {
+        "promptTokenCount": prompt_tokens,
+        "candidatesTokenCount": output_tokens,
+        "totalTokenCount": prompt_tokens + output_tokens,
+    }
+
+
+class MockGeminiServer:
+    """Servidor HTTP en un hilo; usar como context manager y leer `base_url`."""
+
+    def __init__(self, config: MockConfig | None = None, host: str = "127.0.0.1", port: int = 0) -> None:
+        self.config = config or MockConfig()
+        self._rng = random.Random(self.config.seed)
+        self._lock = threading.Lock()
+        self.stats = {"requests": 0, "ok": 0, "errors": 0, "throttled": 0}
+        self._httpd = ThreadingHTTPServer((host, port), self._handler())
+        self._httpd.daemon_threads = True
+        self._thread: threading.Thread | None = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/v1beta"
+
+    def _draw(self) -> tuple[str, float]:
+        """Decide el resultado de una peticion (ok / 429 / 5xx) y su latencia."""
+        cfg = self.config
+        with self._lock:
+            self.stats["requests"] += 1
+            u = self._rng.random()
+            latency = max(0.0, cfg.latency_s + self._rng.uniform(-cfg.jitter_s, cfg.jitter_s))
+            if u < cfg.rate_429:
+                outcome = "throttled"
+            elif u < cfg.rate_429 + cfg.error_rate:
+                outcome = "errors"
+            else:
+                outcome = "ok"
+            self.stats[outcome] += 1
+        return outcome, latency
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args) -> None:  # silencio en consola
+                pass
+
+            def _send(self, status: int, body: bytes, headers: dict | None = None) -> None:
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                for key, value in (headers or {}).items():
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_POST(self) -> None:
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                match = _PATH.match(urlparse(self.path).path)
+                if match is None:
+                    self._send(404, b'{"error": {"code": 404, "message": "not found"}}')
+                    return
+                outcome, latency = server._draw()
+                if outcome == "throttled":
+                    self._send(
+                        429,
+                        b'{"error": {"code": 429, "status": "RESOURCE_EXHAUSTED"}}',
+                        {"Retry-After": f"{server.config.retry_after_s:g}"},
+                    )
+                    return
+                if outcome == "errors":
+                    time.sleep(latency / 2)
+                    self._send(503, b'{"error": {"code": 503, "status": "UNAVAILABLE"}}')
+                    return
+
+                payload = json.loads(body or b"{}")
+                prompt = "".join(
+                    p.get("text", "") for c in payload.get("contents", []) for p in c.get("parts", [])
+                )
+                text = canned_text(prompt)
+                if match["method"] == "generateContent":
+                    time.sleep(latency)
+                    data = {"candidates": [{"content": {"parts": [{"text": text}]}}], "usageMetadata": _usage(prompt, text)}
+                    self._send(200, json.dumps(data).encode("utf-8"))
+                    return
+                self._stream(text, prompt, latency)
+
+            def _stream(self, text: str, prompt: str, latency: float) -> None:
+                """SSE con transferencia chunked: la latencia se reparte entre los trozos."""
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                n = max(1, server.config.stream_chunks)
+                step = -(-len(text) // n)
+                pieces = [text[i : i + step] for i in range(0, len(text), step)]
+                for i, piece in enumerate(pieces):
+                    time.sleep(latency / len(pieces))
+                    event = {"candidates": [{"content": {"parts": [{"text": piece}]}}]}
+                    if i == len(pieces) - 1:
+                        event["usageMetadata"] = _usage(prompt, text)
+                    data = f"data: {json.dumps(event)}\r\n\r\n".encode("utf-8")
+                    self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+                    self.wfile.flush()
+                self.wfile.write(b"0\r\n\r\n")
+
+        return Handler
+
+    def start(self) -> "MockGeminiServer":
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self) -> "MockGeminiServer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.5, help="Latencia media por respuesta (s)")
+    parser.add_argument("--jitter", type=float, default=0.2, help="Variacion uniforme de la latencia (s)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraccion de respuestas 503")
+    parser.add_argument("--rate-429", type=float, default=0.0, help="Fraccion de respuestas 429")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="Cabecera Retry-After de los 429 (s)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    config = MockConfig(args.latency, args.jitter, args.error_rate, args.rate_429, args.retry_after, seed=args.seed)
+    server = MockGeminiServer(config, args.host, args.port)
+    print("Mock Gemini en", server.base_url)
+    try:
+        server._httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server._httpd.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+"""Universos sinteticos reproducibles para benchmarks: precios y sectores.
+
+Los precios siguen un modelo de un factor (mercado + ruido propio, paseo
+log-normal) con huecos NaN sueltos, rachas de dias sin cotizar y valores que
+empiezan a cotizar a mitad del periodo (NaN iniciales). Misma semilla, mismos datos.
+
+Uso:
+    python benchmarks/synthetic.py 500x1000 --seed 1 --out data/synthetic
+"""
+
+from __future__ import annotations
+
+import argparse
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+SYNTHETIC_VERSION = 1
+DEFAULT_DIR = Path(".cache") / "synthetic"
+SECTORS = [
+    "Banca",
+    "Utilities",
+    "Industriales",
+    "Consumo",
+    "Energia",
+    "Telecomunicaciones",
+    "Inmobiliario",
+    "Tecnologia",
+    "Salud",
+    "Materiales",
+]
+
+
+def parse_size(size: str) -> tuple[int, int]:
+    """'500x1000' -> (500 tickers, 1000 dias)."""
+    n_tickers, n_days = (int(x) for x in size.lower().split("x"))
+    return n_tickers, n_days
+
+
+def synthetic_tickers(n_tickers: int) -> list[str]:
+    return [f"S{i:04d}.MC" for i in range(n_tickers)]
+
+
+def synthetic_prices(
+    n_tickers: int,
+    n_days: int,
+    seed: int = 0,
+    nan_rate: float = 0.01,
+    gap_rate: float = 0.05,
+    late_rate: float = 0.1,
+) -> pd.DataFrame:
+    """Matriz de precios (fechas habiles x tickers) con huecos y altas tardias.
+
+    - `nan_rate`: fraccion de celdas NaN sueltas.
+    - `gap_rate`: fraccion de tickers con una racha de 2 a 20 dias sin precio.
+    - `late_rate`: fraccion de tickers que empiezan a cotizar a mitad del periodo.
+    """
+    rng = np.random.default_rng(seed)
+    market = rng.normal(0.0003, 0.010, size=(n_days, 1))
+    beta = rng.uniform(0.5, 1.5, size=n_tickers)
+    drift = rng.normal(0.0001, 0.0003, size=n_tickers)
+    idio = rng.uniform(0.008, 0.030, size=n_tickers)
+    rets = market * beta + drift + rng.standard_normal((n_days, n_tickers)) * idio
+    start = np.exp(rng.normal(np.log(30.0), 1.0, size=n_tickers))
+    prices = start * np.exp(np.cumsum(rets, axis=0))
+
+    prices[rng.random(prices.shape) < nan_rate] = np.nan
+    for j in np.flatnonzero(rng.random(n_tickers) < gap_rate):
+        length = int(rng.integers(2, 21))
+        first = int(rng.integers(0, max(1, n_days - length)))
+        prices[first : first + length, j] = np.nan
+    # Altas tardias: nunca el primer ticker, para que siempre haya algun precio el primer dia.
+    late = np.flatnonzero(rng.random(n_tickers) < late_rate)
+    for j in late[late > 0]:
+        prices[: int(rng.integers(1, max(2, int(n_days * 0.8)))), j] = np.nan
+
+    index = pd.bdate_range(end="2025-12-31", periods=n_days, name="Date")
+    return pd.DataFrame(prices, index=index, columns=synthetic_tickers(n_tickers))
+
+
+def synthetic_sectors(tickers: list[str], seed: int = 0) -> pd.DataFrame:
+    """Tabla Ticker / Sector_BMEx como el Excel de sectores del repo."""
+    rng = np.random.default_rng(seed + 1)
+    return pd.DataFrame({"Ticker": tickers, "Sector_BMEx": rng.choice(SECTORS, size=len(tickers))})
+
+
+def write_universe(
+    n_tickers: int,
+    n_days: int,
+    seed: int = 0,
+    out_dir: str | Path = DEFAULT_DIR,
+    overwrite: bool = False,
+    with_prices: bool = True,
+) -> tuple[Path | None, Path]:
+    """Escribe (o reutiliza) el Excel de precios y el de sectores; devuelve sus rutas.
+
+    Escribir Excel grandes con openpyxl es lento, asi que los ficheros se
+    reutilizan si ya existen con el mismo tamano, semilla y version. Con
+    `with_prices=False` solo se escribe el de sectores (ruta de precios None).
+    """
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    stem = f"synthetic_v{SYNTHETIC_VERSION}_{n_tickers}x{n_days}_s{seed}"
+    prices_path = out_dir / f"{stem}_prices.xlsx"
+    sectors_path = out_dir / f"{stem}_sectors.xlsx"
+    if not with_prices:
+        prices_path = None
+    elif overwrite or not prices_path.exists():
+        synthetic_prices(n_tickers, n_days, seed).to_excel(prices_path, index=True)
+    if overwrite or not sectors_path.exists():
+        synthetic_sectors(synthetic_tickers(n_tickers), seed).to_excel(sectors_path, index=False)
+    return prices_path, sectors_path
+
+
+def write_long_prices(
+    n_tickers: int,
+    n_days: int,
+    seed: int = 0,
+    out_dir: str | Path = DEFAULT_DIR,
+    overwrite: bool = False,
+) -> Path:
+    """Escribe (o reutiliza) los mismos precios en formato largo (Date, Ticker, Close).
+
+    Es el formato de los feeds de proveedor que lee `io_long`. Se guarda en
+    Parquet si hay pyarrow y si no en CSV comprimido; a diferencia del Excel,
+    escribirlo a 5000x5000 cuesta segundos. Las celdas NaN no se escriben.
+    """
+    try:
+        import pyarrow  # noqa: F401
+        suffix = "parquet"
+    except ImportError:  # pragma: no cover - dependencia opcional
+        suffix = "csv.gz"
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    path = out_dir / f"synthetic_v{SYNTHETIC_VERSION}_{n_tickers}x{n_days}_s{seed}_long.{suffix}"
+    if path.exists() and not overwrite:
+        return path
+    prices = synthetic_prices(n_tickers, n_days, seed)
+    values = prices.to_numpy()
+    valid = ~np.isnan(values)
+    rows, cols = np.nonzero(valid)
+    long = pd.DataFrame(
+        {
+            "Date": prices.index.to_numpy()[rows],
+            # Categorica: 25M tickers como texto no caben comodos en memoria.
+            "Ticker": pd.Categorical.from_codes(cols, categories=list(prices.columns)),
+            "Close": values[valid],
+        }
+    )
+    if suffix == "parquet":
+        long.to_parquet(path, index=False)
+    else:
+        long.to_csv(path, index=False)
+    return path
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Genera un universo sintetico de precios y sectores")
+    parser.add_argument("sizes", nargs="+", help="tickers x dias (p. ej. 35x250 500x1000)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default=str(DEFAULT_DIR), help="Carpeta de salida")
+    parser.add_argument("--overwrite", action="store_true", help="Regenera aunque ya existan")
+    args = parser.parse_args()
+
+    for size in args.sizes:
+        prices_path, sectors_path = write_universe(*parse_size(size), args.seed, args.out, args.overwrite)
+        print(prices_path)
+        print(sectors_path)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,33 +1,237 @@
 import argparse
+from datetime import datetime
 from pathlib import Path
 
-from src.pipeline import run_deterministic_pipeline
-from src.io_excel import export_results
-from src.sectors import load_sectors, DEFAULT_SOURCE_URL
-from src.llm_summary import generate_summary
+# Los modulos de src (pandas, numpy...) se importan dentro de cada subcomando:
+# --help y los errores de argumentos no pagan su carga.
+
+def _cache_dir(args):
+    """Carpeta de la cache de precios, o None si se pide --no-cache."""
+    from src.price_cache import DEFAULT_CACHE_DIR
+
+    return None if args.no_cache else (args.cache_dir or DEFAULT_CACHE_DIR)
+
+def _source_url(args):
+    """Fuente de sectores indicada o la oficial por defecto."""
+    from src.sectors import DEFAULT_SOURCE_URL
+
+    return args.sector_source_url or DEFAULT_SOURCE_URL
+
+def run_report(args):
+    """Pipeline determinista + sectores + resumen LLM (modo por defecto).
+
+    Recorre el mismo grafo de etapas que la app (`src/stages.py`).
+    """
+    from src.incremental import STATE_FILENAME, MetricState, find_latest_state, resume_state
+    from src.io_excel import export_results
+    from src.llm_cache import LLMCache, get_llm_cache, set_llm_cache
+    from src.llm_summary import join_sections, write_usage_log
+    from src.profiling import DEFAULT_SAMPLE_INTERVAL_S, RunProfiler
+    from src.stages import DEFAULT_MEMO_DIR, REPORT_STAGES, DiskStageMemo, StageMemo, report_params
+
+    run_dir = Path(args.outputs_dir) / datetime.now().strftime("%Y%m%d_%H%M%S")
+    if args.llm_cache_dir:
+        set_llm_cache(LLMCache(args.llm_cache_dir))
+    params = report_params(
+        args.input,
+        args.sectors,
+        model=args.model,
+        source_url=_source_url(args),
+        cache_dir=_cache_dir(args),
+        use_llm_cache=not args.no_llm_cache,
+    )
+    # El memo de etapas vive en disco: repetir la ejecucion reutiliza lo ya calculado.
+    memo = StageMemo() if args.no_stage_cache else DiskStageMemo(args.stage_cache_dir or DEFAULT_MEMO_DIR)
+    # --no-cache obliga a parsear los precios aunque esten en el memo.
+    parse = {"prices"} if args.no_cache else set()
+    # Con --profile se muestrean las pilas y se mide la memoria Python por etapa.
+    profiler = RunProfiler(
+        trace_memory=args.profile,
+        sample_interval_s=DEFAULT_SAMPLE_INTERVAL_S if args.profile else None,
+    )
+    prices_run = REPORT_STAGES.run(params, ["prices"], memo, refresh=parse, around=profiler.stage)
+    prices = prices_run["prices"]
+
+    # Sin --incremental se calcula todo el historico, pero igualmente se guarda
+    # el estado de metricas junto a la ejecucion para la siguiente corrida.
+    given = {}
+    state = None
+    if args.incremental:
+        state_path = Path(args.state) if args.state else find_latest_state(args.outputs_dir, args.input)
+        print("Estado previo:", state_path or "ninguno (calculo completo)")
+        if state_path:
+            try:
+                state = MetricState.load(state_path)
+            except (OSError, ValueError, KeyError) as exc:
+                print("Estado previo descartado: no se puede leer", f"({exc}). Calculo completo.")
+    with profiler.stage("state"):
+        previous = state
+        state, reason = resume_state(state, prices, args.input)
+        if reason is None:
+            given["metrics"] = state.to_metrics()
+        elif previous is not None:
+            print(f"Estado previo descartado: {reason}. Calculo completo.")
+
+    refresh = {"sections"} if args.no_llm_cache else set()
+    run = REPORT_STAGES.run(params, ["table", "sections"], memo, given=given, refresh=refresh, around=profiler.stage)
+    df = run["table"]
+    with profiler.stage("export"):
+        export_results(df, args.output)
+
+        state_out = run_dir / STATE_FILENAME
+        state.save(state_out)
+
+        sections = run["sections"]
+        summary = join_sections([(s.title, s.text) for s in sections])
+        Path(args.summary_out).write_text(summary, encoding="utf-8")
+        (run_dir / "informe.md").write_text(summary, encoding="utf-8")
+        usage_out = write_usage_log(sections, args.model, run_dir)
+    profile_out = profiler.write(run_dir, sections)
+
+    print("OK. Filas:", len(df))
+    print("Salida:", args.output)
+    print("Resumen:", args.summary_out)
+    print("Estado:", state_out)
+    # Los precios se calculan en la primera pasada del grafo; el resto, en la segunda.
+    timings = {name: r.timings[name] for r in (prices_run, run) for name in r.computed}
+    print("Etapas:", ", ".join(f"{name} {seconds:.2f} s" for name, seconds in timings.items()))
+    if not args.no_llm_cache:
+        stats = get_llm_cache().stats()
+        print("Cache LLM (aciertos / fallos):", stats["hits"], "/", stats["misses"])
+    for section in sections:
+        print(
+            f"LLM {section.title}: {section.elapsed_s:.1f} s, "
+            f"tokens {section.usage.prompt_tokens} entrada / {section.usage.output_tokens} salida"
+        )
+    print("Uso LLM:", usage_out)
+    print("Perfil:", profile_out)
+    print(df.head(10))
+
+def run_sweep(args):
+    """Estabilidad del ranking ante variaciones de pesos y hard stops."""
+    from src.io_excel import export_sheets
+    from src.metrics import compute_metrics
+    from src.pipeline import load_prices
+    from src.sensitivity import HARDSTOP_FIELDS, WEIGHT_FIELDS, configs_frame, grid_configs, random_configs, rank_stability
+
+    metrics = compute_metrics(load_prices(args.input, _cache_dir(args)))
+    grid = {name: getattr(args, name) for name in WEIGHT_FIELDS + HARDSTOP_FIELDS if getattr(args, name)}
+    if grid:
+        configs = grid_configs(**grid)
+    else:
+        configs = random_configs(args.samples, seed=args.seed)
+    if not configs:
+        raise SystemExit("La rejilla no contiene ninguna combinacion de pesos que sume 1.")
+
+    table, tau = rank_stability(metrics, configs, top_k=args.top_k)
+    export_sheets(
+        {"estabilidad": table, "configs": configs_frame(configs).join(tau)},
+        args.output,
+    )
+
+    print("OK. Configuraciones:", len(configs))
+    print("Kendall tau (media / min):", round(float(tau.mean()), 4), "/", round(float(tau.min()), 4))
+    print("Salida:", args.output)
+    print(table.head(10))
+
+def run_batch_command(args):
+    """Varios ficheros de precios en paralelo (glob o manifiesto)."""
+    from src.batch import expand_inputs, read_manifest, run_batch
+    from src.llm_cache import LLMCache, set_llm_cache
+    from src.llm_summary import get_llm_scheduler
+
+    jobs = read_manifest(args.manifest, args.sectors) if args.manifest else expand_inputs(args.inputs, args.sectors)
+    if not jobs:
+        raise SystemExit("No hay ficheros de entrada: indica patrones glob o --manifest.")
+    if args.llm_cache_dir:
+        set_llm_cache(LLMCache(args.llm_cache_dir))
+    if args.llm_concurrency:
+        # El pool del planificador se crea al primer envio: basta con ajustar el tope antes.
+        get_llm_scheduler().max_concurrency = max(1, args.llm_concurrency)
+
+    summary, batch_dir = run_batch(
+        jobs,
+        outputs_dir=args.outputs_dir,
+        workers=args.workers,
+        model=args.model,
+        llm=not args.no_llm,
+        use_cache=not args.no_llm_cache,
+        cache_dir=_cache_dir(args),
+        source_url=_source_url(args),
+        pdf=not args.no_pdf,
+    )
+    failed = int((summary["status"] != "ok").sum()) if not summary.empty else 0
+    print(f"OK. Trabajos: {len(summary)} | Fallidos: {failed} | Tiempo total: {summary.attrs['wall_s']:.1f} s")
+    print("Salida:", batch_dir)
+    cols = [c for c in ("status", "rows", "pipeline_s", "export_s", "llm_s", "pdf_s", "error") if c in summary.columns]
+    print(summary[cols].round(2).to_string())
 
 def main():
     parser = argparse.ArgumentParser()
-    parser.add_argument("--input", required=True, help="Ruta al Excel de precios (IBEX 35 2025)")
+    parser.add_argument("--input", help="Ruta a los precios: Excel ancho o CSV/Parquet largo (fecha, ticker, precio)")
     parser.add_argument("--output", default="outputs/ibex35_metrics_scoring_2025.xlsx", help="Ruta del Excel de salida")
     parser.add_argument("--sectors", default="data/ibex35_ticker_sector_bmex.xlsx", help="Ruta al Excel de sectores")
-    parser.add_argument("--sector-source-url", default=DEFAULT_SOURCE_URL, help="Fuente oficial de sectores")
+    parser.add_argument("--sector-source-url", default=None, help="Fuente oficial de sectores (por defecto la web de BME)")
     parser.add_argument("--summary-out", default="outputs/ibex35_summary.txt", help="Ruta del resumen ejecutivo")
     parser.add_argument("--model", default="gemini-flash-latest", help="Modelo Gemini")
-    args = parser.parse_args()
+    parser.add_argument("--outputs-dir", default="outputs", help="Carpeta base de ejecuciones (outputs/<timestamp>/)")
+    parser.add_argument("--incremental", action="store_true", help="Reutiliza el ultimo estado de metricas y procesa solo filas nuevas")
+    parser.add_argument("--state", default=None, help="Estado previo concreto (por defecto, el mas reciente en --outputs-dir)")
+    parser.add_argument("--cache-dir", default=None, help="Cache de precios ya parseados (por defecto .cache/prices)")
+    parser.add_argument("--no-cache", action="store_true", help="Parsea siempre el Excel sin usar la cache")
+    parser.add_argument("--llm-cache-dir", default=None, help="Carpeta de la cache de respuestas LLM (por defecto .cache/llm)")
+    parser.add_argument("--no-llm-cache", action="store_true", help="Llama siempre a Gemini sin leer ni escribir la cache")
+    parser.add_argument("--stage-cache-dir", default=None, help="Memo en disco de las etapas del informe (por defecto .cache/stages)")
+    parser.add_argument("--no-stage-cache", action="store_true", help="Memo de etapas solo en memoria (no reutiliza ejecuciones previas)")
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Muestrea las pilas de las etapas deterministas (profile_stacks.txt) y mide el pico de memoria Python "
+        "por etapa (python_peak_bytes en profile.json; sin --profile queda vacio)",
+    )
+    subparsers = parser.add_subparsers(dest="command")
 
-    df = run_deterministic_pipeline(args.input)
-    sectors = load_sectors(args.sectors, args.sector_source_url)
-    df = df.join(sectors, how="left")
-    export_results(df, args.output)
+    sweep = subparsers.add_parser("sweep", help="Sensibilidad del ranking a ScoringConfig")
+    sweep.add_argument("--input", required=True, help="Ruta a los precios (Excel, CSV o Parquet)")
+    sweep.add_argument("--output", default="outputs/ibex35_sensitivity.xlsx", help="Ruta del Excel de salida")
+    sweep.add_argument("--samples", type=int, default=10000, help="Configuraciones aleatorias (si no se da rejilla)")
+    sweep.add_argument("--seed", type=int, default=0, help="Semilla del muestreo")
+    sweep.add_argument("--top-k", type=int, default=5, help="Tamano del top para la frecuencia de aparicion")
+    sweep.add_argument("--w-return", type=float, nargs="+", help="Rejilla de pesos de rentabilidad")
+    sweep.add_argument("--w-vol", type=float, nargs="+", help="Rejilla de pesos de volatilidad")
+    sweep.add_argument("--w-dd", type=float, nargs="+", help="Rejilla de pesos de drawdown")
+    sweep.add_argument("--hardstop-return-lt", type=float, nargs="+", help="Rejilla del hard stop de rentabilidad (%%, menor que)")
+    sweep.add_argument("--hardstop-dd-gt", type=float, nargs="+", help="Rejilla del hard stop de drawdown (%%, mayor que)")
+    sweep.add_argument("--hardstop-vol-gt", type=float, nargs="+", help="Rejilla del hard stop de volatilidad (%%, mayor que)")
+    sweep.add_argument("--cache-dir", default=None, help="Cache de precios ya parseados (por defecto .cache/prices)")
+    sweep.add_argument("--no-cache", action="store_true", help="Parsea siempre el Excel sin usar la cache")
 
-    summary = generate_summary(df, model=args.model)
-    Path(args.summary_out).write_text(summary, encoding="utf-8")
+    batch = subparsers.add_parser("batch", help="Procesa varios ficheros de precios en paralelo")
+    batch.add_argument("inputs", nargs="*", help="Ficheros o patrones glob (p. ej. data/*_prices_*.xlsx)")
+    batch.add_argument("--manifest", default=None, help="CSV/JSON con columnas input[, name, sectors]")
+    batch.add_argument("--sectors", default="data/ibex35_ticker_sector_bmex.xlsx", help="Sectores por defecto")
+    batch.add_argument("--sector-source-url", default=None, help="Fuente oficial de sectores (por defecto la web de BME)")
+    batch.add_argument("--outputs-dir", default="outputs", help="Carpeta base (outputs/batch_<timestamp>/<trabajo>/)")
+    batch.add_argument("--workers", type=int, default=None, help="Procesos del pool (por defecto, nucleos)")
+    batch.add_argument("--model", default="gemini-flash-latest", help="Modelo Gemini")
+    batch.add_argument("--no-llm", action="store_true", help="Solo la parte determinista")
+    batch.add_argument("--no-pdf", action="store_true", help="No genera informe.pdf por trabajo")
+    batch.add_argument("--llm-concurrency", type=int, default=None, help="Llamadas LLM simultaneas en todo el batch")
+    batch.add_argument("--llm-cache-dir", default=None, help="Carpeta de la cache de respuestas LLM")
+    batch.add_argument("--no-llm-cache", action="store_true", help="Llama siempre a Gemini sin usar la cache")
+    batch.add_argument("--cache-dir", default=None, help="Cache de precios ya parseados (por defecto .cache/prices)")
+    batch.add_argument("--no-cache", action="store_true", help="Parsea siempre los ficheros sin usar la cache")
+    args = parser.parse_args()
 
-    print("OK. Filas:", len(df))
-    print("Salida:", args.output)
-    print("Resumen:", args.summary_out)
-    print(df.head(10))
+    if args.command == "batch":
+        run_batch_command(args)
+        return
+    if args.command == "sweep":
+        run_sweep(args)
+        return
+    if not args.input:
+        parser.error("the following arguments are required: --input")
+    run_report(args)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,174 @@
+"""Backtest vectorizado de la regla de ranking por score (top-k equiponderado)."""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+
+from .config import ScoringConfig
+from .metrics import (
+    _WindowKernel,
+    _ffill_matrix,
+    annualized_vol_pct,
+    max_drawdown_pct,
+)
+from .scoring import _score_matrix, rank_order_matrix
+
+
+@dataclass
+class BacktestResult:
+    """Resultados del backtest (todas las series en base 100)."""
+
+    equity: pd.Series
+    benchmark: pd.Series
+    holdings: pd.DataFrame
+    periods: pd.DataFrame
+    summary: dict = field(default_factory=dict)
+
+
+def rebalance_positions(index: pd.DatetimeIndex, freq: str = "M", min_row: int = 0) -> np.ndarray:
+    """Ultima fila de cada periodo (mes por defecto), desde `min_row` y sin la ultima fila."""
+    periods = index.to_period(freq)
+    is_end = np.r_[periods[1:] != periods[:-1], False]
+    rows = np.flatnonzero(is_end)
+    return rows[rows >= min_row]
+
+
+def _relative_value(
+    filled: np.ndarray,
+    base_rows: np.ndarray,
+    rows: np.ndarray,
+    cols: np.ndarray,
+    weights: np.ndarray,
+) -> np.ndarray:
+    """Valor de una cartera comprar-y-mantener relativo a su fila base.
+
+    Para cada fila t (con su fila base y sus tickers `cols`/`weights`)
+    devuelve sum_i w_i * P[t, i] / P[base, i].
+    """
+    n_cols = filled.shape[1]
+    flat = filled.ravel()
+    now = flat.take(rows[:, None] * n_cols + cols)
+    base = flat.take(base_rows[:, None] * n_cols + cols)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        growth = now / base
+    return np.where(weights > 0, weights * growth, 0.0).sum(axis=1)
+
+
+def run_backtest(
+    prices_df: pd.DataFrame,
+    cfg: ScoringConfig | None = None,
+    top_k: int = 5,
+    lookback: int = 252,
+    freq: str = "M",
+) -> BacktestResult:
+    """Backtest determinista: puntua con datos previos, compra el top-k y mantiene.
+
+    En cada cierre de periodo (`freq`, mensual por defecto) se calculan las
+    metricas de las ultimas `lookback` filas, se aplica el scoring y el ranking
+    estable del pipeline y se compran a partes iguales los `top_k` primeros
+    hasta el siguiente rebalanceo. El benchmark es el universo equiponderado
+    con los mismos rebalanceos. Todas las fechas se resuelven con operaciones
+    sobre arrays (sin bucles por fecha).
+    """
+    cfg = cfg or ScoringConfig()
+    if not prices_df.index.is_monotonic_increasing:
+        raise ValueError("Las fechas no estan ordenadas ascendentemente.")
+
+    values = prices_df.to_numpy(dtype=float, na_value=np.nan)
+    filled = np.ascontiguousarray(_ffill_matrix(values))
+    n_rows, n_cols = values.shape
+    tickers = np.asarray(prices_df.columns, dtype=object)
+
+    reb = rebalance_positions(prices_df.index, freq, min_row=lookback - 1)
+    if len(reb) == 0:
+        raise ValueError("No hay fechas de rebalanceo con historico suficiente.")
+
+    # Metricas moviles solo en las fechas de rebalanceo (mismas que `rolling_metrics`).
+    kernel = _WindowKernel(values)
+    ret, vol, n_prices = kernel.window(reb - lookback + 1, reb)
+    dd = kernel.drawdowns(reb, lookback)
+
+    # Scoring y ranking de todas las fechas de rebalanceo a la vez.
+    score = _score_matrix(ret, vol, dd, cfg).astype(float)
+    eligible = filled[reb] > 0
+    score = np.where(eligible, score, -np.inf)
+    order = rank_order_matrix(score, ret, vol, dd)
+
+    k = min(top_k, n_cols)
+    selected = order[:, :k]
+    sel_ok = np.take_along_axis(eligible, selected, axis=1)
+    sel_weights = sel_ok / np.maximum(sel_ok.sum(axis=1, keepdims=True), 1)
+
+    # Periodo de tenencia de cada fila posterior al primer rebalanceo.
+    rows = np.arange(reb[0], n_rows)
+    period = np.searchsorted(reb, rows, side="left") - 1
+    period[0] = 0
+    base_rows = reb[period]
+
+    port_rel = _relative_value(filled, base_rows, rows, selected[period], sel_weights[period])
+    port_rel[0] = 1.0
+
+    elig_weights = eligible / np.maximum(eligible.sum(axis=1, keepdims=True), 1)
+    bench_rel = np.empty(len(rows))
+    step = max(1, (1 << 20) // max(n_cols, 1))
+    all_cols = np.broadcast_to(np.arange(n_cols), (step, n_cols))
+    for lo in range(0, len(rows), step):
+        hi = min(lo + step, len(rows))
+        bench_rel[lo:hi] = _relative_value(
+            filled, base_rows[lo:hi], rows[lo:hi], all_cols[: hi - lo], elig_weights[period[lo:hi]]
+        )
+    bench_rel[0] = 1.0
+
+    # Encadenar periodos: valor al cierre de cada periodo = producto de crecimientos.
+    period_end = np.r_[reb[1:], n_rows - 1] - reb[0]
+    port_growth = port_rel[period_end]
+    bench_growth = bench_rel[period_end]
+    port_start = np.r_[1.0, np.cumprod(port_growth)[:-1]]
+    bench_start = np.r_[1.0, np.cumprod(bench_growth)[:-1]]
+    dates = prices_df.index[rows]
+    equity = pd.Series(100.0 * port_start[period] * port_rel, index=dates, name="equity")
+    benchmark = pd.Series(100.0 * bench_start[period] * bench_rel, index=dates, name="benchmark")
+
+    # Rotacion: diferencia entre pesos objetivo y pesos derivados del periodo anterior.
+    target = np.zeros((len(reb), n_cols))
+    np.put_along_axis(target, selected, sel_weights, axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        drift_growth = np.where(target[:-1] > 0, filled[reb[1:]] / filled[reb[:-1]], 0.0)
+    drifted = target[:-1] * drift_growth
+    drifted /= np.maximum(drifted.sum(axis=1, keepdims=True), 1e-300)
+    turnover = np.r_[1.0, 0.5 * np.abs(target[1:] - drifted).sum(axis=1)]
+
+    period_ret = (port_growth - 1.0) * 100.0
+    bench_ret = (bench_growth - 1.0) * 100.0
+    hit = period_ret > bench_ret
+
+    reb_dates = prices_df.index[reb]
+    holdings = pd.DataFrame(
+        np.where(sel_ok, tickers[selected], None),
+        index=pd.Index(reb_dates, name="rebalance"),
+        columns=[f"pos_{i + 1}" for i in range(k)],
+    )
+    periods = pd.DataFrame(
+        {
+            "end": prices_df.index[np.r_[reb[1:], n_rows - 1]],
+            "return_pct": period_ret,
+            "benchmark_pct": bench_ret,
+            "turnover": turnover,
+            "hit": hit,
+        },
+        index=pd.Index(reb_dates, name="rebalance"),
+    )
+    summary = {
+        "total_return_pct": float(equity.iloc[-1] - 100.0),
+        "benchmark_return_pct": float(benchmark.iloc[-1] - 100.0),
+        "vol_pct": annualized_vol_pct(equity),
+        "max_drawdown_pct": max_drawdown_pct(equity),
+        "benchmark_max_drawdown_pct": max_drawdown_pct(benchmark),
+        "avg_turnover": float(turnover[1:].mean()) if len(turnover) > 1 else np.nan,
+        "hit_rate": float(hit.mean()),
+        "n_periods": int(len(reb)),
+    }
+    return BacktestResult(equity, benchmark, holdings, periods, summary)
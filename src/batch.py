@@ -0,0 +1,248 @@
+"""Modo batch: varios ficheros de precios en paralelo, una carpeta por trabajo."""
+
+from __future__ import annotations
+
+from concurrent.futures import Future, ProcessPoolExecutor, as_completed
+from dataclasses import dataclass
+from datetime import datetime
+import glob
+import json
+import os
+from pathlib import Path
+import re
+import time
+import traceback
+
+import pandas as pd
+
+from .charts import report_chart_specs
+from .io_excel import export_results
+from .llm_summary import (
+    SUMMARY_SECTIONS,
+    SectionResult,
+    generate_section,
+    get_llm_scheduler,
+    join_sections,
+    write_usage_log,
+)
+from .pipeline import load_prices, rank_prices
+from .reporting import adjust_weights_in_report, build_pdf, report_chart_drawings
+from .sectors import DEFAULT_SOURCE_URL, load_sectors
+
+SUMMARY_FILENAME = "batch_summary.csv"
+RESULTS_FILENAME = "metrics_scoring.xlsx"
+REPORT_FILENAME = "informe.md"
+PDF_FILENAME = "informe.pdf"
+
+
+@dataclass(frozen=True)
+class BatchJob:
+    name: str
+    input: Path
+    sectors: Path | None = None
+
+
+def _safe_name(text: str) -> str:
+    return re.sub(r"[^A-Za-z0-9._-]+", "_", text).strip("_") or "job"
+
+
+def _unique_names(jobs: list[BatchJob]) -> list[BatchJob]:
+    """Evita que dos trabajos compartan carpeta (mismo nombre de fichero)."""
+    seen: dict[str, int] = {}
+    out = []
+    for job in jobs:
+        name = _safe_name(job.name)
+        seen[name] = seen.get(name, 0) + 1
+        if seen[name] > 1:
+            name = f"{name}_{seen[name]}"
+        out.append(BatchJob(name, job.input, job.sectors))
+    return out
+
+
+def expand_inputs(patterns: list[str], sectors: str | Path | None = None) -> list[BatchJob]:
+    """Un trabajo por fichero que case con algun patron glob (orden alfabetico).
+
+    Una ruta literal (sin comodines) se mantiene aunque no exista: el trabajo
+    falla y queda como fila de error en el resumen en vez de desaparecer.
+    """
+    paths: list[Path] = []
+    for pattern in patterns:
+        matches = sorted(glob.glob(pattern, recursive=True))
+        if not matches and glob.escape(pattern) == pattern:
+            matches = [pattern]
+        paths.extend(Path(m) for m in matches)
+    paths = list(dict.fromkeys(paths))
+    sectors_path = Path(sectors) if sectors else None
+    return _unique_names([BatchJob(p.stem, p, sectors_path) for p in paths])
+
+
+def read_manifest(path: str | Path, sectors: str | Path | None = None) -> list[BatchJob]:
+    """Lee un manifiesto CSV o JSON con columnas `input` y, opcionales, `name` y `sectors`.
+
+    Las rutas relativas se resuelven respecto a la carpeta del manifiesto.
+    """
+    path = Path(path)
+    if path.suffix.lower() == ".json":
+        rows = json.loads(path.read_text(encoding="utf-8"))
+    else:
+        rows = pd.read_csv(path, dtype=str).fillna("").to_dict("records")
+    base = path.parent
+    jobs = []
+    for row in rows:
+        if isinstance(row, str):
+            row = {"input": row}
+        if not row.get("input"):
+            raise ValueError(f"Fila del manifiesto sin 'input': {row}")
+        input_path = Path(row["input"])
+        input_path = input_path if input_path.is_absolute() else base / input_path
+        sectors_value = row.get("sectors") or sectors
+        sectors_path = None
+        if sectors_value:
+            sectors_path = Path(sectors_value)
+            if row.get("sectors") and not sectors_path.is_absolute():
+                sectors_path = base / sectors_path
+        jobs.append(BatchJob(row.get("name") or input_path.stem, input_path, sectors_path))
+    return _unique_names(jobs)
+
+
+def _deterministic_job(
+    job: BatchJob,
+    job_dir: Path,
+    cache_dir: str | None,
+    source_url: str,
+) -> dict:
+    """Trabajo de un proceso del pool: pipeline determinista + sectores + Excel.
+
+    Devuelve tambien los precios leidos para que las graficas del PDF no
+    vuelvan a parsear el fichero en el proceso principal.
+    """
+    record = {"job": job.name, "input": str(job.input), "output_dir": str(job_dir), "pid": os.getpid()}
+    t0 = time.perf_counter()
+    try:
+        prices = load_prices(str(job.input), cache_dir)
+        df = rank_prices(prices)
+        record["pipeline_s"] = time.perf_counter() - t0
+        if job.sectors is not None and job.sectors.exists():
+            df = df.join(load_sectors(str(job.sectors), source_url), how="left")
+        t1 = time.perf_counter()
+        export_results(df, job_dir / RESULTS_FILENAME)
+        record["export_s"] = time.perf_counter() - t1
+        record["rows"] = len(df)
+        record["df"] = df
+        record["prices"] = prices
+        record["status"] = "ok"
+    except Exception as exc:
+        record["status"] = "error"
+        record["error"] = f"{type(exc).__name__}: {exc}"
+        (job_dir / "error.txt").parent.mkdir(parents=True, exist_ok=True)
+        (job_dir / "error.txt").write_text(traceback.format_exc(), encoding="utf-8")
+    record["deterministic_s"] = time.perf_counter() - t0
+    return record
+
+
+def _write_report(job_dir: Path, sections: list[SectionResult], model: str) -> str:
+    report = join_sections([(s.title, s.text) for s in sections])
+    (job_dir / REPORT_FILENAME).write_text(report, encoding="utf-8")
+    write_usage_log(sections, model, job_dir)
+    return report
+
+
+def _pdf_args(prices: pd.DataFrame, df: pd.DataFrame, report: str) -> tuple:
+    """Argumentos de `build_pdf` como en la app: pesos validos y graficas vectoriales."""
+    report, tickers, weights = adjust_weights_in_report(
+        report, fallback_tickers=df.sort_values("rank").head(8).index.tolist()
+    )
+    return report, df, report_chart_drawings(prices, report_chart_specs(df, tickers, weights))
+
+
+def run_batch(
+    jobs: list[BatchJob],
+    outputs_dir: str | Path = "outputs",
+    workers: int | None = None,
+    model: str = "gemini-flash-latest",
+    llm: bool = True,
+    use_cache: bool = True,
+    timeout_s: int = 180,
+    cache_dir: str | Path | None = None,
+    source_url: str = DEFAULT_SOURCE_URL,
+    pdf: bool = True,
+) -> tuple[pd.DataFrame, Path]:
+    """Ejecuta los trabajos y devuelve (tabla resumen, carpeta del batch).
+
+    La parte determinista corre en un pool de procesos (escala con los nucleos).
+    Segun termina cada trabajo, sus secciones LLM se encolan en el planificador
+    compartido (`get_llm_scheduler`), que acota la concurrencia y respeta los
+    limites RPM/TPM de todo el batch. Cada trabajo escribe en
+    `<outputs_dir>/batch_<timestamp>/<nombre>/` y los fallos quedan en la tabla
+    (y en `error.txt`) sin detener al resto. Con `pdf` (y LLM) los PDF se generan
+    al final, uno por trabajo, con graficas vectoriales.
+    """
+    batch_dir = Path(outputs_dir) / f"batch_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+    batch_dir.mkdir(parents=True, exist_ok=True)
+    cache_dir = None if cache_dir is None else str(cache_dir)
+    workers = max(1, min(workers or os.cpu_count() or 1, len(jobs) or 1))
+    scheduler = get_llm_scheduler()
+
+    t_batch = time.perf_counter()
+    records: dict[str, dict] = {}
+    llm_futures: dict[str, tuple[float, list[Future]]] = {}
+    frames: dict[str, pd.DataFrame] = {}
+    prices: dict[str, pd.DataFrame] = {}
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {
+            pool.submit(_deterministic_job, job, batch_dir / job.name, cache_dir, source_url): job
+            for job in jobs
+        }
+        for future in as_completed(futures):
+            job = futures[future]
+            try:
+                record = future.result()
+            except Exception as exc:  # p. ej. el proceso murio
+                record = {"job": job.name, "input": str(job.input), "status": "error", "error": repr(exc)}
+            records[job.name] = record
+            df = record.pop("df", None)
+            job_prices = record.pop("prices", None)
+            if llm and df is not None:
+                frames[job.name] = df
+                if pdf:
+                    prices[job.name] = job_prices
+                t_submit = time.perf_counter()
+                section_futures = [
+                    scheduler.submit(generate_section, title, build(df), model, timeout_s, use_cache)
+                    for title, build in SUMMARY_SECTIONS
+                ]
+                llm_futures[job.name] = (t_submit, section_futures)
+
+    reports: dict[str, str] = {}
+    for name, (t_submit, section_futures) in llm_futures.items():
+        record = records[name]
+        try:
+            sections = [f.result() for f in section_futures]
+            reports[name] = _write_report(batch_dir / name, sections, model)
+            # Desde que se encola hasta que termina su ultima seccion (incluye la espera de cuota).
+            record["llm_s"] = max(s.finished_at for s in sections) - t_submit
+            record["llm_failed_sections"] = sum(not s.ok for s in sections)
+            record["prompt_tokens"] = sum(s.usage.prompt_tokens for s in sections)
+            record["output_tokens"] = sum(s.usage.output_tokens for s in sections)
+        except Exception as exc:
+            record["status"] = "error"
+            record["error"] = f"LLM: {type(exc).__name__}: {exc}"
+
+    for name, report in reports.items() if pdf else ():
+        # Un PDF que falla deja su fila de error; el resto y el resumen siguen.
+        t_pdf = time.perf_counter()
+        try:
+            data = build_pdf(*_pdf_args(prices[name], frames[name], report))
+            (batch_dir / name / PDF_FILENAME).write_bytes(data)
+        except Exception as exc:
+            records[name]["status"] = "error"
+            records[name]["error"] = f"PDF: {type(exc).__name__}: {exc}"
+            (batch_dir / name / "error.txt").write_text(traceback.format_exc(), encoding="utf-8")
+        records[name]["pdf_s"] = time.perf_counter() - t_pdf
+
+    summary = pd.DataFrame([records[job.name] for job in jobs if job.name in records])
+    if not summary.empty:
+        summary = summary.set_index("job")
+    summary.attrs["wall_s"] = time.perf_counter() - t_batch
+    summary.to_csv(batch_dir / SUMMARY_FILENAME)
+    return summary, batch_dir
@@ -0,0 +1,163 @@
+"""Bootstrap por bloques de la matriz de precios: intervalos de confianza y probabilidades de rango."""
+
+from __future__ import annotations
+
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+import os
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from .config import ScoringConfig
+from .metrics import TRADING_DAYS, _log_returns_matrix, compute_metrics
+from .scoring import _score_matrix, rank_order_matrix
+
+_BATCH_CELLS = 1 << 22
+
+# Retornos compartidos con los procesos del pool (se fijan una vez por proceso).
+_WORKER_RETURNS: np.ndarray | None = None
+
+
+@dataclass
+class BootstrapResult:
+    """Intervalos por ticker y tabla de probabilidades de rango."""
+
+    intervals: pd.DataFrame
+    rank_probabilities: pd.DataFrame
+    n_resamples: int
+    block_size: int
+    seed: int
+
+
+def _init_worker(returns: np.ndarray) -> None:
+    global _WORKER_RETURNS
+    _WORKER_RETURNS = returns
+
+
+def _resample_batch(
+    returns: np.ndarray,
+    n: int,
+    block_size: int,
+    seed: np.random.SeedSequence,
+    cfg: ScoringConfig,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Metricas, scores y rangos para `n` remuestreos por bloques moviles (vectorizado)."""
+    rng = np.random.default_rng(seed)
+    n_obs = returns.shape[0]
+    block = min(block_size, n_obs)
+    n_blocks = -(-n_obs // block)
+    starts = rng.integers(0, n_obs - block + 1, size=(n, n_blocks))
+    rows = (starts[:, :, None] + np.arange(block)).reshape(n, -1)[:, :n_obs]
+    # Los mismos bloques de fechas para todos los tickers: se conserva la correlacion.
+    sample = returns[rows]  # (n, n_obs, tickers)
+
+    if np.isnan(returns).any():
+        valid = ~np.isnan(sample)
+        count = valid.sum(axis=1)
+        clean = np.where(valid, sample, 0.0)
+    else:
+        # Sin huecos (caso habitual) nos ahorramos las mascaras.
+        valid = None
+        count = np.full((n, returns.shape[1]), n_obs)
+        clean = sample
+    total = clean.sum(axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ret = np.where(count >= 1, np.expm1(total) * 100.0, np.nan)
+        mean = total / count
+        dev = clean - mean[:, None, :]
+        if valid is not None:
+            dev[~valid] = 0.0
+        vol = np.sqrt((dev * dev).sum(axis=1) / (count - 1)) * np.sqrt(TRADING_DAYS) * 100.0
+    vol = np.where(count >= 2, vol, np.nan)
+
+    path = np.cumsum(clean, axis=1)
+    peak = np.maximum(np.maximum.accumulate(path, axis=1), 0.0)
+    mdd = np.expm1((path - peak).min(axis=1)) * 100.0
+    mdd = np.where(count >= 1, mdd, np.nan)
+
+    score = _score_matrix(ret, vol, mdd, cfg)
+    order = rank_order_matrix(score, ret, vol, mdd)
+    ranks = np.empty_like(order)
+    np.put_along_axis(ranks, order, np.arange(1, order.shape[1] + 1), axis=1)
+    return ret, vol, mdd, ranks
+
+
+def _worker_batch(args: tuple) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    n, block_size, seed, cfg = args
+    return _resample_batch(_WORKER_RETURNS, n, block_size, seed, cfg)
+
+
+def block_bootstrap(
+    prices_df: pd.DataFrame,
+    n_resamples: int = 10_000,
+    block_size: int = 20,
+    seed: int = 0,
+    alpha: float = 0.05,
+    top_k: int = 5,
+    cfg: ScoringConfig | None = None,
+    n_jobs: int | None = 1,
+    batch_size: int | None = None,
+) -> BootstrapResult:
+    """Bootstrap por bloques moviles de los log-retornos diarios.
+
+    Cada remuestreo concatena bloques de `block_size` sesiones (los mismos
+    para todos los tickers) hasta la longitud original y recalcula
+    rentabilidad, volatilidad, max drawdown, score y rango. Los remuestreos se
+    procesan en lotes vectorizados; con `n_jobs > 1` (o `None` = todos los
+    nucleos) los lotes se reparten en un pool de procesos. Cada lote tiene su
+    propia semilla derivada de `seed`, asi que el resultado no depende del
+    numero de procesos.
+    """
+    cfg = cfg or ScoringConfig()
+    values = prices_df.to_numpy(dtype=float, na_value=np.nan)
+    returns = np.ascontiguousarray(_log_returns_matrix(values)[1:])
+    if returns.shape[0] < 2:
+        raise ValueError("Se necesitan al menos 3 fechas para el bootstrap.")
+    n_tickers = returns.shape[1]
+
+    if batch_size is None:
+        batch_size = max(1, _BATCH_CELLS // max(returns.size, 1))
+    sizes = [min(batch_size, n_resamples - lo) for lo in range(0, n_resamples, batch_size)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    tasks = [(n, block_size, s, cfg) for n, s in zip(sizes, seeds)]
+
+    if n_jobs is None:
+        n_jobs = os.cpu_count() or 1
+    if n_jobs > 1 and len(tasks) > 1:
+        with ProcessPoolExecutor(
+            max_workers=min(n_jobs, len(tasks)),
+            initializer=_init_worker,
+            initargs=(returns,),
+        ) as pool:
+            results = list(pool.map(_worker_batch, tasks))
+    else:
+        results = [_resample_batch(returns, *task) for task in tasks]
+
+    ret, vol, mdd, ranks = (np.concatenate(parts) for parts in zip(*results))
+
+    point = compute_metrics(prices_df)
+    q = [alpha / 2.0, 0.5, 1.0 - alpha / 2.0]
+    columns = {}
+    for name, samples in (("return_pct", ret), ("vol_pct", vol), ("max_drawdown_pct", mdd)):
+        with warnings.catch_warnings():
+            # Tickers sin datos dan columnas todo NaN: su intervalo queda a NaN.
+            warnings.simplefilter("ignore", RuntimeWarning)
+            lo, mid, hi = np.nanquantile(samples, q, axis=0)
+        columns[name] = point[name].to_numpy()
+        columns[f"{name}_lo"] = lo
+        columns[f"{name}_median"] = mid
+        columns[f"{name}_hi"] = hi
+    columns["rank_mean"] = ranks.mean(axis=0)
+    columns[f"top{top_k}_prob"] = (ranks <= top_k).mean(axis=0)
+    intervals = pd.DataFrame(columns, index=point.index)
+
+    counts = np.zeros((n_tickers, n_tickers))
+    np.add.at(counts, (np.broadcast_to(np.arange(n_tickers), ranks.shape), ranks - 1), 1.0)
+    rank_probabilities = pd.DataFrame(
+        counts / len(ranks),
+        index=point.index,
+        columns=pd.Index(range(1, n_tickers + 1), name="rank"),
+    )
+    return BootstrapResult(intervals, rank_probabilities, n_resamples, block_size, seed)
@@ -0,0 +1,273 @@
+"""Graficas PNG sin pyplot (Figure + Agg), en paralelo y con cache por contenido."""
+
+from __future__ import annotations
+
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+import hashlib
+from io import BytesIO
+import os
+from pathlib import Path
+import threading
+import uuid
+
+import numpy as np
+import pandas as pd
+
+from .portfolio import PortfolioAnalytics
+
+CHART_VERSION = 1
+DEFAULT_CACHE_DIR = Path(".cache") / "charts"
+DEFAULT_MAX_BYTES = 128 * 1024 * 1024
+DEFAULT_DPI = 200
+# Por debajo de este numero de graficas se dibuja en linea: arrancar procesos
+# (e importar matplotlib en cada uno) cuesta mas que dibujarlas.
+POOL_MIN_CHARTS = 4
+
+_pool: ProcessPoolExecutor | None = None
+_pool_workers = 0
+_pool_lock = threading.Lock()
+
+# (etiqueta, fechas datetime64, valores base 100)
+Line = tuple[str, np.ndarray, np.ndarray]
+
+
+@dataclass(frozen=True)
+class ChartSpec:
+    """Grafica a generar: una linea por ticker o, con `weights`, la cartera ponderada."""
+
+    filename: str
+    title: str
+    tickers: tuple[str, ...]
+    weights: tuple[float, ...] | None = None
+
+
+def normalize_price_series(series: pd.Series) -> pd.Series:
+    """Normaliza una serie de precios a base 100."""
+    s = series.dropna()
+    if s.empty:
+        return s
+    base = s.iloc[0]
+    if base == 0:
+        return s * 0.0
+    return s / base * 100.0
+
+
+def chart_lines(prices: pd.DataFrame, spec: ChartSpec) -> list[Line]:
+    """Series ya normalizadas que dibuja la grafica (vacio si no hay nada que pintar)."""
+    if spec.weights is None:
+        lines = []
+        for ticker in spec.tickers:
+            if ticker not in prices.columns:
+                continue
+            s = normalize_price_series(prices[ticker])
+            if not s.empty:
+                lines.append((ticker, s.index.to_numpy(), s.to_numpy(dtype=float)))
+        return lines
+
+    pairs = [(t, w) for t, w in zip(spec.tickers, spec.weights) if t in prices.columns]
+    if not pairs:
+        return []
+    tickers, weights = zip(*pairs)
+    # Cartera comprar-y-mantener sobre precios normalizados (no precios brutos).
+    try:
+        portfolio = PortfolioAnalytics(prices, list(tickers)).series(list(weights))
+    except ValueError:
+        return []
+    if portfolio.empty:
+        return []
+    return [("Cartera", portfolio.index.to_numpy(), portfolio.to_numpy(dtype=float))]
+
+
+def chart_key(spec: ChartSpec, lines: list[Line], dpi: int = DEFAULT_DPI) -> str:
+    """Hash del titulo, tickers, pesos y datos dibujados (lo que determina el PNG)."""
+    h = hashlib.sha256()
+    h.update(repr((CHART_VERSION, spec.title, spec.tickers, spec.weights, dpi)).encode("utf-8"))
+    for label, dates, values in lines:
+        h.update(label.encode("utf-8"))
+        h.update(np.ascontiguousarray(dates).view(np.int64).tobytes())
+        h.update(np.ascontiguousarray(values).tobytes())
+    return h.hexdigest()
+
+
+def chart_figure(lines: list[Line], title: str, portfolio: bool = False):
+    """Construye la Figure con el API orientado a objetos (sin estado global de pyplot)."""
+    import matplotlib.dates as mdates
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    fig = Figure(figsize=(10, 5))
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot()
+    for label, dates, values in lines:
+        if portfolio:
+            ax.plot(dates, values, color="#2c3e50", linewidth=2.0, label=label)
+        else:
+            ax.plot(dates, values, label=label, linewidth=1.6)
+
+    ax.set_title(title)
+    ax.set_ylabel("Indice (base 100)")
+    ax.grid(True, alpha=0.3)
+    if portfolio:
+        ax.legend(loc="upper left", fontsize=8, frameon=False)
+    else:
+        ax.legend(loc="upper left", ncol=2, fontsize=8, frameon=False)
+    locator = mdates.AutoDateLocator(minticks=5, maxticks=10)
+    ax.xaxis.set_major_locator(locator)
+    ax.xaxis.set_major_formatter(mdates.ConciseDateFormatter(locator))
+    fig.autofmt_xdate()
+    fig.tight_layout()
+    return fig
+
+
+def render_png(lines: list[Line], title: str, portfolio: bool = False, dpi: int = DEFAULT_DPI) -> bytes:
+    """Dibuja y devuelve el PNG en memoria. Funcion pura: apta para procesos del pool."""
+    buf = BytesIO()
+    chart_figure(lines, title, portfolio).savefig(buf, format="png", dpi=dpi)
+    return buf.getvalue()
+
+
+def _evict(cache_dir: Path, max_bytes: int) -> None:
+    """Borra los PNG menos usados (mtime) hasta quedar por debajo de `max_bytes`."""
+    entries = []
+    for path in cache_dir.glob("*.png"):
+        try:
+            st = path.stat()
+        except OSError:
+            continue
+        entries.append((st.st_mtime, st.st_size, path))
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        path.unlink(missing_ok=True)
+        total -= size
+
+
+def _render_pool(workers: int) -> ProcessPoolExecutor:
+    """Pool de procesos del modulo, reutilizado entre llamadas con los mismos `workers`."""
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is None or _pool_workers != workers:
+            if _pool is not None:
+                _pool.shutdown(wait=False)
+            _pool = ProcessPoolExecutor(max_workers=workers)
+            _pool_workers = workers
+        return _pool
+
+
+def shutdown_render_pool() -> None:
+    """Cierra el pool de dibujo (se vuelve a crear si hace falta)."""
+    global _pool, _pool_workers
+    with _pool_lock:
+        pool, _pool, _pool_workers = _pool, None, 0
+    if pool is not None:
+        pool.shutdown(wait=True)
+
+
+def render_chart_bytes(
+    prices: pd.DataFrame,
+    specs: list[ChartSpec],
+    cache_dir: str | Path | None = DEFAULT_CACHE_DIR,
+    dpi: int = DEFAULT_DPI,
+    workers: int | None = None,
+    max_bytes: int = DEFAULT_MAX_BYTES,
+) -> dict[str, bytes | None]:
+    """PNG en memoria de cada grafica: {filename: bytes o None si no hay datos}.
+
+    Las graficas cuyo hash ya esta en `cache_dir` se leen sin redibujar; el
+    resto se dibuja en el pool de procesos del modulo, que se reutiliza entre
+    llamadas, o en linea si quedan menos de `POOL_MIN_CHARTS` o hay un nucleo.
+    """
+    cache = Path(cache_dir) if cache_dir is not None else None
+    result: dict[str, bytes | None] = {}
+    todo: list[tuple[ChartSpec, list[Line], str]] = []
+
+    for spec in specs:
+        lines = chart_lines(prices, spec)
+        if not lines:
+            result[spec.filename] = None
+            continue
+        key = chart_key(spec, lines, dpi)
+        cached = cache / f"{key}.png" if cache is not None else None
+        if cached is not None and cached.exists():
+            result[spec.filename] = cached.read_bytes()
+            os.utime(cached)  # marca de uso para la eviccion LRU
+            continue
+        todo.append((spec, lines, key))
+
+    args = [(lines, spec.title, spec.weights is not None, dpi) for spec, lines, _ in todo]
+    workers = min(len(todo), workers or os.cpu_count() or 1)
+    pngs = None
+    if workers > 1 and len(todo) >= POOL_MIN_CHARTS:
+        try:
+            pngs = list(_render_pool(workers).map(render_png, *zip(*args)))
+        except BrokenProcessPool:
+            # Un proceso murio: se descarta el pool y se dibuja en linea.
+            shutdown_render_pool()
+    if pngs is None:
+        pngs = [render_png(*a) for a in args]
+
+    for (spec, _, key), png in zip(todo, pngs):
+        result[spec.filename] = png
+        if cache is not None:
+            cache.mkdir(parents=True, exist_ok=True)
+            tmp = cache / f".{key}.{uuid.uuid4().hex}.tmp"
+            tmp.write_bytes(png)
+            os.replace(tmp, cache / f"{key}.png")
+    if cache is not None and todo:
+        _evict(cache, max_bytes)
+    return {spec.filename: result[spec.filename] for spec in specs}
+
+
+def write_charts(charts: dict[str, bytes | None], out_dir: str | Path) -> dict[str, Path | None]:
+    """Escribe los PNG en `out_dir` y devuelve {filename: ruta o None}."""
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    paths: dict[str, Path | None] = {}
+    for filename, png in charts.items():
+        paths[filename] = None
+        if png is not None:
+            paths[filename] = out_dir / filename
+            paths[filename].write_bytes(png)
+    return paths
+
+
+def render_charts(
+    prices: pd.DataFrame,
+    specs: list[ChartSpec],
+    out_dir: str | Path,
+    cache_dir: str | Path | None = DEFAULT_CACHE_DIR,
+    dpi: int = DEFAULT_DPI,
+    workers: int | None = None,
+    max_bytes: int = DEFAULT_MAX_BYTES,
+) -> dict[str, Path | None]:
+    """Genera los PNG de `specs` en `out_dir` y devuelve {filename: ruta o None}.
+
+    Igual que `render_chart_bytes`, pero escribiendo cada grafica en disco.
+    """
+    return write_charts(render_chart_bytes(prices, specs, cache_dir, dpi, workers, max_bytes), out_dir)
+
+
+def report_chart_specs(
+    ranked: pd.DataFrame,
+    portfolio_tickers: list[str] | None = None,
+    portfolio_weights: list[float] | None = None,
+) -> list[ChartSpec]:
+    """Las graficas del informe: top 5, bottom 5 y (si hay pesos) la cartera propuesta."""
+    order = ranked.sort_values("rank").index.tolist()
+    specs = [
+        ChartSpec("grafica_top5.png", "Top 5 por scoring (base 100)", tuple(order[:5])),
+        ChartSpec("grafica_bottom5.png", "Bottom 5 por scoring (base 100)", tuple(order[-5:])),
+    ]
+    if portfolio_tickers and portfolio_weights:
+        specs.append(
+            ChartSpec(
+                "grafica_cartera.png",
+                "Cartera propuesta (base 100)",
+                tuple(portfolio_tickers),
+                tuple(float(w) for w in portfolio_weights),
+            )
+        )
+    return specs
@@ -0,0 +1,327 @@
+"""Estado incremental de metricas por ticker (actualizacion diaria en O(tickers))."""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+import json
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from .metrics import TRADING_DAYS, _log_returns_matrix
+
+STATE_FILENAME = "metrics_state.json"
+STATE_VERSION = 3
+
+
+_DIGEST_BASE = 0x100000001B3
+_DIGEST_MOD = 1 << 64
+
+
+def _mix64(x: np.ndarray) -> np.ndarray:
+    """Finalizador de splitmix64 sobre uint64 (en el sitio; desborda dando la vuelta)."""
+    x ^= x >> np.uint64(30)
+    x *= np.uint64(0xBF58476D1CE4E5B9)
+    x ^= x >> np.uint64(27)
+    x *= np.uint64(0x94D049BB133111EB)
+    x ^= x >> np.uint64(31)
+    return x
+
+
+def _row_hashes(index: pd.Index, values: np.ndarray) -> np.ndarray:
+    """Hash de 64 bits por fila (fecha + precios), vectorizado.
+
+    Cada celda entra por sus bits multiplicados por un factor impar propio de su
+    columna: cambiar cualquier precio cambia la suma de la fila. La mezcla final
+    reparte la fecha y la suma por los 64 bits.
+    """
+    days = pd.DatetimeIndex(index).to_numpy().astype("datetime64[s]").view(np.uint64)
+    cells = np.array(values, dtype=float)
+    cells[np.isnan(cells)] = np.nan  # mismo patron de bits para todos los NaN
+    cells = cells.view(np.uint64)
+    cells *= _mix64(np.arange(1, cells.shape[1] + 1, dtype=np.uint64)) | np.uint64(1)
+    rows = cells.sum(axis=1, dtype=np.uint64)
+    rows ^= _mix64(days.copy())
+    return _mix64(rows)
+
+
+def _history_digest(index: pd.Index, values: np.ndarray, digest: str = "") -> str:
+    """Hash del historico (fecha + precios por fila) que continua `digest`.
+
+    Las filas se combinan como un polinomio modulo 2**64,
+    H = H * B**n + sum(h_i * B**(n-1-i)), asi que el resultado no depende de
+    como se troceen las actualizaciones (el estado avanzado dia a dia y el
+    recalculado de una vez tienen el mismo hash) y cada actualizacion solo
+    recorre sus filas nuevas, sin bucles en Python.
+    """
+    rows = _row_hashes(index, values)
+    n = len(rows)
+    # B**(n-1-i) modulo 2**64: los productos de uint64 desbordan dando la vuelta.
+    powers = np.ones(n, dtype=np.uint64)
+    if n > 1:
+        powers[:-1] = np.cumprod(np.full(n - 1, _DIGEST_BASE, dtype=np.uint64))[::-1]
+    tail = int((rows * powers).sum(dtype=np.uint64))
+    head = int(digest, 16) if digest else 0
+    return f"{(head * pow(_DIGEST_BASE, n, _DIGEST_MOD) + tail) % _DIGEST_MOD:016x}"
+
+
+@dataclass
+class MetricState:
+    """Acumuladores por ticker que permiten avanzar las metricas fila a fila.
+
+    Guarda primer/ultimo precio valido, acumuladores de Welford para los
+    log-retornos (n, media, M2), pico acumulado y peor drawdown. Con esto
+    `to_metrics()` reproduce `compute_metrics` sin releer el historico.
+
+    `digest` identifica el historico ya absorbido y `source` el fichero del que
+    salio; `mismatch()` los usa para no avanzar un estado sobre otros datos.
+    """
+
+    tickers: list[str]
+    last_date: pd.Timestamp | None
+    n_prices: np.ndarray
+    first_price: np.ndarray
+    last_price: np.ndarray
+    has_na: np.ndarray
+    n_rets: np.ndarray
+    mean: np.ndarray
+    m2: np.ndarray
+    peak: np.ndarray
+    worst_dd: np.ndarray
+    digest: str = ""
+    source: str | None = None
+
+    @classmethod
+    def empty(cls, tickers: list[str]) -> "MetricState":
+        """Estado inicial sin observaciones."""
+        n = len(tickers)
+        return cls(
+            tickers=list(tickers),
+            last_date=None,
+            n_prices=np.zeros(n, dtype=np.int64),
+            first_price=np.full(n, np.nan),
+            last_price=np.full(n, np.nan),
+            has_na=np.zeros(n, dtype=bool),
+            n_rets=np.zeros(n, dtype=np.int64),
+            mean=np.zeros(n),
+            m2=np.zeros(n),
+            peak=np.full(n, np.nan),
+            worst_dd=np.full(n, np.nan),
+        )
+
+    @classmethod
+    def from_prices(cls, prices_df: pd.DataFrame, source: str | Path | None = None) -> "MetricState":
+        """Construye el estado de una vez a partir de todo el historico."""
+        state = cls.empty([str(c) for c in prices_df.columns])
+        state.source = _source_id(source)
+        values = prices_df.to_numpy(dtype=float, na_value=np.nan)
+        if values.shape[0] == 0:
+            return state
+        state.digest = _history_digest(prices_df.index, values)
+        valid = ~np.isnan(values)
+        n_rows = values.shape[0]
+        cols = np.arange(values.shape[1])
+        seen = valid.any(axis=0)
+
+        state.n_prices = valid.sum(axis=0).astype(np.int64)
+        first = values[np.argmax(valid, axis=0), cols]
+        last = values[n_rows - 1 - np.argmax(valid[::-1], axis=0), cols]
+        state.first_price = np.where(seen, first, np.nan)
+        state.last_price = np.where(seen, last, np.nan)
+        state.has_na = ~valid.all(axis=0)
+
+        rets = _log_returns_matrix(values)
+        rets_valid = ~np.isnan(rets)
+        n_rets = rets_valid.sum(axis=0)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            mean = np.where(rets_valid, rets, 0.0).sum(axis=0) / n_rets
+            dev = np.where(rets_valid, rets - mean, 0.0)
+            m2 = (dev * dev).sum(axis=0)
+        state.n_rets = n_rets.astype(np.int64)
+        state.mean = np.where(n_rets > 0, mean, 0.0)
+        state.m2 = np.where(n_rets > 0, m2, 0.0)
+
+        peak = np.fmax.accumulate(values, axis=0)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            drawdown = values / peak - 1.0
+        state.peak = peak[-1]
+        state.worst_dd = np.fmin.reduce(drawdown, axis=0)
+        state.last_date = pd.Timestamp(prices_df.index[-1])
+        return state
+
+    def update(self, new_rows: pd.DataFrame) -> "MetricState":
+        """Avanza el estado con filas nuevas (fechas posteriores a `last_date`).
+
+        Cada fila cuesta O(tickers); el historico previo no se vuelve a leer.
+        """
+        if new_rows.empty:
+            return self
+        missing = [c for c in new_rows.columns if str(c) not in self.tickers]
+        if missing:
+            raise ValueError(f"Tickers no presentes en el estado: {missing}")
+        if not new_rows.index.is_monotonic_increasing:
+            raise ValueError("Las fechas nuevas no estan ordenadas ascendentemente.")
+        if self.last_date is not None and new_rows.index[0] <= self.last_date:
+            raise ValueError(
+                f"Las filas nuevas deben ser posteriores a {self.last_date.date()}."
+            )
+
+        aligned = new_rows.rename(columns=str).reindex(columns=self.tickers)
+        values = aligned.to_numpy(dtype=float, na_value=np.nan)
+        self.digest = _history_digest(aligned.index, values, self.digest)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            for row in values:
+                valid = ~np.isnan(row)
+                self.has_na |= ~valid
+
+                # Log-retorno respecto al ultimo precio valido (como dropna + shift).
+                ret = np.log(row / self.last_price)
+                has_ret = valid & (self.n_prices > 0) & ~np.isnan(ret)
+                n = self.n_rets + has_ret
+                delta = np.where(has_ret, ret - self.mean, 0.0)
+                self.mean = np.where(has_ret, self.mean + delta / np.maximum(n, 1), self.mean)
+                self.m2 = np.where(has_ret, self.m2 + delta * (ret - self.mean), self.m2)
+                self.n_rets = n
+
+                self.first_price = np.where(valid & (self.n_prices == 0), row, self.first_price)
+                self.last_price = np.where(valid, row, self.last_price)
+                self.n_prices = self.n_prices + valid
+
+                self.peak = np.fmax(self.peak, row)
+                self.worst_dd = np.fmin(self.worst_dd, row / self.peak - 1.0)
+
+        self.last_date = pd.Timestamp(new_rows.index[-1])
+        return self
+
+    def mismatch(self, prices_df: pd.DataFrame) -> str | None:
+        """Motivo por el que el estado no vale para `prices_df`, o None si vale.
+
+        El estado solo se puede avanzar si `prices_df` tiene los mismos tickers
+        y, hasta `last_date`, exactamente el mismo historico (mismo hash). Un
+        fichero distinto o revisado con las mismas columnas no pasa.
+        """
+        if [str(c) for c in prices_df.columns] != self.tickers:
+            return "los tickers no coinciden"
+        if self.last_date is None:
+            return None
+        if self.last_date not in prices_df.index:
+            return f"el fichero no contiene la fecha {self.last_date.date()} del estado"
+        overlap = prices_df.loc[: self.last_date]
+        digest = _history_digest(overlap.index, overlap.to_numpy(dtype=float, na_value=np.nan))
+        if digest != self.digest:
+            return f"el historico hasta {self.last_date.date()} no coincide (fichero distinto o revisado)"
+        return None
+
+    def to_metrics(self) -> pd.DataFrame:
+        """Devuelve las metricas con el mismo formato que `compute_metrics`."""
+        enough = self.n_prices >= 2
+        with np.errstate(divide="ignore", invalid="ignore"):
+            ret = (self.last_price - self.first_price) / self.first_price * 100.0
+            var = self.m2 / (self.n_rets - 1)
+        ret[~enough | (self.first_price == 0)] = np.nan
+        vol = np.sqrt(var) * np.sqrt(TRADING_DAYS) * 100.0
+        vol[self.n_rets < 2] = np.nan
+        mdd = np.where(enough, self.worst_dd * 100.0, np.nan)
+        return pd.DataFrame(
+            {"return_pct": ret, "vol_pct": vol, "max_drawdown_pct": mdd},
+            index=pd.Index(self.tickers, name="ticker"),
+        )
+
+    def has_na_prices(self) -> pd.Series:
+        """Equivalente a `prices.isna().any(axis=0)` sobre todo el historico."""
+        return pd.Series(self.has_na, index=pd.Index(self.tickers, name="ticker"))
+
+    def to_dict(self) -> dict:
+        """Representacion serializable (JSON) del estado."""
+        return {
+            "version": STATE_VERSION,
+            "tickers": self.tickers,
+            "last_date": None if self.last_date is None else self.last_date.isoformat(),
+            "n_prices": self.n_prices.tolist(),
+            "first_price": self.first_price.tolist(),
+            "last_price": self.last_price.tolist(),
+            "has_na": self.has_na.tolist(),
+            "n_rets": self.n_rets.tolist(),
+            "mean": self.mean.tolist(),
+            "m2": self.m2.tolist(),
+            "peak": self.peak.tolist(),
+            "worst_dd": self.worst_dd.tolist(),
+            "digest": self.digest,
+            "source": self.source,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "MetricState":
+        """Reconstruye el estado desde `to_dict()`."""
+        if data.get("version") != STATE_VERSION:
+            raise ValueError(f"Version de estado no soportada: {data.get('version')}")
+        last_date = data.get("last_date")
+        return cls(
+            tickers=list(data["tickers"]),
+            last_date=None if last_date is None else pd.Timestamp(last_date),
+            n_prices=np.asarray(data["n_prices"], dtype=np.int64),
+            first_price=np.asarray(data["first_price"], dtype=float),
+            last_price=np.asarray(data["last_price"], dtype=float),
+            has_na=np.asarray(data["has_na"], dtype=bool),
+            n_rets=np.asarray(data["n_rets"], dtype=np.int64),
+            mean=np.asarray(data["mean"], dtype=float),
+            m2=np.asarray(data["m2"], dtype=float),
+            peak=np.asarray(data["peak"], dtype=float),
+            worst_dd=np.asarray(data["worst_dd"], dtype=float),
+            digest=data["digest"],
+            source=data.get("source"),
+        )
+
+    def save(self, path: str | Path) -> None:
+        """Guarda el estado como JSON."""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(self.to_dict()), encoding="utf-8")
+
+    @classmethod
+    def load(cls, path: str | Path) -> "MetricState":
+        """Carga un estado guardado con `save()`."""
+        return cls.from_dict(json.loads(Path(path).read_text(encoding="utf-8")))
+
+
+def _source_id(source: str | Path | None) -> str | None:
+    return None if source is None else str(Path(source).resolve())
+
+
+def find_latest_state(outputs_dir: str | Path, source: str | Path | None = None) -> Path | None:
+    """Busca el estado mas reciente en `outputs/<timestamp>/`.
+
+    Con `source` se prefiere el ultimo estado calculado a partir de ese mismo
+    fichero; si no hay ninguno, el mas reciente de cualquier origen (que luego
+    `mismatch()` acepta o descarta).
+    """
+    candidates = sorted(Path(outputs_dir).glob(f"*/{STATE_FILENAME}"))
+    wanted = _source_id(source)
+    if wanted is not None:
+        for path in reversed(candidates):
+            try:
+                if json.loads(path.read_text(encoding="utf-8")).get("source") == wanted:
+                    return path
+            except (OSError, ValueError):
+                continue
+    return candidates[-1] if candidates else None
+
+
+def resume_state(
+    state: MetricState | None,
+    prices_df: pd.DataFrame,
+    source: str | Path | None = None,
+) -> tuple[MetricState, str | None]:
+    """Avanza `state` con las filas posteriores a `last_date` o lo reconstruye.
+
+    Devuelve (estado, motivo): el motivo es None si se ha reutilizado el estado
+    y, si no, explica por que se ha recalculado todo el historico.
+    """
+    reason = "sin estado previo" if state is None else state.mismatch(prices_df)
+    if reason is not None:
+        return MetricState.from_prices(prices_df, source), reason
+    new_rows = prices_df.loc[prices_df.index > state.last_date] if state.last_date is not None else prices_df
+    state.update(new_rows)
+    state.source = _source_id(source) or state.source
+    return state, None
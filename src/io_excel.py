@@ -29,3 +29,12 @@ def export_results(df: pd.DataFrame, output_path: str | Path) -> None:
     output_path = Path(output_path)
     output_path.parent.mkdir(parents=True, exist_ok=True)
     df.to_excel(output_path, index=True)
+
+
+def export_sheets(sheets: dict[str, pd.DataFrame], output_path: str | Path) -> None:
+    """Exporta varios DataFrames a un Excel, una hoja por clave."""
+    output_path = Path(output_path)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    with pd.ExcelWriter(output_path) as writer:
+        for name, df in sheets.items():
+            df.to_excel(writer, sheet_name=name, index=True)
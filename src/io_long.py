@@ -0,0 +1,157 @@
+"""Lectura por bloques de precios en formato largo (fecha, ticker, precio) en CSV o Parquet."""
+
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Iterator
+
+import numpy as np
+import pandas as pd
+
+LONG_SUFFIXES = (".csv", ".csv.gz", ".csv.zip", ".csv.bz2", ".csv.xz", ".parquet", ".pq")
+DEFAULT_CHUNK_ROWS = 1_000_000
+
+# Nombres habituales en los feeds de proveedores (se comparan en minusculas).
+_DATE_ALIASES = ("date", "datetime", "timestamp", "time")
+_TICKER_ALIASES = ("ticker", "symbol")
+_PRICE_ALIASES = ("price", "close", "adj_close")
+
+
+def is_long_format(path: str | Path) -> bool:
+    """True si la extension corresponde a un fichero largo (CSV/Parquet)."""
+    name = Path(path).name.lower()
+    return name.endswith(LONG_SUFFIXES)
+
+
+def _is_parquet(path: Path) -> bool:
+    return path.name.lower().endswith((".parquet", ".pq"))
+
+
+def _resolve_columns(names: list[str]) -> tuple[str, str, str]:
+    """Localiza las columnas de fecha, ticker y precio por alias."""
+    lower = {str(c).strip().lower(): c for c in names}
+
+    def pick(aliases: tuple[str, ...], label: str) -> str:
+        for alias in aliases:
+            if alias in lower:
+                return lower[alias]
+        raise ValueError(f"No se encontro columna de {label} (se esperaba una de {', '.join(aliases)}).")
+
+    return pick(_DATE_ALIASES, "fecha"), pick(_TICKER_ALIASES, "ticker"), pick(_PRICE_ALIASES, "precio")
+
+
+def _iter_raw_chunks(path: Path, chunk_rows: int) -> Iterator[pd.DataFrame]:
+    """Genera bloques con columnas `ts`, `ticker`, `price` sin cargar el fichero entero."""
+    if _is_parquet(path):
+        try:
+            import pyarrow.parquet as pq
+        except ImportError as exc:  # pragma: no cover - dependencia opcional
+            raise ImportError("Leer Parquet requiere pyarrow (pip install pyarrow).") from exc
+        pf = pq.ParquetFile(path)
+        cols = _resolve_columns(pf.schema_arrow.names)
+        for batch in pf.iter_batches(batch_size=chunk_rows, columns=list(cols)):
+            chunk = batch.to_pandas()
+            chunk.columns = ["ts", "ticker", "price"]
+            yield chunk
+        return
+
+    header = pd.read_csv(path, nrows=0).columns
+    cols = _resolve_columns(list(header))
+    # Ticker como texto para no perder ceros a la izquierda ni mezclar tipos entre bloques.
+    reader = pd.read_csv(path, usecols=list(cols), dtype={cols[1]: str}, chunksize=chunk_rows)
+    for chunk in reader:
+        yield chunk[list(cols)].set_axis(["ts", "ticker", "price"], axis=1)
+
+
+_NS_PER_DAY = 86_400 * 10**9
+
+
+class _DailyCloses:
+    """Acumula el ultimo precio valido de cada (dia, ticker) bloque a bloque.
+
+    Los tickers se codifican como enteros (vocabulario creciente) y cada
+    observacion se guarda como clave `dia << 32 | ticker` + marca temporal en ns
+    + precio, de modo que reducir y fusionar son `np.lexsort` sobre arrays.
+    """
+
+    def __init__(self) -> None:
+        self.vocab: dict[str, int] = {}
+        self.unit = "ns"
+        self._parts: list[tuple[np.ndarray, np.ndarray, np.ndarray]] = []
+        self._pending = 0
+        self._compacted = 0
+
+    def add(self, chunk: pd.DataFrame, min_rows: int) -> None:
+        ts = pd.to_datetime(chunk["ts"], errors="coerce")
+        if getattr(ts.dt, "tz", None) is not None:
+            # Dia de cotizacion en la hora local de la marca temporal.
+            ts = ts.dt.tz_localize(None)
+        if not self._parts:
+            self.unit = ts.dt.unit
+        ns = ts.to_numpy(dtype="datetime64[ns]").view(np.int64)
+        price = pd.to_numeric(chunk["price"], errors="coerce").to_numpy(dtype=float, na_value=np.nan)
+        tickers = chunk["ticker"].astype(str).str.strip()
+        tickers = tickers.where(chunk["ticker"].notna() & (tickers != ""))
+
+        inv, uniques = pd.factorize(tickers)  # -1 para tickers vacios
+        codes = np.array([self.vocab.setdefault(t, len(self.vocab)) for t in uniques], dtype=np.int64)
+        ok = ~ts.isna().to_numpy() & ~np.isnan(price) & (inv >= 0)
+        key = ((ns[ok] // _NS_PER_DAY) << 32) | codes[inv[ok]]
+        self._parts.append(_last_per_key(key, ns[ok], price[ok]))
+        self._pending += len(self._parts[-1][0])
+        # Compactamos cuando lo pendiente duplica lo ya compactado: coste amortizado lineal.
+        if self._pending > max(2 * self._compacted, min_rows):
+            self._parts = [self._merged()]
+            self._pending = self._compacted = len(self._parts[0][0])
+
+    def _merged(self) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        if len(self._parts) == 1:
+            return self._parts[0]
+        key, ns, price = (np.concatenate(arrs) for arrs in zip(*self._parts))
+        return _last_per_key(key, ns, price)
+
+    def to_wide(self) -> pd.DataFrame:
+        """Matriz ancha dias x tickers (tickers en orden alfabetico)."""
+        if not self._parts:
+            raise ValueError("El fichero de precios no contiene filas.")
+        key, _, price = self._merged()
+        if len(key) == 0:
+            raise ValueError("El fichero de precios no contiene precios validos.")
+        days, rows = np.unique(key >> 32, return_inverse=True)
+        names = np.array(list(self.vocab), dtype=object)
+        order = np.argsort(names, kind="stable")
+        position = np.empty(len(names), dtype=np.int64)
+        position[order] = np.arange(len(names))
+
+        values = np.full((len(days), len(names)), np.nan)
+        values[rows, position[key & 0xFFFFFFFF]] = price
+        used = np.zeros(len(names), dtype=bool)
+        used[position[key & 0xFFFFFFFF]] = True
+
+        index = pd.DatetimeIndex(days.astype("datetime64[D]"), name="Date").as_unit(self.unit)
+        return pd.DataFrame(values[:, used], index=index, columns=pd.Index(list(names[order][used])))
+
+
+def _last_per_key(key: np.ndarray, ns: np.ndarray, price: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Ultima observacion (por marca temporal, y a igualdad por llegada) de cada clave."""
+    order = np.lexsort((ns, key))  # estable: empata por orden de llegada
+    key, ns, price = key[order], ns[order], price[order]
+    last = np.ones(len(key), dtype=bool)
+    last[:-1] = key[1:] != key[:-1]
+    return key[last], ns[last], price[last]
+
+
+def read_prices_long(path: str | Path, chunk_rows: int = DEFAULT_CHUNK_ROWS) -> pd.DataFrame:
+    """Lee un CSV/Parquet largo por bloques y devuelve la matriz ancha de cierres diarios.
+
+    El cierre diario es el ultimo precio valido de cada (dia, ticker), igual que
+    un `resample("D").last()` por ticker. Cada bloque se reduce antes de
+    acumularse, asi que la memoria pico queda acotada por `chunk_rows` mas el
+    tamano de la matriz diaria final, no por el numero de barras del fichero.
+    El resultado tiene la misma forma que `read_prices_excel`: indice `Date` y
+    una columna por ticker (orden alfabetico).
+    """
+    closes = _DailyCloses()
+    for chunk in _iter_raw_chunks(Path(path), chunk_rows):
+        closes.add(chunk, chunk_rows)
+    return closes.to_wide()
@@ -0,0 +1,203 @@
+"""Ejecuciones del informe en segundo plano: ID por trabajo, progreso y salidas parciales.
+
+La app envia cada ejecucion a un `JobManager` compartido por todas las sesiones
+del servidor y se limita a pintar lo que el trabajo ya ha publicado. Un rerun de
+la pagina no interrumpe el trabajo: basta con volver a consultar su ID.
+"""
+
+from __future__ import annotations
+
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+import threading
+import time
+import traceback
+from typing import Any, Callable
+import uuid
+
+import pandas as pd
+
+from .llm_summary import SUMMARY_SECTIONS, SectionResult, stream_sections
+from .profiling import RunProfiler
+from .stages import REPORT_STAGES, StageMemo
+
+PENDING = "pendiente"
+RUNNING = "en curso"
+DONE = "ok"
+FAILED = "error"
+
+
+@dataclass
+class JobView:
+    """Copia consistente del estado de un trabajo para pintarla sin bloquearlo."""
+
+    job_id: str
+    status: str
+    outputs: dict[str, Any]
+    stages: dict[str, tuple[bool, float]]
+    partial: list[str]
+    first_chunk_s: list[float | None]
+    artifacts: dict[str, Any]
+    error: str | None
+    elapsed_s: float
+
+    @property
+    def finished(self) -> bool:
+        return self.status in (DONE, FAILED)
+
+
+@dataclass
+class Job:
+    """Trabajo en curso. Los hilos de etapas publican aqui; la UI lee con `view()`."""
+
+    job_id: str
+    params: dict[str, Any]
+    refresh: frozenset[str] = frozenset()
+    status: str = PENDING
+    created_at: float = field(default_factory=time.time)
+    started_at: float | None = None
+    finished_at: float | None = None
+    outputs: dict[str, Any] = field(default_factory=dict)
+    stages: dict[str, tuple[bool, float]] = field(default_factory=dict)
+    partial: list[str] = field(default_factory=lambda: ["" for _ in SUMMARY_SECTIONS])
+    first_chunk_s: list[float | None] = field(default_factory=lambda: [None for _ in SUMMARY_SECTIONS])
+    artifacts: dict[str, Any] = field(default_factory=dict)
+    error: str | None = None
+    profiler: RunProfiler | None = None
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def publish(self, name: str, value: Any, reused: bool, elapsed_s: float) -> None:
+        """Callback `on_stage` del grafo: la salida queda visible en cuanto termina."""
+        with self._lock:
+            self.outputs[name] = value
+            self.stages[name] = (reused, elapsed_s)
+
+    def chunk(self, index: int, text: str, elapsed_s: float) -> None:
+        with self._lock:
+            if self.first_chunk_s[index] is None:
+                self.first_chunk_s[index] = elapsed_s
+            self.partial[index] += text
+
+    def add_artifact(self, name: str, value: Any) -> None:
+        with self._lock:
+            self.artifacts[name] = value
+
+    def view(self) -> JobView:
+        with self._lock:
+            end = self.finished_at or time.time()
+            return JobView(
+                self.job_id,
+                self.status,
+                dict(self.outputs),
+                dict(self.stages),
+                list(self.partial),
+                list(self.first_chunk_s),
+                dict(self.artifacts),
+                self.error,
+                end - (self.started_at or end),
+            )
+
+
+def _streaming_sections(job: Job) -> Callable[..., list[SectionResult]]:
+    """Etapa `sections` en streaming: cada trozo se publica en el trabajo segun llega."""
+
+    def run(table: pd.DataFrame, model: str, timeout_s: int | None = None, use_llm_cache: bool | None = None):
+        results: list[SectionResult | None] = [None for _ in SUMMARY_SECTIONS]
+        for event in stream_sections(table, model=model, timeout_s=timeout_s or 180, use_cache=use_llm_cache is not False):
+            if event.done:
+                results[event.index] = SectionResult(
+                    event.title,
+                    event.text,
+                    event.elapsed_s,
+                    event.usage,
+                    job.first_chunk_s[event.index],
+                    error=event.usage.error,
+                    finished_at=time.perf_counter(),
+                )
+            else:
+                job.chunk(event.index, event.chunk, event.elapsed_s)
+        return results
+
+    return run
+
+
+class JobManager:
+    """Pool de trabajos compartido.
+
+    `max_jobs` acota los informes simultaneos; dentro de cada uno, hasta
+    `stage_workers` etapas independientes corren a la vez (graficas en paralelo
+    con las llamadas a Gemini). El memo de etapas es comun a todos los trabajos.
+    """
+
+    def __init__(
+        self,
+        max_jobs: int = 4,
+        stage_workers: int = 3,
+        memo: StageMemo | None = None,
+        max_history: int = 50,
+    ) -> None:
+        self.stage_workers = stage_workers
+        self.memo = memo if memo is not None else StageMemo()
+        self.max_history = max_history
+        self._pool = ThreadPoolExecutor(max_workers=max_jobs, thread_name_prefix="informe")
+        self._jobs: dict[str, Job] = {}
+        self._lock = threading.Lock()
+
+    def submit(
+        self,
+        params: dict[str, Any],
+        refresh: set[str] | frozenset[str] = frozenset(),
+        finish: Callable[[Job], None] | None = None,
+        job_id: str | None = None,
+    ) -> str:
+        """Encola un informe y devuelve su ID sin esperar.
+
+        `finish(job)` corre en el mismo hilo al terminar las etapas (p. ej. para
+        escribir Excel y PDF) y puede registrar artefactos con `add_artifact`.
+        """
+        job = Job(job_id or uuid.uuid4().hex[:12], params, frozenset(refresh))
+        with self._lock:
+            self._jobs[job.job_id] = job
+            finished = [j for j in self._jobs.values() if j.finished_at is not None]
+            for old in sorted(finished, key=lambda j: j.created_at)[: max(0, len(self._jobs) - self.max_history)]:
+                del self._jobs[old.job_id]
+        self._pool.submit(self._run, job, finish)
+        return job.job_id
+
+    def _run(self, job: Job, finish: Callable[[Job], None] | None) -> None:
+        with job._lock:
+            job.status = RUNNING
+            job.started_at = time.time()
+            # Sin tracemalloc ni muestreo: varios trabajos comparten el proceso.
+            job.profiler = RunProfiler()
+        try:
+            REPORT_STAGES.run(
+                job.params,
+                memo=self.memo,
+                refresh=job.refresh,
+                runners={"sections": _streaming_sections(job)},
+                on_stage=job.publish,
+                workers=self.stage_workers,
+                around=job.profiler.stage,
+            )
+            if finish is not None:
+                finish(job)
+            status, error = DONE, None
+        except Exception as exc:
+            status, error = FAILED, f"{type(exc).__name__}: {exc}\n\n{traceback.format_exc()}"
+        with job._lock:
+            job.status = status
+            job.error = error
+            job.finished_at = time.time()
+
+    def get(self, job_id: str) -> Job | None:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def jobs(self) -> list[Job]:
+        """Trabajos conocidos, del mas reciente al mas antiguo."""
+        with self._lock:
+            return sorted(self._jobs.values(), key=lambda j: j.created_at, reverse=True)
+
+    def shutdown(self, wait: bool = True) -> None:
+        self._pool.shutdown(wait=wait)
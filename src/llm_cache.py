@@ -0,0 +1,158 @@
+"""Cache persistente en disco de respuestas de Gemini (clave: modelo + hash del prompt + config)."""
+
+from __future__ import annotations
+
+from dataclasses import asdict, dataclass
+import hashlib
+import json
+import os
+from pathlib import Path
+import threading
+import time
+import uuid
+
+DEFAULT_CACHE_DIR = Path(".cache") / "llm"
+DEFAULT_TTL_S = 7 * 24 * 3600
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+# Los mensajes de error controlados y las respuestas cortadas nunca se guardan.
+UNAVAILABLE_PREFIX = "Resumen no disponible"
+INCOMPLETE_MARKER = "Respuesta incompleta"
+
+
+def is_cacheable(text: str) -> bool:
+    """True si la respuesta es texto util (no vacio, ni error, ni stream cortado)."""
+    return (
+        bool(text and text.strip())
+        and not text.startswith(UNAVAILABLE_PREFIX)
+        and f"[{INCOMPLETE_MARKER}." not in text
+    )
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    writes: int = 0
+    evictions: int = 0
+
+
+class LLMCache:
+    """Un fichero JSON por respuesta; caducidad por TTL y eviccion LRU por tamano.
+
+    El uso se registra en la fecha de modificacion de cada fichero, asi que la
+    eviccion no necesita indice aparte. Con `enabled=False` no lee ni escribe.
+    """
+
+    def __init__(
+        self,
+        cache_dir: str | Path = DEFAULT_CACHE_DIR,
+        ttl_s: float = DEFAULT_TTL_S,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        enabled: bool = True,
+    ) -> None:
+        self.cache_dir = Path(cache_dir)
+        self.ttl_s = ttl_s
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+        self._stats = CacheStats()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(model: str, prompt: str, generation_config: dict) -> str:
+        """Clave estable a partir del modelo, el hash del prompt y la config de generacion."""
+        raw = json.dumps(
+            {
+                "model": model,
+                "prompt_sha256": hashlib.sha256(prompt.encode("utf-8")).hexdigest(),
+                "generation_config": generation_config,
+            },
+            sort_keys=True,
+        )
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.json"
+
+    def _count(self, field: str, n: int = 1) -> None:
+        with self._lock:
+            setattr(self._stats, field, getattr(self._stats, field) + n)
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return asdict(self._stats)
+
+    def get(self, key: str) -> str | None:
+        """Devuelve el texto cacheado o None (ausente, caducado o ilegible)."""
+        if not self.enabled:
+            return None
+        path = self._path(key)
+        try:
+            entry = json.loads(path.read_text(encoding="utf-8"))
+            if time.time() - float(entry["created_at"]) > self.ttl_s:
+                path.unlink(missing_ok=True)
+                raise KeyError("caducada")
+            os.utime(path)  # marca de uso para la eviccion LRU
+        except (OSError, ValueError, KeyError, TypeError):
+            self._count("misses")
+            return None
+        self._count("hits")
+        return str(entry["text"])
+
+    def put(self, key: str, text: str, model: str = "") -> bool:
+        """Guarda la respuesta si es cacheable. Devuelve True si se escribio."""
+        if not self.enabled or not is_cacheable(text):
+            return False
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        entry = {"created_at": time.time(), "model": model, "text": text}
+        tmp = self.cache_dir / f".{key}.{uuid.uuid4().hex}.tmp"
+        tmp.write_text(json.dumps(entry, ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp, self._path(key))
+        self._count("writes")
+        self.evict(keep=key)
+        return True
+
+    def evict(self, keep: str | None = None) -> int:
+        """Borra entradas caducadas y, si hace falta, las menos usadas hasta `max_bytes`."""
+        if not self.cache_dir.exists():
+            return 0
+        now = time.time()
+        entries = []
+        for path in self.cache_dir.glob("*.json"):
+            try:
+                st = path.stat()
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for mtime, size, path in sorted(entries):
+            if path.stem == keep:
+                continue
+            # mtime >= created_at: si ni el ultimo uso cae dentro del TTL, esta caducada.
+            if total <= self.max_bytes and now - mtime <= self.ttl_s:
+                continue
+            path.unlink(missing_ok=True)
+            total -= size
+            removed += 1
+        if removed:
+            self._count("evictions", removed)
+        return removed
+
+    def clear(self) -> None:
+        for path in self.cache_dir.glob("*.json"):
+            path.unlink(missing_ok=True)
+
+
+_default_cache = LLMCache()
+
+
+def get_llm_cache() -> LLMCache:
+    """Cache usada por `llm_summary` cuando no se indica otra."""
+    return _default_cache
+
+
+def set_llm_cache(cache: LLMCache) -> None:
+    """Sustituye la cache por defecto (otra carpeta, TTL o desactivada)."""
+    global _default_cache
+    _default_cache = cache
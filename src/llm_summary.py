@@ -1,54 +1,487 @@
 from __future__ import annotations
 
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from email.utils import parsedate_to_datetime
+from pathlib import Path
 import json
 import os
+import random
+import threading
+import time
+from queue import Queue
+from typing import TYPE_CHECKING, Callable, Iterator
 
+import numpy as np
 import pandas as pd
-import requests
 
+from .llm_cache import INCOMPLETE_MARKER, UNAVAILABLE_PREFIX, get_llm_cache
 
-def _table_text(df: pd.DataFrame, cols: list[str]) -> str:
-    """Convierte un subconjunto de columnas a texto plano para el prompt."""
+if TYPE_CHECKING:
+    import requests
+
+
+_session: requests.Session | None = None
+_session_lock = threading.Lock()
+
+
+def _get_session() -> requests.Session:
+    """Sesion HTTP compartida (keep-alive) para todas las llamadas a Gemini."""
+    # requests se importa aqui y no al cargar el modulo: solo lo paga quien llama a Gemini.
+    import requests
+
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=16)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _session = session
+        return _session
+
+
+def _cell_text(value, decimals: int) -> str:
+    if isinstance(value, (float, np.floating)):
+        if np.isnan(value):
+            return "NA"
+        text = f"{value:.{decimals}f}".rstrip("0").rstrip(".")
+        return "0" if text in ("-0", "") else text
+    if value is None or value is pd.NA:
+        return "NA"
+    return str(value).replace("|", "/").strip()
+
+
+def _table_text(df: pd.DataFrame, cols: list[str], decimals: int = 2) -> str:
+    """Tabla compacta para el prompt: cabecera + una fila por ticker separada por '|'.
+
+    Los floats se redondean a `decimals` y sin ceros sobrantes; frente a
+    `to_string()` ahorra el relleno de espacios y los decimales que el modelo no
+    necesita.
+    """
     present = [c for c in cols if c in df.columns]
-    return df[present].to_string()
+    lines = ["|".join(["ticker", *present])]
+    for ticker, row in zip(df.index, df[present].itertuples(index=False, name=None)):
+        lines.append("|".join([str(ticker), *(_cell_text(v, decimals) for v in row)]))
+    return "\n".join(lines)
 
 
-def _gemini_generate(prompt: str, model: str, timeout_s: int = 180) -> str:
-    """Llama a Gemini API y devuelve texto o un mensaje de error controlado."""
-    api_key = os.getenv("GEMINI_API_KEY")
-    if not api_key:
-        return (
-            "Resumen no disponible. Falta GEMINI_API_KEY en el entorno."
-        )
+def _ticker_list(df: pd.DataFrame) -> str:
+    return ", ".join(str(t) for t in df.index)
+
+
+GEMINI_API_URL = "https://generativelanguage.googleapis.com/v1beta"
+GENERATION_CONFIG = {"temperature": 0}
+USAGE_FILENAME = "llm_usage.json"
+
+
+@dataclass
+class LLMUsage:
+    """Tokens de una llamada segun `usageMetadata` de Gemini (0 si viene de cache).
+
+    `error` queda a None solo si la respuesta llego completa.
+    """
+
+    prompt_chars: int = 0
+    prompt_tokens: int = 0
+    output_tokens: int = 0
+    total_tokens: int = 0
+    cached: bool = False
+    error: str | None = None
+
+    def read(self, data: dict) -> None:
+        meta = data.get("usageMetadata") or {}
+        if meta:
+            self.prompt_tokens = int(meta.get("promptTokenCount", 0))
+            self.output_tokens = int(meta.get("candidatesTokenCount", 0))
+            self.total_tokens = int(meta.get("totalTokenCount", 0))
+
+
+def _api_url() -> str:
+    """URL base de la API; GEMINI_BASE_URL permite apuntar a un servidor local de pruebas."""
+    return (os.getenv("GEMINI_BASE_URL") or GEMINI_API_URL).rstrip("/")
+
+
+def _model_name(model: str) -> str:
     model_name = model.strip()
     if model_name.startswith("models/"):
         model_name = model_name[len("models/") :]
-    payload = {
-        "contents": [{"role": "user", "parts": [{"text": prompt}]}],
-        "generationConfig": {"temperature": 0},
-    }
+    return model_name
+
+
+def _unavailable(usage: LLMUsage, reason: str) -> str:
+    """Mensaje de error controlado; anota el motivo en `usage`."""
+    usage.error = reason
+    return f"{UNAVAILABLE_PREFIX}. {reason}"
+
+
+def _payload(prompt: str) -> str:
+    return json.dumps(
+        {
+            "contents": [{"role": "user", "parts": [{"text": prompt}]}],
+            "generationConfig": GENERATION_CONFIG,
+        }
+    )
+
+
+def _chunk_text(data: dict) -> str:
+    """Texto de un evento de streaming (todas las partes del primer candidato)."""
+    candidates = data.get("candidates") or []
+    if not candidates:
+        return ""
+    parts = candidates[0].get("content", {}).get("parts", [])
+    return "".join(str(p.get("text", "")) for p in parts)
+
+
+RETRYABLE_STATUS = frozenset({408, 429, 500, 502, 503, 504})
+DEFAULT_RPM = 10
+DEFAULT_TPM = 250_000
+
+
+class TokenBucket:
+    """Cubo de fichas: rafaga de hasta `capacity` y reposicion continua a `rate_per_s`.
+
+    `reserve` descuenta siempre y devuelve la espera necesaria; el saldo puede
+    quedar negativo, asi que las reservas se atienden en orden de llegada.
+    """
+
+    def __init__(self, capacity: float, rate_per_s: float, clock: Callable[[], float] = time.monotonic) -> None:
+        self.capacity = float(capacity)
+        self.rate_per_s = float(rate_per_s)
+        self._clock = clock
+        self._level = float(capacity)
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self) -> None:
+        now = self._clock()
+        self._level = min(self.capacity, self._level + (now - self._updated) * self.rate_per_s)
+        self._updated = now
+
+    def reserve(self, n: float) -> float:
+        with self._lock:
+            self._refill()
+            # Una peticion mayor que la capacidad nunca cabria: se limita a un cubo lleno.
+            self._level -= min(float(n), self.capacity)
+            return 0.0 if self._level >= 0 else -self._level / self.rate_per_s
+
+    def refund(self, n: float) -> None:
+        with self._lock:
+            self._refill()
+            self._level = min(self.capacity, self._level + float(n))
+
+
+class RateLimiter:
+    """Limites de peticiones y de tokens por minuto (dos cubos de fichas)."""
+
+    def __init__(self, rpm: float = DEFAULT_RPM, tpm: float = DEFAULT_TPM) -> None:
+        self.requests = TokenBucket(rpm, rpm / 60.0)
+        self.tokens = TokenBucket(tpm, tpm / 60.0)
+
+    def acquire(self, tokens: int) -> float:
+        """Bloquea hasta poder enviar una peticion de ~`tokens`. Devuelve la espera."""
+        wait = max(self.requests.reserve(1), self.tokens.reserve(tokens))
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    def settle(self, estimated: int, actual: int) -> None:
+        """Corrige la reserva de tokens con el consumo real informado por Gemini."""
+        if actual <= 0:
+            return
+        if actual < estimated:
+            self.tokens.refund(estimated - actual)
+        elif actual > estimated:
+            self.tokens.reserve(actual - estimated)
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    """Backoff exponencial con jitter completo; `Retry-After` tiene prioridad."""
+
+    max_retries: int = 4
+    base_delay_s: float = 1.0
+    max_delay_s: float = 60.0
+
+    def delay(self, attempt: int, retry_after: float | None = None) -> float:
+        if retry_after is not None:
+            return min(max(retry_after, 0.0), self.max_delay_s * 5)
+        return random.uniform(0.0, min(self.max_delay_s, self.base_delay_s * 2**attempt))
+
+
+def _retry_after_s(value: str | None) -> float | None:
+    """Segundos de una cabecera Retry-After (numero o fecha HTTP)."""
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, when.timestamp() - time.time())
+
+
+class LLMScheduler:
+    """Cola de llamadas a Gemini bajo limites RPM/TPM compartidos, con reintentos.
+
+    Todas las llamadas de `llm_summary` pasan por `post`, que espera turno en el
+    `RateLimiter` y reintenta 408/429/5xx y errores de red. `submit` encola
+    trabajos en un pool acotado: con varias peticiones en vuelo el cuello de
+    botella pasa a ser la cuota, no la latencia de cada llamada.
+    """
+
+    def __init__(
+        self,
+        rpm: float = DEFAULT_RPM,
+        tpm: float = DEFAULT_TPM,
+        max_concurrency: int = 4,
+        retry: RetryPolicy = RetryPolicy(),
+        expected_output_tokens: int = 1024,
+    ) -> None:
+        self.limiter = RateLimiter(rpm, tpm)
+        self.retry = retry
+        self.max_concurrency = max(1, max_concurrency)
+        self.expected_output_tokens = expected_output_tokens
+        self._pool: ThreadPoolExecutor | None = None
+        self._lock = threading.Lock()
+        self._stats = {"requests": 0, "retries": 0, "throttled_s": 0.0}
+
+    def estimate_tokens(self, prompt: str) -> int:
+        """Estimacion previa (~4 caracteres por token + salida esperada)."""
+        return len(prompt) // 4 + self.expected_output_tokens
+
+    def stats(self) -> dict[str, float]:
+        with self._lock:
+            return dict(self._stats)
+
+    def _count(self, key: str, value: float = 1) -> None:
+        with self._lock:
+            self._stats[key] += value
+
+    def post(
+        self,
+        url: str,
+        data: str,
+        tokens: int,
+        timeout_s: float,
+        stream: bool = False,
+        api_key: str | None = None,
+    ) -> requests.Response:
+        """POST con espera de cuota y reintentos; devuelve la respuesta 2xx o lanza."""
+        import requests
+
+        headers = {"Content-Type": "application/json"}
+        if api_key:
+            # En cabecera y no en la URL: asi la clave no aparece en los mensajes de error.
+            headers["x-goog-api-key"] = api_key
+        attempt = 0
+        while True:
+            self._count("throttled_s", self.limiter.acquire(tokens))
+            self._count("requests")
+            try:
+                resp = _get_session().post(
+                    url,
+                    data=data,
+                    headers=headers,
+                    timeout=timeout_s,
+                    stream=stream,
+                )
+            except (requests.ConnectionError, requests.Timeout):
+                if attempt >= self.retry.max_retries:
+                    raise
+                retry_after = None
+            else:
+                if resp.status_code not in RETRYABLE_STATUS or attempt >= self.retry.max_retries:
+                    if resp.status_code >= 400:
+                        resp.close()
+                    resp.raise_for_status()
+                    return resp
+                retry_after = _retry_after_s(resp.headers.get("Retry-After"))
+                resp.close()
+            self._count("retries")
+            time.sleep(self.retry.delay(attempt, retry_after))
+            attempt += 1
+
+    def submit(self, fn: Callable[..., object], *args, **kwargs) -> Future:
+        """Encola `fn(*args, **kwargs)` en el pool compartido (FIFO)."""
+        with self._lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix="llm")
+            pool = self._pool
+        return pool.submit(fn, *args, **kwargs)
+
+    def shutdown(self) -> None:
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=True)
+
+
+_scheduler: LLMScheduler | None = None
+
+
+def get_llm_scheduler() -> LLMScheduler:
+    """Planificador compartido; limites desde GEMINI_RPM / GEMINI_TPM si existen."""
+    global _scheduler
+    with _session_lock:
+        if _scheduler is None:
+            _scheduler = LLMScheduler(
+                rpm=float(os.getenv("GEMINI_RPM", DEFAULT_RPM)),
+                tpm=float(os.getenv("GEMINI_TPM", DEFAULT_TPM)),
+            )
+        return _scheduler
+
+
+def set_llm_scheduler(scheduler: LLMScheduler) -> None:
+    """Sustituye el planificador compartido (otros limites o reintentos)."""
+    global _scheduler
+    with _session_lock:
+        _scheduler = scheduler
+
+
+def _gemini_generate(
+    prompt: str,
+    model: str,
+    timeout_s: int = 180,
+    use_cache: bool = True,
+    usage: LLMUsage | None = None,
+) -> str:
+    """Llama a Gemini API y devuelve texto o un mensaje de error controlado.
+
+    Con `use_cache` se consulta antes la cache en disco (ver `llm_cache`); los
+    mensajes de error nunca se guardan. Si se pasa `usage`, se rellena con los
+    tokens que informa Gemini.
+    """
+    usage = usage if usage is not None else LLMUsage()
+    usage.prompt_chars = len(prompt)
+    model_name = _model_name(model)
+    cache = get_llm_cache() if use_cache else None
+    cache_key = cache.key(model_name, prompt, GENERATION_CONFIG) if cache else None
+    if cache is not None:
+        cached = cache.get(cache_key)
+        if cached is not None:
+            usage.cached = True
+            return cached
+
+    api_key = os.getenv("GEMINI_API_KEY")
+    if not api_key:
+        return _unavailable(usage, "Falta GEMINI_API_KEY en el entorno.")
+    scheduler = get_llm_scheduler()
+    tokens = scheduler.estimate_tokens(prompt)
     try:
-        resp = requests.post(
-            f"https://generativelanguage.googleapis.com/v1beta/models/{model_name}:generateContent?key={api_key}",
-            data=json.dumps(payload),
-            headers={"Content-Type": "application/json"},
-            timeout=timeout_s,
+        resp = scheduler.post(
+            f"{_api_url()}/models/{model_name}:generateContent",
+            _payload(prompt),
+            tokens,
+            timeout_s,
+            api_key=api_key,
         )
-        resp.raise_for_status()
         data = resp.json()
+        usage.read(data)
+        scheduler.limiter.settle(tokens, usage.total_tokens)
         candidates = data.get("candidates", [])
         if not candidates:
-            return "Resumen no disponible. Gemini no devolvio candidatos."
+            return _unavailable(usage, "Gemini no devolvio candidatos.")
         parts = candidates[0].get("content", {}).get("parts", [])
         if not parts:
-            return "Resumen no disponible. Gemini no devolvio texto."
-        return str(parts[0].get("text", "")).strip()
+            return _unavailable(usage, "Gemini no devolvio texto.")
+        text = str(parts[0].get("text", "")).strip()
     except Exception as exc:
-        return f"Resumen no disponible. Error al invocar Gemini: {exc}"
+        return _unavailable(usage, f"Error al invocar Gemini: {exc}")
+    if not text:
+        return _unavailable(usage, "Gemini no devolvio texto.")
+    if cache is not None:
+        cache.put(cache_key, text, model=model_name)
+    return text
 
 
-def generate_analysis_ibex(df: pd.DataFrame, model: str, timeout_s: int = 180) -> str:
-    """Genera un resumen ejecutivo (top/bottom) usando solo datos internos."""
+def _gemini_stream(
+    prompt: str,
+    model: str,
+    timeout_s: int = 180,
+    use_cache: bool = True,
+    usage: LLMUsage | None = None,
+) -> Iterator[str]:
+    """Como `_gemini_generate`, pero devuelve el texto a trozos segun llega (SSE).
+
+    Un acierto de cache se emite de una vez. Los errores se emiten como texto
+    ("Resumen no disponible..." o una nota de respuesta incompleta), se anotan
+    en `usage.error` y en ese caso no se guarda nada en cache. `usage` toma el
+    ultimo `usageMetadata` del stream (es acumulado).
+    """
+    usage = usage if usage is not None else LLMUsage()
+    usage.prompt_chars = len(prompt)
+    model_name = _model_name(model)
+    cache = get_llm_cache() if use_cache else None
+    cache_key = cache.key(model_name, prompt, GENERATION_CONFIG) if cache else None
+    if cache is not None:
+        cached = cache.get(cache_key)
+        if cached is not None:
+            usage.cached = True
+            yield cached
+            return
+
+    api_key = os.getenv("GEMINI_API_KEY")
+    if not api_key:
+        yield _unavailable(usage, "Falta GEMINI_API_KEY en el entorno.")
+        return
+
+    scheduler = get_llm_scheduler()
+    tokens = scheduler.estimate_tokens(prompt)
+    chunks: list[str] = []
+    try:
+        with scheduler.post(
+            f"{_api_url()}/models/{model_name}:streamGenerateContent?alt=sse",
+            _payload(prompt),
+            tokens,
+            timeout_s,
+            stream=True,
+            api_key=api_key,
+        ) as resp:
+            event: list[str] = []
+            # Cada evento SSE son lineas "data: ..." terminadas en linea vacia;
+            # chunk_size=None entrega los bytes segun llegan, sin esperar a llenar un bufer.
+            for line in resp.iter_lines(chunk_size=None, decode_unicode=True):
+                if line:
+                    if line.startswith("data:"):
+                        event.append(line[5:].strip())
+                    continue
+                if event:
+                    data = json.loads("\n".join(event))
+                    event = []
+                    usage.read(data)
+                    text = _chunk_text(data)
+                    if text:
+                        chunks.append(text)
+                        yield text
+            if event:
+                data = json.loads("\n".join(event))
+                usage.read(data)
+                text = _chunk_text(data)
+                if text:
+                    chunks.append(text)
+                    yield text
+        scheduler.limiter.settle(tokens, usage.total_tokens)
+    except Exception as exc:
+        if chunks:
+            usage.error = f"Respuesta incompleta: {exc}"
+            yield f"\n\n[{INCOMPLETE_MARKER}. Error al invocar Gemini: {exc}]"
+        else:
+            yield _unavailable(usage, f"Error al invocar Gemini: {exc}")
+        return
+    if not chunks:
+        yield _unavailable(usage, "Gemini no devolvio texto.")
+        return
+    if cache is not None:
+        cache.put(cache_key, "".join(chunks).strip(), model=model_name)
+
+
+def build_analysis_prompt(df: pd.DataFrame) -> str:
+    """Prompt del resumen ejecutivo (top/bottom)."""
     cols = [
         "return_pct",
         "vol_pct",
@@ -71,18 +504,17 @@ def generate_analysis_ibex(df: pd.DataFrame, model: str, timeout_s: int = 180) -
         "5. Anade 1-2 limitaciones del analisis.\n"
         "Formato de salida: titulos breves + parrafo final.\n"
         "No infieras causalidad ni uses informacion externa.\n\n"
-        "Top 5 por rentabilidad:\n"
-        f"{_table_text(top5, cols)}\n\n"
-        "Bottom 5 por rentabilidad:\n"
-        f"{_table_text(bottom5, cols)}\n\n"
-        "Tabla completa:\n"
+        # Top/bottom solo por ticker: sus filas ya estan en la tabla completa.
+        f"Top 5 por rentabilidad: {_ticker_list(top5)}\n"
+        f"Bottom 5 por rentabilidad: {_ticker_list(bottom5)}\n\n"
+        "Tabla completa (separador |, metricas en %):\n"
         f"{table_text}\n"
     )
-    return _gemini_generate(prompt, model=model, timeout_s=timeout_s)
+    return prompt
 
 
-def generate_sector_comparison(df: pd.DataFrame, model: str, timeout_s: int = 180) -> str:
-    """Genera comparativas por sectores usando solo la tabla interna."""
+def build_sector_prompt(df: pd.DataFrame) -> str:
+    """Prompt de la comparativa por sectores."""
     prompt = (
         "Actua como analista financiero preparando una comparativa interna.\n"
         "Input: tabla de metricas 2025 del IBEX 35 (rentabilidad, volatilidad, drawdown).\n"
@@ -93,18 +525,14 @@ def generate_sector_comparison(df: pd.DataFrame, model: str, timeout_s: int = 18
         "Formato: tabla comparativa + 3 bullets de sintesis.\n"
         "No uses datos externos ni conclusiones causales.\n"
         "Incluye 1 limitacion del analisis.\n\n"
-        "Tabla completa:\n"
+        "Tabla completa (separador |, metricas en %):\n"
         f"{_table_text(df, ['sector', 'return_pct', 'vol_pct', 'max_drawdown_pct'])}\n"
     )
-    return _gemini_generate(prompt, model=model, timeout_s=timeout_s)
+    return prompt
 
 
-def generate_portfolio_suggestion(
-    df: pd.DataFrame,
-    model: str,
-    timeout_s: int = 180,
-) -> str:
-    """Pide al LLM una propuesta de 5 valores con pesos fijos del 20%."""
+def build_portfolio_prompt(df: pd.DataFrame) -> str:
+    """Prompt de la propuesta de 5 valores con pesos fijos del 20%."""
     prompt = (
         "Actua como gestor de inversiones preparando una propuesta preliminar.\n"
         "Input: metricas 2025 del IBEX 35 (rentabilidad, volatilidad, drawdown).\n"
@@ -120,10 +548,30 @@ def generate_portfolio_suggestion(
         "A) Tabla Seleccion (5 filas): | Ticker | Sector | Return_Pct | Vol_Pct | Max_Drawdown_Pct | Score |\n"
         "B) Tabla Pesos (6 filas): | Ticker | Peso (%) | y ultima fila TOTAL = 100%.\n"
         "C) Justificacion breve (3-5 lineas) explicando por que esos 5 equilibran rentabilidad/riesgo y diversificacion.\n\n"
-        "Tabla completa:\n"
+        "Tabla completa (separador |, metricas en %):\n"
         f"{_table_text(df, ['sector', 'return_pct', 'vol_pct', 'max_drawdown_pct', 'score'])}\n"
     )
-    return _gemini_generate(prompt, model=model, timeout_s=timeout_s)
+    return prompt
+
+
+def generate_analysis_ibex(df: pd.DataFrame, model: str, timeout_s: int = 180, use_cache: bool = True) -> str:
+    """Genera un resumen ejecutivo (top/bottom) usando solo datos internos."""
+    return _gemini_generate(build_analysis_prompt(df), model=model, timeout_s=timeout_s, use_cache=use_cache)
+
+
+def generate_sector_comparison(df: pd.DataFrame, model: str, timeout_s: int = 180, use_cache: bool = True) -> str:
+    """Genera comparativas por sectores usando solo la tabla interna."""
+    return _gemini_generate(build_sector_prompt(df), model=model, timeout_s=timeout_s, use_cache=use_cache)
+
+
+def generate_portfolio_suggestion(
+    df: pd.DataFrame,
+    model: str,
+    timeout_s: int = 180,
+    use_cache: bool = True,
+) -> str:
+    """Pide al LLM una propuesta de 5 valores con pesos fijos del 20%."""
+    return _gemini_generate(build_portfolio_prompt(df), model=model, timeout_s=timeout_s, use_cache=use_cache)
 
 
 def join_sections(sections: list[tuple[str, str]]) -> str:
@@ -136,11 +584,159 @@ def join_sections(sections: list[tuple[str, str]]) -> str:
     return "\n".join(parts).strip()
 
 
-def generate_summary(df: pd.DataFrame, model: str, timeout_s: int = 180) -> str:
-    """Genera el resumen unificado (analisis, sectores y cartera)."""
-    sections = [
-        ("Analisis general", generate_analysis_ibex(df, model=model, timeout_s=timeout_s)),
-        ("Comparativa por sectores", generate_sector_comparison(df, model=model, timeout_s=timeout_s)),
-        ("Sugerencia de cartera", generate_portfolio_suggestion(df, model=model, timeout_s=timeout_s)),
+@dataclass
+class SectionResult:
+    """Texto de una seccion LLM, lo que tardo en generarse y sus tokens.
+
+    `error` es None si Gemini devolvio la respuesta completa; en otro caso
+    `text` lleva el mensaje de error o el texto parcial con una nota.
+    `finished_at` es el `time.perf_counter()` al terminar.
+    """
+
+    title: str
+    text: str
+    elapsed_s: float
+    usage: LLMUsage = field(default_factory=LLMUsage)
+    first_chunk_s: float | None = None
+    error: str | None = None
+    finished_at: float | None = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+SUMMARY_SECTIONS: tuple[tuple[str, Callable[[pd.DataFrame], str]], ...] = (
+    ("Analisis general", build_analysis_prompt),
+    ("Comparativa por sectores", build_sector_prompt),
+    ("Sugerencia de cartera", build_portfolio_prompt),
+)
+
+
+def generate_section(
+    title: str,
+    prompt: str,
+    model: str,
+    timeout_s: int = 180,
+    use_cache: bool = True,
+) -> SectionResult:
+    """Genera una seccion y mide su tiempo y sus tokens."""
+    t0 = time.perf_counter()
+    usage = LLMUsage()
+    text = _gemini_generate(prompt, model=model, timeout_s=timeout_s, use_cache=use_cache, usage=usage)
+    t1 = time.perf_counter()
+    return SectionResult(title, text, t1 - t0, usage, error=usage.error, finished_at=t1)
+
+
+def generate_sections(
+    df: pd.DataFrame,
+    model: str,
+    timeout_s: int = 180,
+    use_cache: bool = True,
+) -> list[SectionResult]:
+    """Genera las secciones en paralelo en la cola del planificador compartido.
+
+    Los prompts son independientes, asi que el tiempo total pasa a ser el de la
+    seccion mas lenta; la concurrencia y las cuotas RPM/TPM son las de
+    `get_llm_scheduler()`, comunes a CLI, app y batch. El resultado mantiene el
+    orden de `SUMMARY_SECTIONS`.
+    """
+    scheduler = get_llm_scheduler()
+    futures = [
+        scheduler.submit(generate_section, title, build(df), model, timeout_s, use_cache)
+        for title, build in SUMMARY_SECTIONS
     ]
-    return join_sections(sections)
+    return [f.result() for f in futures]
+
+
+@dataclass
+class StreamEvent:
+    """Trozo de texto de una seccion en streaming.
+
+    `index` es la posicion en `SUMMARY_SECTIONS`. El ultimo evento de cada
+    seccion llega con `done=True`, `chunk` vacio, el texto completo en `text` y
+    los tokens en `usage` (`usage.error` indica si la seccion fallo).
+    """
+
+    index: int
+    title: str
+    chunk: str
+    elapsed_s: float
+    done: bool = False
+    text: str = ""
+    usage: LLMUsage | None = None
+
+
+def stream_sections(
+    df: pd.DataFrame,
+    model: str,
+    timeout_s: int = 180,
+    use_cache: bool = True,
+) -> Iterator[StreamEvent]:
+    """Genera las secciones en paralelo y emite los trozos en cuanto llegan.
+
+    Cada seccion corre en el pool del planificador compartido con
+    `_gemini_stream` y publica en una cola comun; este generador la vacia en el
+    hilo que llama (p. ej. Streamlit).
+    """
+    events: Queue[StreamEvent] = Queue()
+
+    def run(index: int, title: str, build: Callable[[pd.DataFrame], str]) -> None:
+        t0 = time.perf_counter()
+        chunks: list[str] = []
+        usage = LLMUsage()
+        try:
+            prompt = build(df)
+            for chunk in _gemini_stream(prompt, model=model, timeout_s=timeout_s, use_cache=use_cache, usage=usage):
+                chunks.append(chunk)
+                events.put(StreamEvent(index, title, chunk, time.perf_counter() - t0))
+        except BaseException as exc:
+            usage.error = usage.error or f"{type(exc).__name__}: {exc}"
+            raise
+        finally:
+            # Siempre cerramos la seccion para no bloquear al consumidor.
+            text = "".join(chunks).strip()
+            events.put(StreamEvent(index, title, "", time.perf_counter() - t0, True, text, usage))
+
+    scheduler = get_llm_scheduler()
+    futures = [scheduler.submit(run, i, title, build) for i, (title, build) in enumerate(SUMMARY_SECTIONS)]
+    pending = len(futures)
+    while pending:
+        event = events.get()
+        pending -= event.done
+        yield event
+    for f in futures:
+        f.result()  # propaga errores inesperados (p. ej. al construir el prompt)
+
+
+def write_usage_log(sections: list[SectionResult], model: str, run_dir: str | Path) -> Path:
+    """Guarda tokens y latencias por seccion en `<run_dir>/llm_usage.json`."""
+    records = []
+    for section in sections:
+        records.append(
+            {
+                "section": section.title,
+                "elapsed_s": round(section.elapsed_s, 3),
+                "first_chunk_s": None if section.first_chunk_s is None else round(section.first_chunk_s, 3),
+                **asdict(section.usage),
+            }
+        )
+    payload = {
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "model": _model_name(model),
+        "sections": records,
+        "totals": {
+            key: sum(r[key] for r in records)
+            for key in ("prompt_chars", "prompt_tokens", "output_tokens", "total_tokens")
+        },
+    }
+    path = Path(run_dir) / USAGE_FILENAME
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(payload, indent=2, ensure_ascii=False), encoding="utf-8")
+    return path
+
+
+def generate_summary(df: pd.DataFrame, model: str, timeout_s: int = 180, use_cache: bool = True) -> str:
+    """Genera el resumen unificado (analisis, sectores y cartera)."""
+    results = generate_sections(df, model=model, timeout_s=timeout_s, use_cache=use_cache)
+    return join_sections([(r.title, r.text) for r in results])
@@ -39,8 +39,97 @@ def max_drawdown_pct(prices: pd.Series) -> float:
     return float(mdd * 100.0)
 
 
+def _ffill_matrix(values: np.ndarray) -> np.ndarray:
+    """Rellena hacia delante cada columna con el ultimo precio valido."""
+    valid = ~np.isnan(values)
+    if valid.all():
+        return values.copy()
+    rows = np.where(valid, np.arange(values.shape[0])[:, None], 0)
+    np.maximum.accumulate(rows, axis=0, out=rows)
+    filled = np.take_along_axis(values, rows, axis=0)
+    # Antes del primer dato valido no hay nada que arrastrar.
+    filled[~np.logical_or.accumulate(valid, axis=0)] = np.nan
+    return filled
+
+
+def _log_returns_matrix(values: np.ndarray) -> np.ndarray:
+    """Log-retornos entre observaciones validas consecutivas (NaN donde no hay)."""
+    rets = np.full(values.shape, np.nan)
+    if values.shape[0] < 2:
+        return rets
+    with np.errstate(divide="ignore", invalid="ignore"):
+        logs = np.log(values)
+    filled = _ffill_matrix(logs)
+    with np.errstate(invalid="ignore"):
+        np.subtract(logs[1:], filled[:-1], out=rets[1:])
+    return rets
+
+
+def _metrics_arrays(values: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Calcula rentabilidad, volatilidad y drawdown (en %) para una matriz fechas x tickers.
+
+    Replica columna a columna la semantica de `annual_return_pct`,
+    `annualized_vol_pct` y `max_drawdown_pct` (los NaN intermedios se saltan
+    igual que con `dropna()`), pero en unas pocas pasadas sobre el array.
+    """
+    values = np.asarray(values, dtype=float)
+    n_rows, n_cols = values.shape
+    if n_rows == 0:
+        # Sin fechas (hoja vacia o todo filtrado): igual que el bucle, todo NaN.
+        return np.full(n_cols, np.nan), np.full(n_cols, np.nan), np.full(n_cols, np.nan)
+    valid = ~np.isnan(values)
+    n_prices = valid.sum(axis=0)
+    enough = n_prices >= 2
+
+    # Rentabilidad: primer y ultimo precio valido de cada columna.
+    first_idx = np.argmax(valid, axis=0)
+    last_idx = n_rows - 1 - np.argmax(valid[::-1], axis=0)
+    cols = np.arange(n_cols)
+    first = values[first_idx, cols]
+    last = values[last_idx, cols]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ret = (last - first) / first * 100.0
+    ret[~enough | (first == 0)] = np.nan
+
+    # Volatilidad: desviacion tipica (ddof=1) de log-retornos en dos pasadas.
+    rets = _log_returns_matrix(values)
+    rets_valid = ~np.isnan(rets)
+    n_rets = rets_valid.sum(axis=0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mean = np.where(rets_valid, rets, 0.0).sum(axis=0) / n_rets
+        dev = np.where(rets_valid, rets - mean, 0.0)
+        var = (dev * dev).sum(axis=0) / (n_rets - 1)
+    vol = np.sqrt(var) * np.sqrt(TRADING_DAYS) * 100.0
+    vol[n_rets < 2] = np.nan
+
+    # Drawdown: maximo acumulado ignorando NaN y minimo relativo.
+    peak = np.fmax.accumulate(values, axis=0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        drawdown = values / peak - 1.0
+    all_nan = ~(~np.isnan(drawdown)).any(axis=0)
+    mdd = np.full(n_cols, np.nan)
+    mdd[~all_nan] = np.nanmin(drawdown[:, ~all_nan], axis=0) * 100.0
+    mdd[~enough] = np.nan
+
+    return ret, vol, mdd
+
+
 def compute_metrics(prices_df: pd.DataFrame) -> pd.DataFrame:
-    """Calcula metricas por ticker a partir del DataFrame de precios."""
+    """Calcula metricas por ticker a partir del DataFrame de precios.
+
+    Version vectorizada: procesa toda la matriz de precios de una vez y
+    coincide con `compute_metrics_loop` (tolerancia 1e-9).
+    """
+    ret, vol, mdd = _metrics_arrays(prices_df.to_numpy(dtype=float, na_value=np.nan))
+    out = pd.DataFrame(
+        {"return_pct": ret, "vol_pct": vol, "max_drawdown_pct": mdd},
+        index=pd.Index(prices_df.columns, name="ticker"),
+    )
+    return out
+
+
+def compute_metrics_loop(prices_df: pd.DataFrame) -> pd.DataFrame:
+    """Version de referencia por ticker (bucle), util para validar y comparar."""
     rows = []
     for col in prices_df.columns:
         p = prices_df[col]
@@ -53,3 +142,300 @@ def compute_metrics(prices_df: pd.DataFrame) -> pd.DataFrame:
             }
         )
     return pd.DataFrame(rows).set_index("ticker")
+
+
+DEFAULT_HORIZONS = ("1M", "3M", "6M", "YTD", "1Y")
+
+_OFFSET_UNITS = {"D": "days", "W": "weeks", "M": "months", "Y": "years"}
+
+
+def horizon_bounds(
+    index: pd.DatetimeIndex,
+    horizons: tuple[str, ...] = DEFAULT_HORIZONS,
+    calendar_years: bool = True,
+) -> dict[str, tuple[int, int]]:
+    """Traduce horizontes a posiciones de fila [inicio, fin] (ambas inclusive).
+
+    Horizontes moviles: "<n>D", "<n>W", "<n>M", "<n>Y" (hasta la ultima fecha,
+    con la fecha de arranque incluida) y "YTD". Con `calendar_years` se anade un
+    horizonte por cada anio natural presente en el indice ("2024", "2025", ...).
+    """
+    bounds: dict[str, tuple[int, int]] = {}
+    if len(index) == 0:
+        return bounds
+    end = pd.Timestamp(index[-1])
+    last = len(index) - 1
+    for name in horizons:
+        key = name.upper()
+        if key == "YTD":
+            start = pd.Timestamp(year=end.year, month=1, day=1)
+        elif len(key) >= 2 and key[:-1].isdigit() and key[-1] in _OFFSET_UNITS:
+            start = end - pd.DateOffset(**{_OFFSET_UNITS[key[-1]]: int(key[:-1])})
+        else:
+            raise ValueError(f"Horizonte no reconocido: {name}")
+        bounds[name] = (int(index.searchsorted(start, side="left")), last)
+    if calendar_years:
+        for year in sorted(set(index.year)):
+            a = int(index.searchsorted(pd.Timestamp(year=year, month=1, day=1), side="left"))
+            b = int(index.searchsorted(pd.Timestamp(year=year + 1, month=1, day=1), side="left")) - 1
+            bounds[str(year)] = (a, b)
+    return bounds
+
+
+# Por encima de este numero de pasadas por el historico, el drawdown de varias
+# ventanas se calcula con el esquema movil en lugar de ventana a ventana.
+_DENSE_WINDOWS = 32
+
+
+def _prefix(values: np.ndarray) -> np.ndarray:
+    """Sumas acumuladas con una fila inicial de ceros (sum[a:b] = P[b] - P[a])."""
+    out = np.zeros((values.shape[0] + 1,) + values.shape[1:], dtype=values.dtype)
+    np.cumsum(values, axis=0, out=out[1:])
+    return out
+
+
+def _valid_positions(valid: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Para cada fila: posicion del siguiente y del anterior dato valido por columna."""
+    n_rows = valid.shape[0]
+    rows = np.arange(n_rows, dtype=np.int32)[:, None]
+    nxt = np.where(valid, rows, np.int32(n_rows))
+    nxt = np.minimum.accumulate(nxt[::-1], axis=0)[::-1]
+    prv = np.where(valid, rows, np.int32(-1))
+    prv = np.maximum.accumulate(prv, axis=0)
+    return nxt, prv
+
+
+class _WindowKernel:
+    """Precalculo compartido para evaluar metricas sobre cualquier ventana de filas.
+
+    Con sumas prefijo de log-retornos (y de sus cuadrados) la rentabilidad y la
+    volatilidad de una ventana cuestan O(tickers); el drawdown necesita su
+    propio maximo acumulado y se calcula solo sobre las filas de la ventana.
+    """
+
+    def __init__(self, values: np.ndarray):
+        self.values = np.ascontiguousarray(values, dtype=float)
+        valid = ~np.isnan(self.values)
+        self.cols = np.arange(self.values.shape[1])
+        self.count_prices = _prefix(valid.astype(np.int32))
+        self.nxt, self.prv = _valid_positions(valid)
+
+        rets = _log_returns_matrix(self.values)
+        finite = np.isfinite(rets)
+        # Los retornos +-inf (precios a cero) invalidan la volatilidad de la ventana.
+        self.count_bad = _prefix(np.isinf(rets).astype(np.int32))
+        self.count_rets = _prefix((finite | np.isinf(rets)).astype(np.int32))
+        # Centrar por la media global reduce la cancelacion numerica en S2 - S1^2/n.
+        n_finite = finite.sum(axis=0)
+        center = np.where(finite, rets, 0.0).sum(axis=0) / np.maximum(n_finite, 1)
+        centered = np.where(finite, rets - center, 0.0)
+        self.sum1 = _prefix(centered)
+        self.sum2 = _prefix(centered * centered)
+
+    def _take(self, arr: np.ndarray, pos: np.ndarray) -> np.ndarray:
+        """Toma arr[pos[k, j], j] con un indice plano (mas rapido que el fancy indexing 2D)."""
+        n_cols = arr.shape[1]
+        return arr.ravel().take(pos * n_cols + self.cols)
+
+    def window(self, start: np.ndarray | int, end: np.ndarray | int) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Rentabilidad, volatilidad (en %) y numero de precios para filas [start, end].
+
+        `start`/`end` pueden ser escalares o arrays 1D (una ventana por fila de salida).
+        """
+        scalar = np.ndim(start) == 0 and np.ndim(end) == 0
+        start = np.atleast_1d(np.asarray(start, dtype=np.intp))
+        end = np.atleast_1d(np.asarray(end, dtype=np.intp))
+        n_rows = self.values.shape[0]
+        n_prices = self.count_prices[end + 1] - self.count_prices[start]
+        enough = n_prices >= 2
+
+        first_pos = self.nxt[np.minimum(start, n_rows - 1)].astype(np.intp)
+        last_pos = self.prv[end].astype(np.intp)
+        first = self._take(self.values, np.minimum(first_pos, n_rows - 1))
+        last = self._take(self.values, np.maximum(last_pos, 0))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            ret = (last - first) / first * 100.0
+        ret = np.where(enough & (first != 0), ret, np.nan)
+
+        # Retornos dentro de la ventana: los posteriores al primer precio valido.
+        lo = np.minimum(first_pos, end[:, None]) + 1
+        hi = end + 1
+        n = self.count_rets[hi] - self._take(self.count_rets, lo)
+        bad = self.count_bad[hi] - self._take(self.count_bad, lo)
+        s1 = self.sum1[hi] - self._take(self.sum1, lo)
+        s2 = self.sum2[hi] - self._take(self.sum2, lo)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            var = (s2 - s1 * s1 / n) / (n - 1)
+        vol = np.sqrt(np.maximum(var, 0.0)) * np.sqrt(TRADING_DAYS) * 100.0
+        vol = np.where(enough & (n >= 2) & (bad == 0), vol, np.nan)
+        if scalar:
+            return ret[0], vol[0], n_prices[0]
+        return ret, vol, n_prices
+
+    def drawdown(self, start: int, end: int) -> np.ndarray:
+        """Max drawdown (en %) de las filas [start, end] inclusive."""
+        block = self.values[start:end + 1]
+        if block.shape[0] == 0:
+            return np.full(self.values.shape[1], np.nan)
+        peak = np.fmax.accumulate(block, axis=0)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            mdd = np.fmin.reduce(block / peak - 1.0, axis=0) * 100.0
+        n_prices = (~np.isnan(block)).sum(axis=0)
+        return np.where(n_prices >= 2, mdd, np.nan)
+
+    def drawdowns(self, ends: np.ndarray, window: int) -> np.ndarray:
+        """Max drawdown (en %) de las ventanas de `window` filas que acaban en `ends`.
+
+        Con pocas ventanas (rebalanceos mensuales) cada una se calcula por
+        separado; si entre todas recorren el historico muchas veces, sale mas
+        barato el esquema movil de `_rolling_drawdown` sobre todas las filas.
+        """
+        ends = np.asarray(ends, dtype=np.intp)
+        n_rows, n_cols = self.values.shape
+        if len(ends) * window > _DENSE_WINDOWS * n_rows:
+            dd = _rolling_drawdown(self.values, window)[ends] * 100.0
+            n_prices = self.count_prices[ends + 1] - self.count_prices[np.maximum(ends - window + 1, 0)]
+            return np.where(n_prices >= 2, dd, np.nan)
+        out = np.empty((len(ends), n_cols))
+        for k, end in enumerate(ends):
+            out[k] = self.drawdown(max(int(end) - window + 1, 0), int(end))
+        return out
+
+
+def compute_metrics_horizons(
+    prices_df: pd.DataFrame,
+    horizons: tuple[str, ...] = DEFAULT_HORIZONS,
+    calendar_years: bool = True,
+) -> pd.DataFrame:
+    """Calcula las metricas para varios horizontes reutilizando un unico precalculo.
+
+    Devuelve un DataFrame largo indexado por (horizon, ticker); cada horizonte
+    coincide con `compute_metrics` sobre el tramo de fechas correspondiente.
+    """
+    kernel = _WindowKernel(prices_df.to_numpy(dtype=float, na_value=np.nan))
+    bounds = horizon_bounds(prices_df.index, horizons, calendar_years)
+    tickers = pd.Index(prices_df.columns, name="ticker")
+    frames = []
+    for name, (start, end) in bounds.items():
+        if end < start:
+            ret = vol = mdd = np.full(len(tickers), np.nan)
+        else:
+            ret, vol, _ = kernel.window(start, end)
+            mdd = kernel.drawdown(start, end)
+        frames.append(
+            pd.DataFrame(
+                {"return_pct": ret, "vol_pct": vol, "max_drawdown_pct": mdd},
+                index=tickers,
+            )
+        )
+    if not frames:
+        return pd.DataFrame(
+            columns=["return_pct", "vol_pct", "max_drawdown_pct"],
+            index=pd.MultiIndex.from_arrays([[], []], names=["horizon", "ticker"]),
+        )
+    return pd.concat(frames, keys=list(bounds), names=["horizon", "ticker"])
+
+
+_CHUNK_CELLS = 1 << 18
+
+
+def _rolling_drawdown(values: np.ndarray, window: int) -> np.ndarray:
+    """Max drawdown (fraccion <= 0) en ventanas moviles de `window` filas, en O(T).
+
+    Usa el esquema de bloques de van Herk/Gil-Werman: el drawdown de un tramo se
+    resume en (pico, suelo, mdd) y dos tramos contiguos se combinan como
+    mdd = min(mdd_izq, mdd_der, suelo_der / pico_izq - 1). Con agregados prefijo y
+    sufijo por bloque de tamano `window`, cada ventana es una sola combinacion.
+    """
+    n_rows, n_cols = values.shape
+    n_blocks = -(-n_rows // window)
+    padded = np.full((n_blocks * window, n_cols), np.nan)
+    padded[:n_rows] = values
+    # Disposicion (posicion en bloque, bloque, ticker): cada paso es contiguo.
+    blocks = np.ascontiguousarray(padded.reshape(n_blocks, window, n_cols).transpose(1, 0, 2))
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        # Prefijos dentro de cada bloque (izquierda a derecha).
+        pre_peak = np.fmax.accumulate(blocks, axis=0)
+        pre_trough = np.fmin.accumulate(blocks, axis=0)
+        pre_mdd = np.fmin.accumulate(blocks / pre_peak - 1.0, axis=0)
+        del pre_peak
+
+        # Sufijos dentro de cada bloque (derecha a izquierda).
+        suf_peak = np.fmax.accumulate(blocks[::-1], axis=0)[::-1]
+        suf_mdd = np.where(np.isnan(blocks), np.nan, 0.0)
+        suf_trough = blocks[window - 1].copy()
+        for i in range(window - 2, -1, -1):
+            cross = suf_trough / blocks[i] - 1.0
+            np.fmin(suf_mdd[i], suf_mdd[i + 1], out=suf_mdd[i])
+            np.fmin(suf_mdd[i], cross, out=suf_mdd[i])
+            np.fmin(suf_trough, blocks[i], out=suf_trough)
+
+        def _rows(arr: np.ndarray) -> np.ndarray:
+            return arr.transpose(1, 0, 2).reshape(-1, n_cols)
+
+        pre_trough = _rows(pre_trough)
+        pre_mdd = _rows(pre_mdd)
+        suf_peak = _rows(suf_peak)
+        suf_mdd = _rows(suf_mdd)
+
+        out = np.full((n_rows, n_cols), np.nan)
+        ends = np.arange(window - 1, n_rows)
+        starts = ends - window + 1
+        aligned = (starts % window == 0)[:, None]
+        combined = np.fmin(
+            np.fmin(suf_mdd[starts], pre_mdd[ends]),
+            pre_trough[ends] / suf_peak[starts] - 1.0,
+        )
+        out[ends] = np.where(aligned, pre_mdd[ends], combined)
+    return out
+
+
+def rolling_metrics(prices_df: pd.DataFrame, window: int = 63) -> dict[str, pd.DataFrame]:
+    """Rentabilidad, volatilidad y max drawdown moviles (ventanas de `window` filas).
+
+    Cada valor en la fecha t coincide con `compute_metrics` sobre las `window`
+    filas que terminan en t; las primeras `window - 1` fechas quedan a NaN.
+    Coste O(T x tickers): sumas prefijo para rentabilidad/volatilidad y bloques
+    prefijo/sufijo para el drawdown (sin `cummax` por ventana).
+    """
+    if window < 2:
+        raise ValueError("La ventana debe tener al menos 2 filas.")
+    values = prices_df.to_numpy(dtype=float, na_value=np.nan)
+    n_rows, n_cols = values.shape
+    ret = np.full((n_rows, n_cols), np.nan)
+    vol = np.full((n_rows, n_cols), np.nan)
+    mdd = np.full((n_rows, n_cols), np.nan)
+    if n_rows >= window:
+        kernel = _WindowKernel(values)
+        rolling_dd = _rolling_drawdown(values, window)
+        # Por tramos de filas para acotar los temporales (K x tickers).
+        step = max(1, _CHUNK_CELLS // max(n_cols, 1))
+        for lo in range(window - 1, n_rows, step):
+            ends = np.arange(lo, min(lo + step, n_rows))
+            ret[ends], vol[ends], n_prices = kernel.window(ends - window + 1, ends)
+            mdd[ends] = np.where(n_prices >= 2, rolling_dd[ends] * 100.0, np.nan)
+
+    def _frame(arr: np.ndarray) -> pd.DataFrame:
+        return pd.DataFrame(arr, index=prices_df.index, columns=prices_df.columns)
+
+    return {
+        "return_pct": _frame(ret),
+        "vol_pct": _frame(vol),
+        "max_drawdown_pct": _frame(mdd),
+    }
+
+
+def rolling_return_pct(prices_df: pd.DataFrame, window: int = 63) -> pd.DataFrame:
+    """Rentabilidad movil (en %) para toda la matriz de tickers."""
+    return rolling_metrics(prices_df, window)["return_pct"]
+
+
+def rolling_vol_pct(prices_df: pd.DataFrame, window: int = 63) -> pd.DataFrame:
+    """Volatilidad anualizada movil (en %) para toda la matriz de tickers."""
+    return rolling_metrics(prices_df, window)["vol_pct"]
+
+
+def rolling_max_drawdown_pct(prices_df: pd.DataFrame, window: int = 63) -> pd.DataFrame:
+    """Max drawdown movil (en %, negativo o 0) para toda la matriz de tickers."""
+    return rolling_metrics(prices_df, window)["max_drawdown_pct"]
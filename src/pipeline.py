@@ -1,26 +1,62 @@
+from pathlib import Path
+import warnings
+
 import pandas as pd
 
 from .config import ScoringConfig
+from .incremental import MetricState, resume_state
 from .io_excel import read_prices_excel
+from .io_long import is_long_format, read_prices_long
 from .metrics import compute_metrics
+from .price_cache import load_prices_cached
 from .scoring import add_score
 
 def quality_flags(prices: pd.DataFrame, metrics: pd.DataFrame) -> pd.DataFrame:
     """Genera banderas simples de calidad para trazabilidad."""
+    return _quality_flags(prices.isna().any(axis=0), metrics)
+
+def _quality_flags(has_na_prices: pd.Series, metrics: pd.DataFrame) -> pd.DataFrame:
     flags = pd.DataFrame(index=metrics.index)
-    flags["has_na_prices"] = prices.isna().any(axis=0)
+    flags["has_na_prices"] = has_na_prices
     flags["has_na_metrics"] = metrics.isna().any(axis=1)
     flags["drawdown_positive"] = metrics["max_drawdown_pct"] > 0
     return flags
 
-def run_deterministic_pipeline(input_excel_path: str) -> pd.DataFrame:
-    """Ejecuta el pipeline determinista de principio a fin."""
-    prices = read_prices_excel(input_excel_path)
+def rank_results(scored: pd.DataFrame, flags: pd.DataFrame) -> pd.DataFrame:
+    """Une score y flags y aplica el ranking determinista con orden estable."""
+    out = scored.join(flags)
+    out = out.sort_values(
+        by=["score", "return_pct", "vol_pct", "max_drawdown_pct"],
+        ascending=[False, False, True, False],
+        kind="mergesort"
+    )
+    out["rank"] = range(1, len(out) + 1)
+    return out
+
+def load_prices(input_excel_path: str | Path, cache_dir: str | Path | None = None) -> pd.DataFrame:
+    """Lee los precios y valida que las fechas esten ordenadas.
+
+    Acepta el Excel ancho o un CSV/Parquet largo (fecha, ticker, precio), que se
+    lee por bloques (ver `io_long`). Con `cache_dir` se reutiliza la matriz ya
+    parseada (ver `price_cache`).
+    """
+    reader = read_prices_long if is_long_format(input_excel_path) else read_prices_excel
+    if cache_dir is None:
+        prices = reader(input_excel_path)
+    else:
+        prices = load_prices_cached(input_excel_path, cache_dir, reader=reader)
 
     # Validacion minima: fechas ordenadas ascendentemente.
     if not prices.index.is_monotonic_increasing:
         raise ValueError("Las fechas no estan ordenadas ascendentemente tras la carga.")
+    return prices
+
+def run_deterministic_pipeline(input_excel_path: str, cache_dir: str | Path | None = None) -> pd.DataFrame:
+    """Ejecuta el pipeline determinista de principio a fin."""
+    return rank_prices(load_prices(input_excel_path, cache_dir))
 
+def rank_prices(prices: pd.DataFrame) -> pd.DataFrame:
+    """Metricas, scoring, flags y ranking sobre precios ya cargados."""
     # Validacion minima: control NA global (no paramos, solo queda reflejado en flags).
     metrics = compute_metrics(prices)
 
@@ -28,14 +64,29 @@ def run_deterministic_pipeline(input_excel_path: str) -> pd.DataFrame:
     scored = add_score(metrics, cfg)
     flags = quality_flags(prices, metrics)
 
-    out = scored.join(flags)
-
     # Ranking determinista con orden estable.
-    out = out.sort_values(
-        by=["score", "return_pct", "vol_pct", "max_drawdown_pct"],
-        ascending=[False, False, True, False],
-        kind="mergesort"
-    )
-    out["rank"] = range(1, len(out) + 1)
+    return rank_results(scored, flags)
 
-    return out
+def run_incremental_pipeline(
+    input_excel_path: str,
+    state: MetricState | None = None,
+    cache_dir: str | Path | None = None,
+) -> tuple[pd.DataFrame, MetricState]:
+    """Igual que `run_deterministic_pipeline`, pero avanzando un estado previo.
+
+    Solo se procesan las filas posteriores a `state.last_date`. Si no hay estado
+    o no encaja con el fichero (otros tickers, historico distinto o revisado),
+    se reconstruye desde todo el historico y se avisa del motivo.
+    """
+    prices = load_prices(input_excel_path, cache_dir)
+
+    previous = state
+    state, reason = resume_state(state, prices, input_excel_path)
+    if previous is not None and reason is not None:
+        warnings.warn(f"Estado incremental descartado: {reason}. Se recalcula todo el historico.", stacklevel=2)
+
+    metrics = state.to_metrics()
+    cfg = ScoringConfig()
+    scored = add_score(metrics, cfg)
+    flags = _quality_flags(state.has_na_prices(), metrics)
+    return rank_results(scored, flags), state
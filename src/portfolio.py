@@ -0,0 +1,144 @@
+"""Analitica de riesgo de carteras a partir de un unico array de retornos."""
+
+from __future__ import annotations
+
+from collections.abc import Mapping
+
+import numpy as np
+import pandas as pd
+
+from .metrics import TRADING_DAYS, _ffill_matrix
+
+_CHUNK_CELLS = 1 << 21
+
+
+class PortfolioAnalytics:
+    """Prepara una vez precios alineados y retornos diarios y evalua carteras sobre ellos.
+
+    `align="common"` arranca en la primera fecha en la que todos los tickers
+    cotizan (y arrastra el ultimo precio en huecos posteriores); `align="pad"`
+    usa todo el periodo y mantiene plano cada ticker hasta su primera cotizacion.
+    Las carteras son de comprar y mantener: valor = sum(w_i * P_i,t / P_i,0).
+    """
+
+    def __init__(self, prices_df: pd.DataFrame, tickers: list[str] | None = None, align: str = "common"):
+        if tickers is None:
+            tickers = list(prices_df.columns)
+        self.tickers = [t for t in tickers if t in prices_df.columns]
+        if not self.tickers:
+            raise ValueError("Ninguno de los tickers esta en la tabla de precios.")
+        values = prices_df[self.tickers].to_numpy(dtype=float, na_value=np.nan)
+        filled = _ffill_matrix(values)
+        index = prices_df.index
+        if align == "common":
+            complete = ~np.isnan(filled).any(axis=1)
+            if not complete.any():
+                raise ValueError("No hay ninguna fecha con precio para todos los tickers.")
+            start = int(np.argmax(complete))
+            filled, index = filled[start:], index[start:]
+        elif align == "pad":
+            valid = ~np.isnan(values)
+            if not valid.any(axis=0).all():
+                raise ValueError("Hay tickers sin ningun precio valido.")
+            first = values[np.argmax(valid, axis=0), np.arange(len(self.tickers))]
+            filled = np.where(np.isnan(filled), first, filled)
+        else:
+            raise ValueError(f"Alineacion no soportada: {align}")
+
+        self.index = index
+        # Retornos simples diarios (T-1 x N): base comun de todas las metricas.
+        self.returns = np.diff(filled, axis=0) / filled[:-1]
+        self.paths = np.ascontiguousarray((filled / filled[0]).T)
+        self._cov: np.ndarray | None = None
+
+    def weights_matrix(self, weights) -> np.ndarray:
+        """Convierte pesos (dict/Series por ticker, lista o matriz K x N) a filas que suman 1."""
+        if isinstance(weights, Mapping | pd.Series):
+            w = np.array([[float(weights.get(t, 0.0)) for t in self.tickers]])
+        else:
+            w = np.atleast_2d(np.asarray(weights, dtype=float))
+        if w.shape[1] != len(self.tickers):
+            raise ValueError(f"Se esperaban {len(self.tickers)} pesos por cartera, hay {w.shape[1]}.")
+        total = w.sum(axis=1, keepdims=True)
+        if (total == 0).any():
+            raise ValueError("Hay carteras con pesos que suman 0.")
+        return w / total
+
+    def covariance(self) -> pd.DataFrame:
+        """Matriz de covarianzas anualizada de los retornos diarios."""
+        return pd.DataFrame(self._covariance(), index=self.tickers, columns=self.tickers)
+
+    def _covariance(self) -> np.ndarray:
+        if self._cov is None:
+            self._cov = np.atleast_2d(np.cov(self.returns, rowvar=False, ddof=1)) * TRADING_DAYS
+        return self._cov
+
+    def correlation(self) -> pd.DataFrame:
+        """Matriz de correlaciones de los retornos diarios."""
+        cov = self._covariance()
+        sd = np.sqrt(np.diag(cov))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            corr = cov / np.outer(sd, sd)
+        return pd.DataFrame(corr, index=self.tickers, columns=self.tickers)
+
+    def series(self, weights) -> pd.Series:
+        """Serie de valor de la cartera en base 100."""
+        w = self.weights_matrix(weights)[0]
+        return pd.Series(w @ self.paths * 100.0, index=self.index, name="portfolio")
+
+    def evaluate(self, weights) -> pd.DataFrame:
+        """Rentabilidad, volatilidad anualizada y max drawdown (en %) para K carteras.
+
+        Todas las carteras se evaluan con un producto matricial pesos x series
+        normalizadas; no se recalculan retornos por cartera. La volatilidad es la
+        de los retornos simples diarios de esa serie, la misma que reparte
+        `risk_contributions`.
+        """
+        w = self.weights_matrix(weights)
+        n_obs = self.paths.shape[1]
+        ret = np.empty(len(w))
+        vol = np.empty(len(w))
+        mdd = np.empty(len(w))
+        step = max(1, _CHUNK_CELLS // n_obs)
+        for lo in range(0, len(w), step):
+            values = w[lo:lo + step] @ self.paths
+            ret[lo:lo + step] = (values[:, -1] / values[:, 0] - 1.0) * 100.0
+            if n_obs >= 3:
+                simple = np.diff(values, axis=1) / values[:, :-1]
+                vol[lo:lo + step] = simple.std(axis=1, ddof=1) * np.sqrt(TRADING_DAYS) * 100.0
+            else:
+                vol[lo:lo + step] = np.nan
+            peak = np.maximum.accumulate(values, axis=1)
+            mdd[lo:lo + step] = (values / peak - 1.0).min(axis=1) * 100.0
+        return pd.DataFrame({"return_pct": ret, "vol_pct": vol, "max_drawdown_pct": mdd})
+
+    def risk_contributions(self, weights) -> pd.DataFrame:
+        """Reparto de la volatilidad de `evaluate` entre los tickers de la cartera.
+
+        Con comprar y mantener los pesos derivan, asi que se descompone el
+        retorno diario de la cartera, r_t = sum_i w_i * dP_i,t / V_t-1, en lugar
+        de usar pesos fijos sobre la covarianza. `vol_contribution_pct` suma la
+        `vol_pct` de `evaluate` y `risk_contribution_pct` suma 100.
+        """
+        w = self.weights_matrix(weights)[0]
+        values = w @ self.paths
+        if values.shape[0] < 3:
+            raise ValueError("Hacen falta al menos 3 fechas para repartir la volatilidad.")
+        # Retorno de la cartera atribuible a cada ticker por unidad de peso.
+        unit = np.diff(self.paths, axis=1) / values[:-1]
+        port = w @ unit
+        dev = port - port.mean()
+        cov = (unit - unit.mean(axis=1, keepdims=True)) @ dev / (len(dev) - 1) * TRADING_DAYS
+        vol = float(np.sqrt(dev @ dev / (len(dev) - 1) * TRADING_DAYS))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            marginal = cov / vol
+            contribution = w * marginal / vol * 100.0
+        return pd.DataFrame(
+            {
+                "weight_pct": w * 100.0,
+                "marginal_vol_pct": marginal * 100.0,
+                "vol_contribution_pct": w * marginal * 100.0,
+                "risk_contribution_pct": contribution,
+            },
+            index=pd.Index(self.tickers, name="ticker"),
+        )
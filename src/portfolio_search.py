@@ -0,0 +1,181 @@
+"""Busqueda determinista de carteras equiponderadas de k valores (frontera eficiente)."""
+
+from __future__ import annotations
+
+from itertools import combinations
+from math import comb
+
+import numpy as np
+import pandas as pd
+
+from .config import ScoringConfig
+from .metrics import TRADING_DAYS, compute_metrics
+from .portfolio import PortfolioAnalytics
+from .scoring import _minmax_0_1, add_score, rank_order_matrix
+
+_CHUNK_CELLS = 1 << 21
+
+
+def _all_combinations(n: int, k: int) -> np.ndarray:
+    """Todas las combinaciones de k indices entre n, como array (M, k)."""
+    flat = np.fromiter(
+        (i for c in combinations(range(n), k) for i in c),
+        dtype=np.int32,
+        count=comb(n, k) * k,
+    )
+    return flat.reshape(-1, k)
+
+
+def _sample_combinations(n: int, k: int, size: int, rng: np.random.Generator) -> np.ndarray:
+    """Muestra combinaciones distintas (filas ordenadas, sin repetidos)."""
+    draws = np.sort(rng.integers(0, n, size=(int(size * 1.5) + 16, k), dtype=np.int32), axis=1)
+    ok = (np.diff(draws, axis=1) > 0).all(axis=1)
+    unique = np.unique(draws[ok], axis=0)
+    if len(unique) > size:
+        unique = unique[np.sort(rng.choice(len(unique), size=size, replace=False))]
+    return unique
+
+
+def _sector_codes(tickers: list[str], sectors: pd.DataFrame | None) -> np.ndarray:
+    """Codigo entero de sector por ticker; sin sector conocido cuenta como sector propio."""
+    if sectors is None or "sector" not in sectors.columns:
+        return np.arange(len(tickers))
+    labels = sectors["sector"].reindex(tickers)
+    codes, _ = pd.factorize(labels)
+    missing = codes < 0
+    codes[missing] = codes.max(initial=-1) + 1 + np.arange(missing.sum())
+    return codes
+
+
+def _pareto_mask(ret: np.ndarray, vol: np.ndarray, dd: np.ndarray, block: int = 2048) -> np.ndarray:
+    """Marca las carteras no dominadas (mas rentabilidad, menos volatilidad, menos drawdown).
+
+    Se ordena por rentabilidad descendente: una cartera solo puede estar
+    dominada por otra anterior con volatilidad <= y drawdown >=. Los bloques se
+    comparan contra la frontera acumulada y contra si mismos.
+    """
+    order = np.lexsort((-dd, vol, -ret))
+    v, d = vol[order], dd[order]
+    keep = np.zeros(len(order), dtype=bool)
+    front_v = np.empty(0)
+    front_d = np.empty(0)
+    for lo in range(0, len(order), block):
+        bv, bd = v[lo:lo + block], d[lo:lo + block]
+        dominated = np.zeros(len(bv), dtype=bool)
+        if len(front_v):
+            dominated = ((front_v[None, :] <= bv[:, None]) & (front_d[None, :] >= bd[:, None])).any(axis=1)
+        inner = (bv[None, :] <= bv[:, None]) & (bd[None, :] >= bd[:, None])
+        inner &= np.tri(len(bv), k=-1, dtype=bool)
+        dominated |= inner.any(axis=1)
+        ok = ~dominated
+        keep[lo:lo + block] = ok
+        front_v = np.r_[front_v, bv[ok]]
+        front_d = np.r_[front_d, bd[ok]]
+    mask = np.zeros(len(order), dtype=bool)
+    mask[order] = keep
+    return mask
+
+
+def search_equal_weight_portfolios(
+    prices_df: pd.DataFrame,
+    sectors: pd.DataFrame | None = None,
+    k: int = 5,
+    max_per_sector: int = 2,
+    max_enumerate: int = 500_000,
+    n_samples: int = 0,
+    seed: int = 0,
+    cfg: ScoringConfig | None = None,
+    efficient_only: bool = True,
+) -> pd.DataFrame:
+    """Evalua carteras de `k` valores al 100/k % y devuelve la frontera eficiente.
+
+    Con 35 valores y k=5 se enumeran las ~325k combinaciones. Cada cartera se
+    mide sobre su serie de comprar y mantener, igual que
+    `PortfolioAnalytics.evaluate`: rentabilidad, volatilidad anualizada de los
+    retornos simples diarios y max drawdown, ademas del numero de sectores; se descartan las que superan `max_per_sector` valores
+    de un mismo sector (`load_sectors`). Si el universo es demasiado grande
+    para enumerar (`max_enumerate`), se poda a los mejores valores del ranking
+    del pipeline y, opcionalmente, se anaden `n_samples` combinaciones aleatorias
+    (semilla fija) de todo el universo.
+
+    El `score` (0..1) usa los pesos de `cfg` sobre las tres metricas
+    normalizadas entre las carteras evaluadas.
+    """
+    cfg = cfg or ScoringConfig()
+    metrics = compute_metrics(prices_df)
+    usable = metrics[["return_pct", "vol_pct", "max_drawdown_pct"]].notna().all(axis=1)
+    tickers = [t for t in metrics.index[usable.to_numpy()]]
+    n = len(tickers)
+    if n < k:
+        raise ValueError(f"Se necesitan al menos {k} valores con metricas validas (hay {n}).")
+
+    # Preparacion compartida: series normalizadas (base 1).
+    paths = PortfolioAnalytics(prices_df, tickers, align="pad").paths
+
+    # Candidatas: enumeracion completa o poda por ranking + muestreo.
+    if comb(n, k) <= max_enumerate:
+        candidates = _all_combinations(n, k)
+    else:
+        scored = add_score(metrics.loc[tickers], cfg)
+        order = rank_order_matrix(
+            scored["score"].to_numpy(dtype=float),
+            scored["return_pct"].to_numpy(),
+            scored["vol_pct"].to_numpy(),
+            scored["max_drawdown_pct"].to_numpy(),
+        )
+        n_top = k
+        while n_top < n and comb(n_top + 1, k) <= max_enumerate:
+            n_top += 1
+        top = np.sort(order[:n_top]).astype(np.int32)
+        candidates = top[_all_combinations(n_top, k)]
+        if n_samples:
+            sampled = _sample_combinations(n, k, n_samples, np.random.default_rng(seed))
+            candidates = np.unique(np.vstack([candidates, sampled]), axis=0)
+
+    # Restriccion sectorial.
+    codes = _sector_codes(tickers, sectors)[candidates]
+    same = codes[:, :, None] == codes[:, None, :]
+    candidates = candidates[same.sum(axis=2).max(axis=1) <= max_per_sector]
+    codes = _sector_codes(tickers, sectors)[candidates]
+    n_sectors = 1 + (np.diff(np.sort(codes, axis=1), axis=1) != 0).sum(axis=1)
+    if len(candidates) == 0:
+        raise ValueError("Ninguna cartera cumple la restriccion sectorial.")
+
+    # Metricas de la serie equiponderada (comprar y mantener), por bloques.
+    ret = np.empty(len(candidates))
+    vol = np.full(len(candidates), np.nan)
+    mdd = np.empty(len(candidates))
+    step = max(1, _CHUNK_CELLS // paths.shape[1])
+    for lo in range(0, len(candidates), step):
+        idx = candidates[lo:lo + step]
+        series = paths[idx[:, 0]].copy()
+        for a in range(1, k):
+            series += paths[idx[:, a]]
+        series /= k
+        ret[lo:lo + step] = (series[:, -1] / series[:, 0] - 1.0) * 100.0
+        if series.shape[1] >= 3:
+            simple = np.diff(series, axis=1) / series[:, :-1]
+            vol[lo:lo + step] = simple.std(axis=1, ddof=1) * np.sqrt(TRADING_DAYS) * 100.0
+        peak = np.maximum.accumulate(series, axis=1)
+        mdd[lo:lo + step] = (series / peak - 1.0).min(axis=1) * 100.0
+
+    names = np.asarray(tickers, dtype=object)
+    out = pd.DataFrame(
+        {
+            "tickers": [", ".join(row) for row in names[candidates]],
+            "return_pct": ret,
+            "vol_pct": vol,
+            "max_drawdown_pct": mdd,
+            "n_sectors": n_sectors,
+        }
+    )
+    out["score"] = (
+        cfg.w_return * _minmax_0_1(out["return_pct"], higher_is_better=True)
+        + cfg.w_vol * _minmax_0_1(out["vol_pct"], higher_is_better=False)
+        + cfg.w_dd * _minmax_0_1(out["max_drawdown_pct"], higher_is_better=True)
+    )
+    out["efficient"] = _pareto_mask(ret, vol, mdd)
+    if efficient_only:
+        out = out[out["efficient"]]
+    out = out.sort_values(["score", "return_pct"], ascending=[False, False], kind="mergesort")
+    return out.reset_index(drop=True)
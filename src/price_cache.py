@@ -0,0 +1,168 @@
+"""Cache columnar en disco de la matriz de precios (clave: hash del contenido del fichero)."""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+from pathlib import Path
+import shutil
+from typing import Callable
+import uuid
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from .io_excel import read_prices_excel
+
+CACHE_VERSION = 1
+DEFAULT_CACHE_DIR = Path(".cache") / "prices"
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+_META = "meta.json"
+_VALUES = "values.npy"
+_INDEX = "index.npy"
+
+
+def file_digest(path: str | Path, chunk_size: int = 1 << 20) -> str:
+    """SHA-256 del contenido del fichero (leido por bloques)."""
+    h = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for chunk in iter(lambda: fh.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _cache_key(digest: str, reader_name: str) -> str:
+    # La version de pandas y el lector forman parte de la clave: el parseo podria cambiar.
+    raw = f"{CACHE_VERSION}:{pd.__version__}:{reader_name}:{digest}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:32]
+
+
+def _entry_size(entry: Path) -> int:
+    return sum(f.stat().st_size for f in entry.iterdir() if f.is_file())
+
+
+def _json_label(label):
+    """Etiqueta apta para JSON: numpy a escalar nativo; Timestamp y demas, como texto."""
+    if isinstance(label, (np.integer, np.floating, np.bool_)):
+        return label.item()
+    if label is None or isinstance(label, (str, int, float, bool)):
+        return label
+    return str(label)
+
+
+def _columns_from_meta(meta: dict) -> pd.Index:
+    # El dtype guardado devuelve su tipo a las etiquetas que se guardaron como texto.
+    try:
+        return pd.Index(meta["columns"], dtype=meta["columns_dtype"], name=meta["columns_name"])
+    except (TypeError, ValueError):
+        return pd.Index(meta["columns"], name=meta["columns_name"])
+
+
+def _entry_meta(prices: pd.DataFrame) -> dict:
+    """Metadatos JSON de la entrada; ValueError si las etiquetas no se pueden restaurar tal cual."""
+    meta = {
+        "version": CACHE_VERSION,
+        "columns": [_json_label(c) for c in prices.columns],
+        "columns_dtype": str(prices.columns.dtype),
+        "columns_name": _json_label(prices.columns.name),
+        "index_name": _json_label(prices.index.name),
+        "dtypes": [str(d) for d in prices.dtypes],
+    }
+    columns = _columns_from_meta(meta)
+    if not (columns.equals(prices.columns) and columns.dtype == prices.columns.dtype):
+        raise ValueError(f"etiquetas de columnas no serializables (dtype {prices.columns.dtype})")
+    if columns.name != prices.columns.name or meta["index_name"] != prices.index.name:
+        raise ValueError("nombres de ejes no serializables")
+    return meta
+
+
+def _write_entry(prices: pd.DataFrame, entry: Path, meta: dict) -> None:
+    """Guarda precios (por columnas, contiguos) e indice como .npy, mas metadatos en JSON."""
+    tmp = entry.with_name(f".{entry.name}.{uuid.uuid4().hex}.tmp")
+    tmp.mkdir(parents=True)
+    try:
+        values = np.ascontiguousarray(prices.to_numpy(dtype=float, na_value=np.nan).T)
+        np.save(tmp / _VALUES, values)
+        np.save(tmp / _INDEX, prices.index.to_numpy())
+        (tmp / _META).write_text(json.dumps(meta), encoding="utf-8")
+        try:
+            os.replace(tmp, entry)
+        except OSError:
+            # Otro proceso escribio la misma entrada a la vez: nos quedamos con la suya.
+            shutil.rmtree(tmp, ignore_errors=True)
+    except BaseException:
+        shutil.rmtree(tmp, ignore_errors=True)
+        raise
+
+
+def _read_entry(entry: Path, mmap: bool) -> pd.DataFrame:
+    """Reconstruye exactamente el DataFrame de `read_prices_excel` desde la cache."""
+    meta = json.loads((entry / _META).read_text(encoding="utf-8"))
+    # mmap_mode="c": lectura mapeada; si alguien escribe, la copia es solo en memoria.
+    values = np.load(entry / _VALUES, mmap_mode="c" if mmap else None)
+    index = pd.DatetimeIndex(np.load(entry / _INDEX), name=meta["index_name"])
+    columns = _columns_from_meta(meta)
+    df = pd.DataFrame(values.T, index=index, columns=columns, copy=False)
+    dtypes = dict(zip(columns, meta["dtypes"]))
+    if any(d != "float64" for d in meta["dtypes"]):
+        df = df.astype({c: d for c, d in dtypes.items() if d != "float64"})
+    return df
+
+
+def evict(cache_dir: str | Path = DEFAULT_CACHE_DIR, max_bytes: int = DEFAULT_MAX_BYTES, keep: str | None = None) -> list[str]:
+    """Borra las entradas usadas hace mas tiempo hasta quedar por debajo de `max_bytes`."""
+    cache_dir = Path(cache_dir)
+    if not cache_dir.exists():
+        return []
+    entries = [e for e in cache_dir.iterdir() if e.is_dir() and (e / _META).exists()]
+    sizes = {e: _entry_size(e) for e in entries}
+    total = sum(sizes.values())
+    removed = []
+    for entry in sorted(entries, key=lambda e: (e / _META).stat().st_mtime):
+        if total <= max_bytes:
+            break
+        if entry.name == keep:
+            continue
+        shutil.rmtree(entry, ignore_errors=True)
+        if not entry.exists():
+            total -= sizes[entry]
+            removed.append(entry.name)
+    return removed
+
+
+def load_prices_cached(
+    path: str | Path,
+    cache_dir: str | Path = DEFAULT_CACHE_DIR,
+    max_bytes: int = DEFAULT_MAX_BYTES,
+    mmap: bool = True,
+    reader: Callable[[str | Path], pd.DataFrame] = read_prices_excel,
+) -> pd.DataFrame:
+    """Igual que `reader` (por defecto `read_prices_excel`), pero parseando cada fichero solo la primera vez.
+
+    La clave es el hash del contenido del fichero (no la ruta ni la fecha), asi
+    que copiar o renombrar el Excel sigue acertando en cache. Las lecturas
+    posteriores usan `np.load` con memoria mapeada.
+    """
+    cache_dir = Path(cache_dir)
+    entry = cache_dir / _cache_key(file_digest(path), reader.__name__)
+    if (entry / _META).exists():
+        try:
+            df = _read_entry(entry, mmap)
+            os.utime(entry / _META)  # marca de uso para la eviccion LRU
+            return df
+        except (OSError, ValueError, KeyError, json.JSONDecodeError):
+            shutil.rmtree(entry, ignore_errors=True)
+
+    prices = reader(path)
+    try:
+        meta = _entry_meta(prices)
+    except ValueError as exc:
+        warnings.warn(f"Precios sin cache: {exc}.", stacklevel=2)
+        return prices
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    _write_entry(prices, entry, meta)
+    evict(cache_dir, max_bytes, keep=entry.name)
+    return prices
@@ -0,0 +1,241 @@
+"""Instrumentacion ligera por etapa: tiempo, CPU, memoria pico y E/S -> profile.json.
+
+`RunProfiler.stage(nombre)` es un context manager que se pasa como `around` a
+`StageGraph.run` (o se usa a mano para pasos fuera del grafo, como el PDF).
+Con `sample_interval_s` un hilo muestrea las pilas de las etapas deterministas
+(perfil estadistico, sin instrumentar cada llamada).
+"""
+
+from __future__ import annotations
+
+from collections import Counter
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+import json
+import os
+from pathlib import Path
+import sys
+import threading
+import time
+import tracemalloc
+from typing import Any, Iterator
+
+try:  # no existe en Windows
+    import resource
+except ImportError:  # pragma: no cover
+    resource = None
+
+PROFILE_FILENAME = "profile.json"
+STACKS_FILENAME = "profile_stacks.txt"
+PROFILE_VERSION = 2
+DEFAULT_SAMPLE_INTERVAL_S = 0.005
+# Etapas que solo esperan a la red: no se muestrean.
+NOT_SAMPLED = frozenset({"sections"})
+IO_FIELDS = ("rchar", "wchar", "read_bytes", "write_bytes")
+
+
+def read_io() -> dict[str, int] | None:
+    """Contadores de E/S del proceso (/proc/self/io, solo Linux). None si no hay."""
+    try:
+        with open("/proc/self/io", encoding="ascii") as fh:
+            raw = dict(line.split(":", 1) for line in fh if ":" in line)
+    except OSError:
+        return None
+    return {k: int(raw[k]) for k in IO_FIELDS if k in raw}
+
+
+def peak_rss_bytes() -> int | None:
+    """Maximo de memoria residente del proceso hasta ahora (None si no se puede medir)."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024  # Linux lo da en KB
+
+
+@dataclass
+class StageProfile:
+    """Medidas de una etapa. La E/S es del proceso entero: con etapas en paralelo
+    se reparte entre las que coinciden en el tiempo.
+
+    `process_peak_rss_bytes` es el maximo de memoria residente del proceso desde
+    que arranco hasta el final de la etapa (no el pico de la etapa).
+    `python_peak_bytes` es lo que la memoria Python llego a crecer durante la
+    etapa respecto a su inicio (pico de `tracemalloc` menos la memoria al entrar).
+    """
+
+    name: str
+    wall_s: float
+    cpu_s: float
+    process_peak_rss_bytes: int | None = None
+    python_peak_bytes: int | None = None
+    io: dict[str, int] | None = None
+    reused: bool = False
+    thread: str = ""
+
+
+class _Sampler:
+    """Hilo que cada `interval_s` anota la pila de los hilos que estan en una etapa."""
+
+    def __init__(self, interval_s: float) -> None:
+        self.interval_s = interval_s
+        self.active: dict[int, str] = {}
+        self.stacks: dict[str, Counter] = {}
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._loop, name="profile-sampler", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _loop(self) -> None:
+        while not self._stop.wait(self.interval_s):
+            active = dict(self.active)
+            if not active:
+                continue
+            frames = sys._current_frames()
+            for ident, stage in active.items():
+                frame = frames.get(ident)
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({Path(code.co_filename).name}:{frame.f_lineno})")
+                    frame = frame.f_back
+                if stack:
+                    self.stacks.setdefault(stage, Counter())[";".join(reversed(stack))] += 1
+                    self.samples += 1
+
+    def hotspots(self, top: int = 15) -> dict[str, list[tuple[str, int]]]:
+        """Funciones con mas muestras propias (la cima de la pila) por etapa."""
+        out = {}
+        for stage, stacks in self.stacks.items():
+            own: Counter = Counter()
+            for stack, n in stacks.items():
+                own[stack.rsplit(";", 1)[-1]] += n
+            out[stage] = own.most_common(top)
+        return out
+
+    def collapsed(self) -> str:
+        """Formato 'pila;plegada N' (flamegraph.pl, speedscope)."""
+        lines = [
+            f"{stage};{stack} {n}"
+            for stage, stacks in self.stacks.items()
+            for stack, n in stacks.most_common()
+        ]
+        return "\n".join(lines) + "\n"
+
+
+@dataclass
+class RunProfiler:
+    """Acumula `StageProfile` de una ejecucion y los escribe en `profile.json`.
+
+    - `trace_memory`: activa `tracemalloc` para medir el pico de memoria Python
+      de cada etapa (preciso con etapas en serie; cuesta algo de velocidad).
+      `write()` lo para si lo arranco el perfilador.
+    - `sample_interval_s`: activa el muestreo de pilas de las etapas deterministas.
+    """
+
+    trace_memory: bool = False
+    sample_interval_s: float | None = None
+    stages: list[StageProfile] = field(default_factory=list)
+    started_at: float = field(default_factory=time.time)
+    _t0: float = field(default_factory=time.perf_counter)
+    _cpu0: os.times_result = field(default_factory=os.times)
+    _io0: dict[str, int] | None = field(default_factory=read_io)
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+    _sampler: _Sampler | None = None
+    _owns_tracing: bool = False
+
+    def __post_init__(self) -> None:
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._owns_tracing = True
+        if self.sample_interval_s:
+            self._sampler = _Sampler(self.sample_interval_s)
+            self._sampler.start()
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[StageProfile]:
+        """Mide el bloque; `StageGraph.run` marca `reused` en el objeto entregado."""
+        profile = StageProfile(name, 0.0, 0.0, thread=threading.current_thread().name)
+        ident = threading.get_ident()
+        if self._sampler is not None and name not in NOT_SAMPLED:
+            self._sampler.active[ident] = name
+        traced0 = None
+        if self.trace_memory and tracemalloc.is_tracing():
+            tracemalloc.reset_peak()
+            traced0 = tracemalloc.get_traced_memory()[0]
+        io0 = read_io()
+        t0, cpu0 = time.perf_counter(), time.thread_time()
+        try:
+            yield profile
+        finally:
+            profile.wall_s = time.perf_counter() - t0
+            profile.cpu_s = time.thread_time() - cpu0
+            if self._sampler is not None:
+                self._sampler.active.pop(ident, None)
+            io1 = read_io()
+            if io0 is not None and io1 is not None:
+                profile.io = {k: io1[k] - io0[k] for k in io1}
+            profile.process_peak_rss_bytes = peak_rss_bytes()
+            if traced0 is not None and tracemalloc.is_tracing():
+                profile.python_peak_bytes = max(0, tracemalloc.get_traced_memory()[1] - traced0)
+            with self._lock:
+                self.stages.append(profile)
+
+    def summary(self, llm: list | None = None) -> dict[str, Any]:
+        """Diccionario serializable con totales, etapas, llamadas LLM y muestreo."""
+        cpu1 = os.times()
+        io1 = read_io()
+        with self._lock:
+            stages = [asdict(s) for s in self.stages]
+        data: dict[str, Any] = {
+            "version": PROFILE_VERSION,
+            "created_at": datetime.fromtimestamp(self.started_at).isoformat(timespec="seconds"),
+            "pid": os.getpid(),
+            "wall_s": time.perf_counter() - self._t0,
+            # Incluye procesos hijos ya terminados (graficas en pool de procesos).
+            "cpu_s": sum(cpu1[:4]) - sum(self._cpu0[:4]),
+            "peak_rss_bytes": peak_rss_bytes(),
+            "io": {k: io1[k] - self._io0[k] for k in io1} if io1 is not None and self._io0 is not None else None,
+            "stages": stages,
+        }
+        if llm:
+            data["llm"] = [
+                {
+                    "title": s.title,
+                    "elapsed_s": s.elapsed_s,
+                    "first_chunk_s": s.first_chunk_s,
+                    "prompt_tokens": s.usage.prompt_tokens,
+                    "output_tokens": s.usage.output_tokens,
+                    "cached": s.usage.cached,
+                }
+                for s in llm
+            ]
+        if self._sampler is not None:
+            data["sampling"] = {
+                "interval_s": self._sampler.interval_s,
+                "samples": self._sampler.samples,
+                "hotspots": self._sampler.hotspots(),
+                "stacks_file": STACKS_FILENAME,
+            }
+        return data
+
+    def write(self, run_dir: str | Path, llm: list | None = None) -> Path:
+        """Escribe `profile.json` (y las pilas muestreadas, si las hay) en `run_dir`."""
+        if self._sampler is not None:
+            self._sampler.stop()
+        if self._owns_tracing and tracemalloc.is_tracing():
+            tracemalloc.stop()
+            self._owns_tracing = False
+        run_dir = Path(run_dir)
+        run_dir.mkdir(parents=True, exist_ok=True)
+        path = run_dir / PROFILE_FILENAME
+        path.write_text(json.dumps(self.summary(llm), indent=2), encoding="utf-8")
+        if self._sampler is not None:
+            (run_dir / STACKS_FILENAME).write_text(self._sampler.collapsed(), encoding="utf-8")
+        return path
@@ -1,14 +1,32 @@
 from __future__ import annotations
 
+from functools import lru_cache
 from io import BytesIO
 from pathlib import Path
 import re
+from typing import TYPE_CHECKING, Union
+import numpy as np
 import pandas as pd
-from reportlab.lib import colors
-from reportlab.lib.pagesizes import A4
-from reportlab.lib.styles import getSampleStyleSheet
-from reportlab.lib.utils import ImageReader
-from reportlab.platypus import Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle, Image
+
+from .charts import DEFAULT_DPI, ChartSpec, Line, chart_figure, chart_lines, normalize_price_series
+
+# ReportLab se importa dentro de las funciones que dibujan o maquetan el PDF: el
+# texto del informe y los pesos de cartera se procesan sin cargarlo.
+if TYPE_CHECKING:
+    from reportlab.graphics.shapes import Drawing
+    from reportlab.platypus import TableStyle
+
+A4_WIDTH = 210 / 25.4 * 72  # puntos, igual que reportlab.lib.pagesizes.A4[0]
+PAGE_MARGIN = 36
+CONTENT_WIDTH = A4_WIDTH - 2 * PAGE_MARGIN
+TOP_COLUMNS = ["ticker", "rank", "score", "return_pct", "vol_pct", "max_drawdown_pct", "sector"]
+# Paleta por defecto de matplotlib, para que PNG y PDF se vean igual.
+LINE_COLORS = ["#1f77b4", "#ff7f0e", "#2ca02c", "#d62728", "#9467bd", "#8c564b", "#e377c2", "#7f7f7f", "#bcbd22", "#17becf"]
+PORTFOLIO_COLOR = "#2c3e50"
+MAX_CHART_POINTS = 1000
+
+# Grafica para el PDF: ruta a PNG, PNG en memoria (bytes/BytesIO) o Drawing vectorial.
+ChartSource = Union[str, Path, bytes, BytesIO, "Drawing"]
 
 
 def df_to_excel_bytes(df: pd.DataFrame) -> bytes:
@@ -19,46 +37,16 @@ def df_to_excel_bytes(df: pd.DataFrame) -> bytes:
     return buf.getvalue()
 
 
-def normalize_price_series(series: pd.Series) -> pd.Series:
-    """Normaliza una serie de precios a base 100."""
-    s = series.dropna()
-    if s.empty:
-        return s
-    base = s.iloc[0]
-    if base == 0:
-        return s * 0.0
-    return s / base * 100.0
-
-
 def plot_price_series(
     prices: pd.DataFrame,
     tickers: list[str],
     title: str,
     out_path: Path,
 ):
-    """Grafica series de precios normalizadas y guarda el PNG."""
-    import matplotlib.pyplot as plt
-    import matplotlib.dates as mdates
-
-    fig, ax = plt.subplots(figsize=(10, 5))
-    for ticker in tickers:
-        if ticker not in prices.columns:
-            continue
-        s = normalize_price_series(prices[ticker])
-        if s.empty:
-            continue
-        ax.plot(s.index, s.values, label=ticker, linewidth=1.6)
-
-    ax.set_title(title)
-    ax.set_ylabel("Indice (base 100)")
-    ax.grid(True, alpha=0.3)
-    ax.legend(loc="upper left", ncol=2, fontsize=8, frameon=False)
-    locator = mdates.AutoDateLocator(minticks=5, maxticks=10)
-    ax.xaxis.set_major_locator(locator)
-    ax.xaxis.set_major_formatter(mdates.ConciseDateFormatter(locator))
-    fig.autofmt_xdate()
-    fig.tight_layout()
-    fig.savefig(out_path, dpi=200)
+    """Grafica series de precios normalizadas y guarda el PNG (Figure + Agg, sin pyplot)."""
+    lines = chart_lines(prices, ChartSpec(Path(out_path).name, title, tuple(tickers)))
+    fig = chart_figure(lines, title)
+    fig.savefig(out_path, dpi=DEFAULT_DPI)
     return fig
 
 
@@ -70,34 +58,14 @@ def plot_portfolio_series(
     out_path: Path,
 ):
     """Grafica una cartera ponderada (base 100) y guarda el PNG."""
-    import matplotlib.pyplot as plt
-    import matplotlib.dates as mdates
-
     if not tickers or not weights:
         return None
-    pairs = [(t, w) for t, w in zip(tickers, weights) if t in prices.columns]
-    if not pairs:
-        return None
-    tickers_filtered, weights_filtered = zip(*pairs)
-    weights_series = pd.Series(weights_filtered, index=tickers_filtered, dtype=float) / 100.0
-    subset = prices[list(tickers_filtered)].dropna()
-    if subset.empty:
+    spec = ChartSpec(Path(out_path).name, title, tuple(tickers), tuple(weights))
+    lines = chart_lines(prices, spec)
+    if not lines:
         return None
-    portfolio = (subset * weights_series).sum(axis=1)
-    portfolio = normalize_price_series(portfolio)
-
-    fig, ax = plt.subplots(figsize=(10, 5))
-    ax.plot(portfolio.index, portfolio.values, color="#2c3e50", linewidth=2.0, label="Cartera")
-    ax.set_title(title)
-    ax.set_ylabel("Indice (base 100)")
-    ax.grid(True, alpha=0.3)
-    ax.legend(loc="upper left", fontsize=8, frameon=False)
-    locator = mdates.AutoDateLocator(minticks=5, maxticks=10)
-    ax.xaxis.set_major_locator(locator)
-    ax.xaxis.set_major_formatter(mdates.ConciseDateFormatter(locator))
-    fig.autofmt_xdate()
-    fig.tight_layout()
-    fig.savefig(out_path, dpi=200)
+    fig = chart_figure(lines, title, portfolio=True)
+    fig.savefig(out_path, dpi=DEFAULT_DPI)
     return fig
 
 
@@ -275,7 +243,9 @@ def adjust_weights_in_report(
 
 def story_from_report(report: str) -> list:
     """Convierte el reporte markdown a elementos de ReportLab."""
-    styles = getSampleStyleSheet()
+    from reportlab.platypus import Paragraph, Spacer, Table
+
+    styles = _pdf_styles()
     story = []
     lines = clean_summary_lines(report)
     i = 0
@@ -305,19 +275,7 @@ def story_from_report(report: str) -> list:
             table_data, consumed = parse_markdown_table(lines[i:])
             if table_data:
                 table = Table(table_data, repeatRows=1)
-                table.setStyle(
-                    TableStyle(
-                        [
-                            ("BACKGROUND", (0, 0), (-1, 0), colors.lightgrey),
-                            ("TEXTCOLOR", (0, 0), (-1, 0), colors.black),
-                            ("GRID", (0, 0), (-1, -1), 0.5, colors.grey),
-                            ("FONT", (0, 0), (-1, 0), "Helvetica-Bold"),
-                            ("FONT", (0, 1), (-1, -1), "Helvetica"),
-                            ("FONTSIZE", (0, 0), (-1, -1), 8),
-                            ("ROWBACKGROUNDS", (0, 1), (-1, -1), [colors.whitesmoke, colors.white]),
-                        ]
-                    )
-                )
+                table.setStyle(_table_style())
                 story.append(table)
                 story.append(Spacer(1, 6))
                 i += consumed
@@ -334,18 +292,178 @@ def story_from_report(report: str) -> list:
     return story
 
 
-def build_pdf(summary: str, df: pd.DataFrame, images: list[tuple[str, Path]]) -> bytes:
-    """Genera un PDF con el resumen, tablas y graficas."""
+@lru_cache(maxsize=1)
+def _pdf_styles():
+    """Hoja de estilos compartida por todos los documentos del proceso."""
+    from reportlab.lib.styles import getSampleStyleSheet
+
+    return getSampleStyleSheet()
+
+
+@lru_cache(maxsize=1)
+def _table_style() -> TableStyle:
+    from reportlab.lib import colors
+    from reportlab.platypus import TableStyle
+
+    return TableStyle(
+        [
+            ("BACKGROUND", (0, 0), (-1, 0), colors.lightgrey),
+            ("TEXTCOLOR", (0, 0), (-1, 0), colors.black),
+            ("GRID", (0, 0), (-1, -1), 0.5, colors.grey),
+            ("FONT", (0, 0), (-1, 0), "Helvetica-Bold"),
+            ("FONT", (0, 1), (-1, -1), "Helvetica"),
+            ("FONTSIZE", (0, 0), (-1, -1), 8),
+            ("ROWBACKGROUNDS", (0, 1), (-1, -1), [colors.whitesmoke, colors.white]),
+        ]
+    )
+
+
+def _month_ticks(start: float, end: float) -> list[float]:
+    """Primer dia de cada mes (en dias desde 1970) entre `start` y `end`, como mucho ~10."""
+    months = np.arange(
+        np.datetime64(int(start), "D").astype("datetime64[M]") + 1,
+        np.datetime64(int(end), "D").astype("datetime64[M]") + 1,
+    )
+    step = max(1, -(-len(months) // 10))
+    return months[::step].astype("datetime64[D]").astype(float).tolist()
+
+
+def _month_label(day: float) -> str:
+    return str(np.datetime64(int(round(day)), "D").astype("datetime64[M]"))
+
+
+def _thin(x: np.ndarray, y: np.ndarray) -> list[tuple[float, float]]:
+    """Reduce a `MAX_CHART_POINTS` puntos (mismo paso para todas las series)."""
+    step = max(1, -(-len(x) // MAX_CHART_POINTS))
+    idx = np.arange(0, len(x), step)
+    if idx[-1] != len(x) - 1:
+        idx = np.append(idx, len(x) - 1)
+    return list(zip(x[idx].tolist(), y[idx].tolist()))
+
+
+def chart_drawing(
+    lines: list[Line],
+    title: str,
+    width: float = CONTENT_WIDTH,
+    height: float | None = None,
+    portfolio: bool = False,
+) -> Drawing:
+    """Misma grafica que `chart_figure` pero como Drawing vectorial de ReportLab."""
+    from reportlab.graphics.charts.legends import Legend
+    from reportlab.graphics.charts.lineplots import LinePlot
+    from reportlab.graphics.shapes import Drawing, String
+    from reportlab.lib import colors
+
+    height = height or width / 2
+    drawing = Drawing(width, height)
+    drawing.add(String(width / 2, height - 12, title, fontName="Helvetica", fontSize=10, textAnchor="middle"))
+
+    plot = LinePlot()
+    plot.x, plot.y = 40, 24
+    plot.width, plot.height = width - 52, height - 48
+    xs = [dates.astype("datetime64[D]").astype(float) for _, dates, _ in lines]
+    plot.data = [_thin(x, np.asarray(values, dtype=float)) for x, (_, _, values) in zip(xs, lines)]
+    palette = [PORTFOLIO_COLOR] if portfolio else LINE_COLORS
+    for k in range(len(lines)):
+        plot.lines[k].strokeColor = colors.HexColor(palette[k % len(palette)])
+        plot.lines[k].strokeWidth = 1.4 if portfolio else 1.0
+
+    x_min = min(float(x[0]) for x in xs)
+    x_max = max(float(x[-1]) for x in xs)
+    plot.xValueAxis.valueMin, plot.xValueAxis.valueMax = x_min, x_max
+    plot.xValueAxis.valueSteps = _month_ticks(x_min, x_max)
+    plot.xValueAxis.labelTextFormat = _month_label
+    plot.xValueAxis.labels.fontSize = 6
+    plot.yValueAxis.labels.fontSize = 6
+    plot.yValueAxis.visibleGrid = True
+    plot.yValueAxis.gridStrokeColor = colors.HexColor("#dddddd")
+    plot.yValueAxis.gridStrokeWidth = 0.4
+    drawing.add(plot)
+
+    legend = Legend()
+    legend.x, legend.y = plot.x + 6, plot.y + plot.height - 4
+    legend.fontName, legend.fontSize = "Helvetica", 6
+    legend.boxAnchor = "nw"
+    legend.columnMaximum = -(-len(lines) // 2) if not portfolio else 1
+    legend.dx, legend.dy, legend.deltay = 8, 4, 8
+    legend.colorNamePairs = [(plot.lines[k].strokeColor, label) for k, (label, _, _) in enumerate(lines)]
+    drawing.add(legend)
+    return drawing
+
+
+def report_chart_drawings(
+    prices: pd.DataFrame,
+    specs: list[ChartSpec],
+    width: float = CONTENT_WIDTH,
+) -> list[tuple[str, Drawing | None]]:
+    """(titulo, Drawing) de cada grafica del informe; None si no hay datos que pintar."""
+    out = []
+    for spec in specs:
+        lines = chart_lines(prices, spec)
+        drawing = chart_drawing(lines, spec.title, width, portfolio=spec.weights is not None) if lines else None
+        out.append((spec.title, drawing))
+    return out
+
+
+def _chart_flowable(source: ChartSource, max_width: float):
+    """Drawing tal cual; PNG (ruta o memoria) escalado al ancho util, leido una sola vez."""
+    from reportlab.graphics.shapes import Drawing
+    from reportlab.lib.utils import ImageReader
+    from reportlab.platypus import Image
+
+    if isinstance(source, Drawing):
+        if source.width > max_width:
+            scale = max_width / source.width
+            source.scale(scale, scale)
+            source.width, source.height = source.width * scale, source.height * scale
+        return source
+    if isinstance(source, bytes):
+        source = BytesIO(source)
+    elif isinstance(source, BytesIO):
+        source.seek(0)
+    else:
+        source = str(source)
+    iw, ih = ImageReader(source).getSize()
+    if isinstance(source, BytesIO):
+        source.seek(0)
+    scale = min(max_width / iw, 1.0)
+    return Image(source, width=iw * scale, height=ih * scale)
+
+
+def _table_rows(df: pd.DataFrame, cols: list[str]) -> list[list[str]]:
+    """Filas de texto construidas por columnas (sin iterrows)."""
+    columns = []
+    for c in cols:
+        if pd.api.types.is_float_dtype(df[c].dtype):
+            columns.append([f"{v:.2f}" for v in df[c].to_numpy(dtype=float, na_value=np.nan)])
+        else:
+            columns.append([_format_cell(v) for v in df[c].to_numpy(dtype=object)])
+    return [list(cols)] + [list(row) for row in zip(*columns)]
+
+
+def build_pdf(
+    summary: str,
+    df: pd.DataFrame,
+    images: list[tuple[str, ChartSource | None]],
+) -> bytes:
+    """Genera un PDF con el resumen, tablas y graficas.
+
+    Cada grafica puede ser un Drawing vectorial (`report_chart_drawings`, lo mas
+    ligero), un PNG en memoria o una ruta a PNG.
+    """
+    from reportlab.lib.pagesizes import A4
+    from reportlab.platypus import Paragraph, SimpleDocTemplate, Spacer, Table
+
     buf = BytesIO()
     doc = SimpleDocTemplate(
         buf,
         pagesize=A4,
-        leftMargin=36,
-        rightMargin=36,
-        topMargin=36,
-        bottomMargin=36,
+        leftMargin=PAGE_MARGIN,
+        rightMargin=PAGE_MARGIN,
+        topMargin=PAGE_MARGIN,
+        bottomMargin=PAGE_MARGIN,
     )
-    styles = getSampleStyleSheet()
+    styles = _pdf_styles()
     story = []
 
     story.append(Paragraph("Informe ejecutivo", styles["Heading1"]))
@@ -357,18 +475,19 @@ def build_pdf(summary: str, df: pd.DataFrame, images: list[tuple[str, Path]]) ->
         story.append(Paragraph("Graficas deterministas", styles["Heading2"]))
         story.append(Spacer(1, 6))
         max_width = A4[0] - doc.leftMargin - doc.rightMargin
-        for title, path in images:
+        for title, source in images:
             story.append(Paragraph(title, styles["Heading3"]))
             story.append(Spacer(1, 4))
+            if source is None:
+                story.append(Paragraph("Sin datos suficientes para la grafica.", styles["BodyText"]))
+                story.append(Spacer(1, 6))
+                continue
             try:
-                img_reader = ImageReader(str(path))
-                iw, ih = img_reader.getSize()
-                scale = min(max_width / iw, 1.0)
-                img = Image(str(path), width=iw * scale, height=ih * scale)
-                story.append(img)
+                story.append(_chart_flowable(source, max_width))
                 story.append(Spacer(1, 8))
             except Exception:
-                story.append(Paragraph(f"No se pudo cargar la imagen: {path}", styles["BodyText"]))
+                label = source if isinstance(source, (str, Path)) else "(en memoria)"
+                story.append(Paragraph(f"No se pudo cargar la imagen: {label}", styles["BodyText"]))
                 story.append(Spacer(1, 6))
 
     story.append(Spacer(1, 10))
@@ -376,34 +495,9 @@ def build_pdf(summary: str, df: pd.DataFrame, images: list[tuple[str, Path]]) ->
     story.append(Spacer(1, 6))
 
     top = df.sort_values("rank").head(10).reset_index()
-    cols = [
-        "ticker",
-        "rank",
-        "score",
-        "return_pct",
-        "vol_pct",
-        "max_drawdown_pct",
-        "sector",
-    ]
-    present = [c for c in cols if c in top.columns]
-    table_data = [present]
-    for _, row in top[present].iterrows():
-        table_data.append([_format_cell(row[c]) for c in present])
-
-    table = Table(table_data, repeatRows=1)
-    table.setStyle(
-        TableStyle(
-            [
-                ("BACKGROUND", (0, 0), (-1, 0), colors.lightgrey),
-                ("TEXTCOLOR", (0, 0), (-1, 0), colors.black),
-                ("GRID", (0, 0), (-1, -1), 0.5, colors.grey),
-                ("FONT", (0, 0), (-1, 0), "Helvetica-Bold"),
-                ("FONT", (0, 1), (-1, -1), "Helvetica"),
-                ("FONTSIZE", (0, 0), (-1, -1), 8),
-                ("ROWBACKGROUNDS", (0, 1), (-1, -1), [colors.whitesmoke, colors.white]),
-            ]
-        )
-    )
+    present = [c for c in TOP_COLUMNS if c in top.columns]
+    table = Table(_table_rows(top, present), repeatRows=1)
+    table.setStyle(_table_style())
     story.append(table)
     doc.build(story)
     buf.seek(0)
@@ -21,6 +21,25 @@ def _minmax_0_1(series: pd.Series, higher_is_better: bool) -> pd.Series:
     return scaled
 
 
+def _minmax_0_1_rows(values: np.ndarray, higher_is_better: bool) -> np.ndarray:
+    """Version matricial de `_minmax_0_1`: normaliza cada fila (fecha) entre tickers."""
+    valid = np.where(np.isinf(values), np.nan, values)
+    has_data = ~np.isnan(valid).all(axis=1)
+    mn = np.full(valid.shape[0], np.nan)
+    mx = np.full(valid.shape[0], np.nan)
+    mn[has_data] = np.nanmin(valid[has_data], axis=1)
+    mx[has_data] = np.nanmax(valid[has_data], axis=1)
+
+    flat = (mx == mn)[:, None] | np.isnan(mn)[:, None]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        scaled = (valid - mn[:, None]) / (mx - mn)[:, None]
+    if not higher_is_better:
+        scaled = 1.0 - scaled
+    # Si no hay rango, 0.5 donde haya dato (neutral), igual que `_minmax_0_1`.
+    neutral = np.where(np.isnan(valid), np.nan, 0.5)
+    return np.where(flat, neutral, scaled)
+
+
 def _hardstop_mask(metrics: pd.DataFrame, cfg: ScoringConfig) -> pd.Series:
     """Marca filas que deben quedar con score minimo por reglas de control."""
     return (
@@ -49,3 +68,81 @@ def add_score(metrics_df: pd.DataFrame, cfg: ScoringConfig) -> pd.DataFrame:
 
     df["score"] = score.fillna(cfg.score_min).astype(int)
     return df
+
+
+def add_score_by_horizon(metrics_long: pd.DataFrame, cfg: ScoringConfig) -> pd.DataFrame:
+    """Aplica `add_score` por separado a cada horizonte de un DataFrame (horizon, ticker)."""
+    horizons = metrics_long.index.get_level_values("horizon").unique()
+    frames = [add_score(metrics_long.xs(h, level="horizon"), cfg) for h in horizons]
+    return pd.concat(frames, keys=list(horizons), names=["horizon", "ticker"])
+
+
+def month_end_rows(df: pd.DataFrame) -> pd.DataFrame:
+    """Filtra la ultima fecha disponible de cada mes."""
+    return df.groupby(df.index.to_period("M")).tail(1)
+
+
+def add_score_panel(
+    panel: dict[str, pd.DataFrame],
+    cfg: ScoringConfig,
+    month_end: bool = False,
+) -> pd.DataFrame:
+    """Score determinista (1..10) para cada ticker en cada fecha.
+
+    `panel` contiene DataFrames alineados (fechas x tickers) con las claves
+    `return_pct`, `vol_pct` y `max_drawdown_pct` (p. ej. `rolling_metrics`).
+    Cada fila coincide con `add_score` aplicado a las metricas de esa fecha.
+    Con `month_end=True` solo se puntua el ultimo dia de cada mes.
+    """
+    ret_df = panel["return_pct"]
+    if month_end:
+        ret_df = month_end_rows(ret_df)
+    index, columns = ret_df.index, ret_df.columns
+    ret = ret_df.to_numpy(dtype=float, na_value=np.nan)
+    vol = panel["vol_pct"].reindex(index=index, columns=columns).to_numpy(dtype=float, na_value=np.nan)
+    dd = panel["max_drawdown_pct"].reindex(index=index, columns=columns).to_numpy(dtype=float, na_value=np.nan)
+
+    score = _score_matrix(ret, vol, dd, cfg)
+    return pd.DataFrame(score, index=index, columns=columns)
+
+
+def _score_matrix(ret: np.ndarray, vol: np.ndarray, dd: np.ndarray, cfg: ScoringConfig) -> np.ndarray:
+    """Nucleo vectorizado de `add_score` para una matriz (filas x tickers)."""
+    r_norm = _minmax_0_1_rows(ret, higher_is_better=True)
+    v_norm = _minmax_0_1_rows(vol, higher_is_better=False)
+    d_norm = _minmax_0_1_rows(dd, higher_is_better=True)
+
+    raw = cfg.w_return * r_norm + cfg.w_vol * v_norm + cfg.w_dd * d_norm
+    score_cont = cfg.score_min + raw * (cfg.score_max - cfg.score_min)
+    score = np.round(score_cont)
+
+    with np.errstate(invalid="ignore"):
+        hardstop = (
+            (ret < cfg.hardstop_return_lt)
+            | (vol > cfg.hardstop_vol_gt)
+            | (np.abs(dd) > cfg.hardstop_dd_gt)
+        )
+    score = np.where(hardstop | np.isnan(score), cfg.score_min, score)
+    return score.astype(int)
+
+
+def rank_order_matrix(
+    score: np.ndarray,
+    ret: np.ndarray,
+    vol: np.ndarray,
+    dd: np.ndarray,
+) -> np.ndarray:
+    """Orden de ranking por fila (indices de ticker), igual que el ranking del pipeline.
+
+    Replica `sort_values(score desc, return desc, vol asc, drawdown desc,
+    kind="mergesort")`: orden estable y NaN al final en cada criterio.
+    Los arrays (filas x tickers) se ordenan todos a la vez con `np.lexsort`.
+    """
+    shape = np.broadcast_shapes(np.shape(score), np.shape(ret), np.shape(vol), np.shape(dd))
+    keys = [
+        -np.broadcast_to(np.asarray(dd, dtype=float), shape),
+        np.broadcast_to(np.asarray(vol, dtype=float), shape),
+        -np.broadcast_to(np.asarray(ret, dtype=float), shape),
+        -np.broadcast_to(np.asarray(score, dtype=float), shape),
+    ]
+    return np.lexsort(keys, axis=-1)
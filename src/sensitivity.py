@@ -0,0 +1,241 @@
+"""Sensibilidad del ranking frente a cambios en ScoringConfig (pesos y hard stops)."""
+
+from __future__ import annotations
+
+from dataclasses import fields, replace
+from itertools import product
+from typing import Iterator
+
+import numpy as np
+import pandas as pd
+
+from .config import ScoringConfig
+from .scoring import _minmax_0_1, rank_order_matrix
+
+WEIGHT_FIELDS = ("w_return", "w_vol", "w_dd")
+HARDSTOP_FIELDS = ("hardstop_return_lt", "hardstop_dd_gt", "hardstop_vol_gt")
+# Celdas configs x tickers por bloque del barrido (~32 MB por temporal float64).
+DEFAULT_MAX_CELLS = 1 << 22
+
+
+def grid_configs(base: ScoringConfig | None = None, **values: list[float]) -> list[ScoringConfig]:
+    """Producto cartesiano de valores por campo; descarta pesos que no suman 1.
+
+    Ejemplo: `grid_configs(w_return=[0.4, 0.5, 0.6], w_vol=[0.2, 0.3, 0.4], w_dd=[0.1, 0.2, 0.3])`.
+    """
+    base = base or ScoringConfig()
+    names = list(values)
+    valid = {f.name for f in fields(ScoringConfig)}
+    unknown = [n for n in names if n not in valid]
+    if unknown:
+        raise ValueError(f"Campos de ScoringConfig desconocidos: {unknown}")
+    configs = []
+    for combo in product(*(values[n] for n in names)):
+        cfg = replace(base, **dict(zip(names, combo)))
+        if abs(cfg.w_return + cfg.w_vol + cfg.w_dd - 1.0) <= 1e-9:
+            configs.append(cfg)
+    return configs
+
+
+def random_configs(
+    n: int,
+    seed: int = 0,
+    base: ScoringConfig | None = None,
+    weight_jitter: float = 0.10,
+    hardstop_jitter: float = 0.20,
+) -> list[ScoringConfig]:
+    """Muestra aleatoria (reproducible) alrededor de la configuracion base.
+
+    Los pesos se perturban +-`weight_jitter` (absoluto) y se renormalizan a 1;
+    los umbrales de hard stop se escalan +-`hardstop_jitter` (relativo).
+    """
+    base = base or ScoringConfig()
+    rng = np.random.default_rng(seed)
+    w0 = np.array([getattr(base, f) for f in WEIGHT_FIELDS])
+    weights = np.clip(w0 + rng.uniform(-weight_jitter, weight_jitter, size=(n, 3)), 0.0, None)
+    weights /= np.maximum(weights.sum(axis=1, keepdims=True), 1e-12)
+    h0 = np.array([getattr(base, f) for f in HARDSTOP_FIELDS])
+    hard = h0 * (1.0 + rng.uniform(-hardstop_jitter, hardstop_jitter, size=(n, 3)))
+    return [
+        replace(base, **dict(zip(WEIGHT_FIELDS, w.tolist())), **dict(zip(HARDSTOP_FIELDS, h.tolist())))
+        for w, h in zip(weights, hard)
+    ]
+
+
+def _config_arrays(configs: list[ScoringConfig]) -> dict[str, np.ndarray]:
+    """Columnas (n_configs, 1) con cada campo de ScoringConfig."""
+    return {
+        f.name: np.array([getattr(c, f.name) for c in configs], dtype=float)[:, None]
+        for f in fields(ScoringConfig)
+    }
+
+
+def _sweep_inputs(metrics_df: pd.DataFrame) -> tuple[np.ndarray, ...]:
+    """Metricas crudas y normalizadas (`_minmax_0_1`): no dependen de la configuracion."""
+    cols = [metrics_df[name].to_numpy(dtype=float, na_value=np.nan) for name in ("return_pct", "vol_pct", "max_drawdown_pct")]
+    norms = [
+        _minmax_0_1(metrics_df[name], higher_is_better=better).to_numpy(dtype=float, na_value=np.nan)
+        for name, better in (("return_pct", True), ("vol_pct", False), ("max_drawdown_pct", True))
+    ]
+    return (*cols, *norms)
+
+
+def _iter_sweep(
+    metrics_df: pd.DataFrame, configs: list[ScoringConfig], max_cells: int
+) -> Iterator[tuple[int, np.ndarray, np.ndarray]]:
+    """Scores y rankings por bloques de configuraciones: `(inicio, scores, ranks)`.
+
+    Cada bloque ocupa como mucho `max_cells` celdas configs x tickers, asi que
+    los temporales del broadcast no crecen con el numero de configuraciones.
+    """
+    ret, vol, dd, r_norm, v_norm, d_norm = _sweep_inputs(metrics_df)
+    step = max(1, max_cells // max(1, len(metrics_df)))
+    for lo in range(0, len(configs), step):
+        c = _config_arrays(configs[lo:lo + step])
+        raw = c["w_return"] * r_norm + c["w_vol"] * v_norm + c["w_dd"] * d_norm
+        score_cont = c["score_min"] + raw * (c["score_max"] - c["score_min"])
+        score = np.round(score_cont)
+        with np.errstate(invalid="ignore"):
+            hardstop = (
+                (ret < c["hardstop_return_lt"])
+                | (vol > c["hardstop_vol_gt"])
+                | (np.abs(dd) > c["hardstop_dd_gt"])
+            )
+        score = np.where(hardstop | np.isnan(score), c["score_min"], score).astype(int)
+
+        order = rank_order_matrix(score, ret, vol, dd)
+        ranks = np.empty_like(order)
+        np.put_along_axis(ranks, order, np.arange(1, order.shape[1] + 1), axis=1)
+        yield lo, score, ranks
+
+
+def sweep_scores(
+    metrics_df: pd.DataFrame, configs: list[ScoringConfig], max_cells: int = DEFAULT_MAX_CELLS
+) -> tuple[np.ndarray, np.ndarray]:
+    """Scores y rankings para todas las configuraciones, por bloques de broadcast.
+
+    Las columnas normalizadas (`_minmax_0_1`) no dependen de la configuracion,
+    asi que se calculan una vez; pesos y hard stops se aplican como un array
+    configs x tickers de como mucho `max_cells` celdas. Devuelve
+    `(scores, ranks)`, ambos (n_configs, n_tickers); cada fila coincide con
+    `add_score` + el ranking estable del pipeline.
+    """
+    shape = (len(configs), len(metrics_df))
+    scores = np.empty(shape, dtype=int)
+    ranks = np.empty(shape, dtype=np.intp)
+    for lo, score, rank in _iter_sweep(metrics_df, configs, max_cells):
+        scores[lo:lo + len(score)] = score
+        ranks[lo:lo + len(rank)] = rank
+    return scores, ranks
+
+
+def _inversions(seq: np.ndarray) -> np.ndarray:
+    """Numero de inversiones de cada fila (pares i < j con seq[i] > seq[j]).
+
+    Merge sort por niveles y vectorizado sobre filas: en cada nivel se ordenan
+    a la vez todos los bloques de 2*w (dos mitades ya ordenadas) y cada
+    elemento de la mitad derecha aporta tantas inversiones como elementos de la
+    izquierda lo adelantan. O(n log n) por fila.
+    """
+    n_rows, n = seq.shape
+    size = 1 << max(0, (n - 1).bit_length())
+    arr = np.empty((n_rows, size), dtype=np.int64)
+    arr[:, :n] = seq
+    # Relleno creciente y mayor que todo: no anade inversiones.
+    arr[:, n:] = int(seq.max(initial=0)) + 1 + np.arange(size - n)
+    counts = np.zeros(n_rows, dtype=np.int64)
+    width = 1
+    while width < size:
+        blocks = arr.reshape(n_rows, -1, 2 * width)
+        order = np.argsort(blocks, axis=-1, kind="stable")
+        # Un elemento derecho (origen w + r) que acaba en la posicion k tiene
+        # k - r izquierdos por delante, asi que w - (k - r) = origen - k mayores que el.
+        shift = order - np.arange(2 * width)
+        counts += np.where(order >= width, shift, 0).sum(axis=(1, 2))
+        arr = np.take_along_axis(blocks, order, axis=-1).reshape(n_rows, size)
+        width *= 2
+    return counts
+
+
+def kendall_tau(ranks: np.ndarray, baseline: np.ndarray, max_cells: int = 1 << 20) -> np.ndarray:
+    """Tau de Kendall de cada fila de `ranks` frente a `baseline` (rankings sin empates).
+
+    Reordenando por el ranking base, la tau sale del numero de inversiones:
+    tau = 1 - 2 * discordantes / pares. Las inversiones se cuentan con un merge
+    sort (O(n log n)) por bloques de configuraciones para acotar la memoria.
+    """
+    n = baseline.shape[0]
+    if n < 2:
+        return np.full(ranks.shape[0], np.nan)
+    seq = ranks[:, np.argsort(baseline, kind="stable")]
+    n_pairs = n * (n - 1) // 2
+    out = np.empty(ranks.shape[0])
+    step = max(1, max_cells // n)
+    for lo in range(0, ranks.shape[0], step):
+        discordant = _inversions(seq[lo:lo + step])
+        out[lo:lo + step] = 1.0 - 2.0 * discordant / n_pairs
+    return out
+
+
+def rank_stability(
+    metrics_df: pd.DataFrame,
+    configs: list[ScoringConfig],
+    baseline: ScoringConfig | None = None,
+    top_k: int = 5,
+    max_cells: int = DEFAULT_MAX_CELLS,
+) -> tuple[pd.DataFrame, pd.Series]:
+    """Estadisticas de estabilidad del ranking sobre un conjunto de configuraciones.
+
+    Devuelve una tabla por ticker (rango base, frecuencia en el top-k, rango
+    medio/desviacion/min/max, score medio) y la tau de Kendall de cada
+    configuracion frente a la base. Las configuraciones se evaluan por bloques
+    de `max_cells` celdas y solo se acumulan agregados por ticker.
+    """
+    baseline = baseline or ScoringConfig()
+    _, base_ranks = sweep_scores(metrics_df, [baseline])
+    base_ranks = base_ranks[0]
+
+    # Acumuladores por ticker: nunca se guarda la matriz configs x tickers completa.
+    n_tickers = len(metrics_df)
+    in_top = np.zeros(n_tickers, dtype=np.int64)
+    rank_sum = np.zeros(n_tickers, dtype=np.int64)
+    rank_sq = np.zeros(n_tickers, dtype=np.int64)
+    rank_min = np.full(n_tickers, np.iinfo(np.int64).max)
+    rank_max = np.zeros(n_tickers, dtype=np.int64)
+    score_sum = np.zeros(n_tickers, dtype=np.int64)
+    tau = np.empty(len(configs))
+    for lo, scores, ranks in _iter_sweep(metrics_df, configs, max_cells):
+        in_top += (ranks <= top_k).sum(axis=0)
+        rank_sum += ranks.sum(axis=0)
+        rank_sq += (ranks.astype(np.int64) ** 2).sum(axis=0)
+        np.minimum(rank_min, ranks.min(axis=0), out=rank_min)
+        np.maximum(rank_max, ranks.max(axis=0), out=rank_max)
+        score_sum += scores.sum(axis=0)
+        tau[lo:lo + len(ranks)] = kendall_tau(ranks, base_ranks)
+
+    n = len(configs)
+    # Varianza poblacional con sumas enteras exactas: (n * sum(r^2) - sum(r)^2) / n^2.
+    rank_var = (n * rank_sq - rank_sum**2) / float(n) ** 2
+    table = pd.DataFrame(
+        {
+            "baseline_rank": base_ranks,
+            f"top{top_k}_freq": in_top / n,
+            "rank_mean": rank_sum / n,
+            "rank_std": np.sqrt(rank_var),
+            "rank_min": rank_min,
+            "rank_max": rank_max,
+            "score_mean": score_sum / n,
+        },
+        index=metrics_df.index,
+    ).sort_values("baseline_rank", kind="mergesort")
+    tau = pd.Series(tau, name="kendall_tau")
+    tau.index.name = "config"
+    return table, tau
+
+
+def configs_frame(configs: list[ScoringConfig]) -> pd.DataFrame:
+    """Tabla con los parametros de cada configuracion evaluada."""
+    c = _config_arrays(configs)
+    frame = pd.DataFrame({name: col[:, 0] for name, col in c.items()})
+    frame.index.name = "config"
+    return frame
@@ -0,0 +1,493 @@
+"""Grafo declarativo de etapas del informe con memoizacion por hash de entradas.
+
+Cada etapa declara de que etapas depende y que parametros cambian su resultado.
+La clave de una etapa es el hash de esos parametros y de las claves de sus
+dependencias, asi que cambiar solo el modelo de Gemini invalida solo las etapas
+LLM y lo que cuelga de ellas. CLI y app ejecutan el mismo grafo.
+"""
+
+from __future__ import annotations
+
+from collections import OrderedDict
+from contextlib import AbstractContextManager, nullcontext
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+import hashlib
+import os
+from pathlib import Path
+import pickle
+import threading
+import time
+from typing import Any, Callable
+import uuid
+
+import pandas as pd
+
+from .charts import DEFAULT_CACHE_DIR as CHART_CACHE_DIR, render_chart_bytes, report_chart_specs
+from .config import ScoringConfig
+from .llm_summary import SectionResult, generate_sections, join_sections
+from .metrics import compute_metrics
+from .pipeline import load_prices, quality_flags, rank_results
+from .price_cache import file_digest
+from .reporting import adjust_weights_in_report
+from .scoring import add_score
+from .sectors import DEFAULT_SOURCE_URL, load_sectors
+
+STAGES_VERSION = 3
+DEFAULT_MEMO_DIR = Path(".cache") / "stages"
+DEFAULT_MEMO_MAX_BYTES = 256 * 1024 * 1024
+DEFAULT_MEMO_TTL_S = 7 * 24 * 3600
+
+_MISSING = object()
+
+
+@dataclass(frozen=True)
+class Stage:
+    """Etapa del grafo.
+
+    `fn` recibe por nombre la salida de cada dependencia, los `params` (que
+    entran en la clave) y las `options` (que no cambian el resultado, p. ej.
+    carpetas de cache o timeouts). `cacheable` decide si una salida se memoriza
+    y `persist=False` la deja solo en memoria aunque el memo sea de disco (los
+    precios ya tienen su cache mapeada en `.cache/prices`).
+    """
+
+    name: str
+    fn: Callable[..., Any]
+    deps: tuple[str, ...] = ()
+    params: tuple[str, ...] = ()
+    options: tuple[str, ...] = ()
+    cacheable: Callable[[Any], bool] | None = None
+    persist: bool = True
+
+
+def param_token(value: Any) -> str:
+    """Representacion estable de un parametro para la clave.
+
+    Las rutas se identifican por el contenido del fichero (da igual la carpeta
+    donde se haya copiado) y los DataFrame por el hash de sus valores.
+    """
+    if isinstance(value, Path):
+        return f"file:{file_digest(value)}" if value.is_file() else f"missing:{value.name}"
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        h = hashlib.sha256(pd.util.hash_pandas_object(value, index=True).to_numpy().tobytes())
+        if isinstance(value, pd.DataFrame):
+            h.update(repr(list(value.columns)).encode("utf-8"))
+        return f"frame:{h.hexdigest()}"
+    return repr(value)
+
+
+class StageMemo:
+    """Salidas de etapas en memoria, por clave, con eviccion LRU por numero de entradas."""
+
+    def __init__(self, max_entries: int = 128) -> None:
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, Any] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> tuple[bool, Any]:
+        with self._lock:
+            if key not in self._entries:
+                self.misses += 1
+                return False, None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return True, self._entries[key]
+
+    def put(self, key: str, value: Any, persist: bool = True) -> None:
+        with self._lock:
+            self._remember(key, value)
+
+    def _remember(self, key: str, value: Any) -> None:
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class DiskStageMemo(StageMemo):
+    """`StageMemo` respaldado en disco: las salidas sobreviven entre ejecuciones de la CLI.
+
+    Un pickle por clave en `cache_dir`, escrito de forma atomica (temporal +
+    `os.replace`). Como en las caches de precios y LLM, el uso se registra en
+    la fecha de modificacion: caducan por `ttl_s` (los sectores pueden venir de
+    la web) y se borran las menos usadas al superar `max_bytes`. Dentro de la
+    misma ejecucion las salidas se sirven desde memoria.
+    """
+
+    def __init__(
+        self,
+        cache_dir: str | Path = DEFAULT_MEMO_DIR,
+        max_bytes: int = DEFAULT_MEMO_MAX_BYTES,
+        ttl_s: float = DEFAULT_MEMO_TTL_S,
+        max_entries: int = 128,
+    ) -> None:
+        super().__init__(max_entries)
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.ttl_s = ttl_s
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.pkl"
+
+    def get(self, key: str) -> tuple[bool, Any]:
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return True, self._entries[key]
+        path = self._path(key)
+        try:
+            if time.time() - path.stat().st_mtime > self.ttl_s:
+                path.unlink(missing_ok=True)
+                raise KeyError("caducada")
+            with open(path, "rb") as fh:
+                value = pickle.load(fh)
+            os.utime(path)  # marca de uso para la eviccion LRU
+        except FileNotFoundError:
+            value = _MISSING
+        except Exception:
+            # A medias, caducada o de otra version de las librerias: se recalcula.
+            path.unlink(missing_ok=True)
+            value = _MISSING
+        with self._lock:
+            if value is _MISSING:
+                self.misses += 1
+                return False, None
+            self.hits += 1
+            self._remember(key, value)
+        return True, value
+
+    def put(self, key: str, value: Any, persist: bool = True) -> None:
+        super().put(key, value)
+        if not persist:
+            return
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        tmp = self.cache_dir / f".{key}.{uuid.uuid4().hex}.tmp"
+        try:
+            with open(tmp, "wb") as fh:
+                pickle.dump(value, fh, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, self._path(key))
+        except (OSError, pickle.PicklingError, TypeError, AttributeError):
+            # Sin disco o salida no serializable: queda solo en memoria.
+            tmp.unlink(missing_ok=True)
+            return
+        self.evict(keep=key)
+
+    def evict(self, keep: str | None = None) -> int:
+        """Borra entradas caducadas y, si hace falta, las menos usadas hasta `max_bytes`."""
+        if not self.cache_dir.exists():
+            return 0
+        now = time.time()
+        entries = []
+        for path in self.cache_dir.glob("*.pkl"):
+            try:
+                st = path.stat()
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for mtime, size, path in sorted(entries):
+            if path.stem == keep:
+                continue
+            if total <= self.max_bytes and now - mtime <= self.ttl_s:
+                continue
+            path.unlink(missing_ok=True)
+            total -= size
+            removed += 1
+        return removed
+
+    def clear(self) -> None:
+        super().clear()
+        for path in self.cache_dir.glob("*.pkl"):
+            path.unlink(missing_ok=True)
+
+
+@dataclass
+class StageRun:
+    """Resultado de `StageGraph.run`: salidas por etapa y que se calculo o reutilizo."""
+
+    outputs: dict[str, Any] = field(default_factory=dict)
+    keys: dict[str, str] = field(default_factory=dict)
+    computed: list[str] = field(default_factory=list)
+    reused: list[str] = field(default_factory=list)
+    timings: dict[str, float] = field(default_factory=dict)
+
+    def __getitem__(self, name: str) -> Any:
+        return self.outputs[name]
+
+
+class StageGraph:
+    """Etapas en orden topologico (cada dependencia debe aparecer antes)."""
+
+    def __init__(self, stages: list[Stage]) -> None:
+        self.stages: dict[str, Stage] = {}
+        for stage in stages:
+            if stage.name in self.stages:
+                raise ValueError(f"Etapa duplicada: {stage.name}")
+            missing = [d for d in stage.deps if d not in self.stages]
+            if missing:
+                raise ValueError(f"La etapa '{stage.name}' depende de etapas no definidas antes: {missing}")
+            self.stages[stage.name] = stage
+
+    def _required(self, targets: list[str], given: dict[str, Any]) -> list[str]:
+        """Etapas necesarias para `targets`, en orden topologico."""
+        needed: set[str] = set()
+        pending = list(targets)
+        while pending:
+            name = pending.pop()
+            if name not in self.stages:
+                raise KeyError(f"Etapa desconocida: {name}")
+            if name in needed:
+                continue
+            needed.add(name)
+            if name not in given:
+                pending.extend(self.stages[name].deps)
+        return [name for name in self.stages if name in needed]
+
+    def keys(self, params: dict[str, Any], targets: list[str] | None = None, given: dict[str, Any] | None = None) -> dict[str, str]:
+        """Clave de cada etapa necesaria (sin ejecutar nada)."""
+        given = given or {}
+        tokens: dict[str, str] = {}
+        keys: dict[str, str] = {}
+        for name in self._required(targets or list(self.stages), given):
+            if name in given:
+                keys[name] = "given:" + hashlib.sha256(param_token(given[name]).encode("utf-8")).hexdigest()
+                continue
+            stage = self.stages[name]
+            parts = [repr((STAGES_VERSION, name))]
+            for p in stage.params:
+                if p not in params:
+                    raise ValueError(f"Falta el parametro '{p}' de la etapa '{name}'.")
+                if p not in tokens:
+                    tokens[p] = param_token(params[p])
+                parts.append(f"{p}={tokens[p]}")
+            parts.extend(f"{d}->{keys[d]}" for d in stage.deps)
+            keys[name] = hashlib.sha256("\n".join(parts).encode("utf-8")).hexdigest()
+        return keys
+
+    def run(
+        self,
+        params: dict[str, Any],
+        targets: list[str] | None = None,
+        memo: StageMemo | None = None,
+        given: dict[str, Any] | None = None,
+        refresh: set[str] | frozenset[str] = frozenset(),
+        runners: dict[str, Callable[..., Any]] | None = None,
+        on_stage: Callable[[str, Any, bool, float], None] | None = None,
+        workers: int = 1,
+        around: Callable[[str], AbstractContextManager[Any]] | None = None,
+    ) -> StageRun:
+        """Ejecuta (o reutiliza de `memo`) las etapas necesarias para `targets`.
+
+        - `given`: salidas ya calculadas fuera del grafo (p. ej. metricas de un
+          estado incremental); su clave es el hash de su contenido.
+        - `refresh`: etapas que se recalculan aunque esten en `memo`.
+        - `runners`: sustituye la funcion de una etapa sin cambiar su clave (la
+          app genera las secciones LLM en streaming).
+        - `on_stage(nombre, salida, reutilizada, segundos)`: aviso tras cada etapa.
+        - `workers` > 1: las etapas cuyas dependencias ya estan listas corren a
+          la vez en hilos (p. ej. graficas mientras se espera a Gemini).
+        - `around(nombre)`: context manager que envuelve cada etapa en su hilo
+          (instrumentacion, ver `profiling.RunProfiler.stage`); si entrega un
+          objeto, se le asigna `reused`.
+        """
+        given = given or {}
+        runners = runners or {}
+        targets = targets or list(self.stages)
+        result = StageRun(keys=self.keys(params, targets, given))
+        order = self._required(targets, given)
+        # La clave no depende del contenido de las dependencias: si una se ha
+        # recalculado a la fuerza (`fresh`) o no se ha memorizado (`unstored`),
+        # lo que cuelga de ella tampoco puede servirse desde `memo`.
+        fresh: set[str] = set()
+        unstored: set[str] = set()
+
+        def execute(name: str, inputs: dict[str, Any], forced: bool, tainted: bool) -> tuple[Any, bool, bool]:
+            """(salida, reutilizada, memorizada) de una etapa."""
+            with (around(name) if around is not None else nullcontext()) as probe:
+                value, hit, stored = compute(name, inputs, forced, tainted)
+                if probe is not None:
+                    probe.reused = hit
+            return value, hit, stored
+
+        def compute(name: str, inputs: dict[str, Any], forced: bool, tainted: bool) -> tuple[Any, bool, bool]:
+            stage = self.stages[name]
+            key = result.keys[name]
+            if memo is not None and not forced and not tainted:
+                hit, value = memo.get(key)
+                if hit:
+                    return value, True, True
+            kwargs = dict(inputs)
+            kwargs.update({p: params[p] for p in stage.params})
+            kwargs.update({o: params.get(o) for o in stage.options})
+            value = runners.get(name, stage.fn)(**kwargs)
+            stored = memo is not None and not tainted and (stage.cacheable is None or stage.cacheable(value))
+            if stored:
+                memo.put(key, value, stage.persist)
+            return value, False, stored
+
+        def prepare(name: str) -> tuple[dict[str, Any], bool, bool]:
+            deps = self.stages[name].deps
+            forced = name in refresh or any(d in fresh for d in deps)
+            tainted = any(d in unstored for d in deps)
+            return {d: result.outputs[d] for d in deps}, forced, tainted
+
+        def record(name: str, value: Any, hit: bool, stored: bool, forced: bool, elapsed: float) -> None:
+            if forced and not hit:
+                fresh.add(name)
+            if not stored:
+                unstored.add(name)
+            result.outputs[name] = value
+            (result.reused if hit else result.computed).append(name)
+            result.timings[name] = elapsed
+            if on_stage is not None:
+                on_stage(name, value, hit, elapsed)
+
+        for name in order:
+            if name in given:
+                result.outputs[name] = given[name]
+        pending = [name for name in order if name not in given]
+
+        if workers <= 1:
+            for name in pending:
+                t0 = time.perf_counter()
+                inputs, forced, tainted = prepare(name)
+                value, hit, stored = execute(name, inputs, forced, tainted)
+                record(name, value, hit, stored, forced, time.perf_counter() - t0)
+            return result
+
+        running: dict[Future, tuple[str, bool, float]] = {}
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            while pending or running:
+                for name in [n for n in pending if all(d in result.outputs for d in self.stages[n].deps)]:
+                    pending.remove(name)
+                    inputs, forced, tainted = prepare(name)
+                    running[pool.submit(execute, name, inputs, forced, tainted)] = (name, forced, time.perf_counter())
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name, forced, t0 = running.pop(future)
+                    value, hit, stored = future.result()
+                    record(name, value, hit, stored, forced, time.perf_counter() - t0)
+        return result
+
+
+@dataclass(frozen=True)
+class ReportText:
+    """Informe unificado con pesos validos y la cartera que se ha usado."""
+
+    text: str
+    tickers: list[str]
+    weights: list[float]
+
+
+def _prices(input: Path, cache_dir: str | Path | None = None) -> pd.DataFrame:
+    return load_prices(input, cache_dir)
+
+
+def _metrics(prices: pd.DataFrame) -> pd.DataFrame:
+    return compute_metrics(prices)
+
+
+def _scored(metrics: pd.DataFrame, scoring: ScoringConfig) -> pd.DataFrame:
+    return add_score(metrics, scoring)
+
+
+def _table(ranked: pd.DataFrame, sectors: Path, source_url: str) -> pd.DataFrame:
+    return ranked.join(load_sectors(str(sectors), source_url), how="left")
+
+
+def _charts(prices: pd.DataFrame, ranked: pd.DataFrame, chart_cache_dir: str | Path | None = None) -> dict[str, bytes | None]:
+    return render_chart_bytes(prices, report_chart_specs(ranked), chart_cache_dir)
+
+
+def _sections(
+    table: pd.DataFrame,
+    model: str,
+    timeout_s: int | None = None,
+    use_llm_cache: bool | None = None,
+) -> list[SectionResult]:
+    return generate_sections(table, model, timeout_s or 180, use_llm_cache is not False)
+
+
+def _sections_ok(sections: list[SectionResult]) -> bool:
+    """Solo se memorizan secciones sin errores (un fallo se reintenta en la siguiente ejecucion)."""
+    return all(s.ok for s in sections)
+
+
+def _report(sections: list[SectionResult], ranked: pd.DataFrame) -> ReportText:
+    # Mismos titulos que la CLI y el batch: los de `SUMMARY_SECTIONS`.
+    report = join_sections([(section.title, section.text) for section in sections])
+    report, tickers, weights = adjust_weights_in_report(
+        report,
+        fallback_tickers=ranked.sort_values("rank").head(8).index.tolist(),
+    )
+    return ReportText(report, tickers, weights)
+
+
+def _portfolio_chart(
+    prices: pd.DataFrame,
+    ranked: pd.DataFrame,
+    report: ReportText,
+    chart_cache_dir: str | Path | None = None,
+) -> dict[str, bytes | None]:
+    specs = report_chart_specs(ranked, report.tickers, report.weights)[2:]
+    return render_chart_bytes(prices, specs, chart_cache_dir)
+
+
+REPORT_STAGES = StageGraph(
+    [
+        Stage("prices", _prices, params=("input",), options=("cache_dir",), persist=False),
+        Stage("metrics", _metrics, deps=("prices",)),
+        Stage("scored", _scored, deps=("metrics",), params=("scoring",)),
+        Stage("flags", quality_flags, deps=("prices", "metrics")),
+        Stage("ranked", rank_results, deps=("scored", "flags")),
+        Stage("table", _table, deps=("ranked",), params=("sectors", "source_url")),
+        Stage("charts", _charts, deps=("prices", "ranked"), options=("chart_cache_dir",)),
+        Stage(
+            "sections",
+            _sections,
+            deps=("table",),
+            params=("model",),
+            options=("timeout_s", "use_llm_cache"),
+            cacheable=_sections_ok,
+        ),
+        Stage("report", _report, deps=("sections", "ranked")),
+        Stage("portfolio_chart", _portfolio_chart, deps=("prices", "ranked", "report"), options=("chart_cache_dir",)),
+    ]
+)
+
+
+def report_params(
+    input: str | Path,
+    sectors: str | Path,
+    model: str = "gemini-flash-latest",
+    scoring: ScoringConfig | None = None,
+    source_url: str = DEFAULT_SOURCE_URL,
+    cache_dir: str | Path | None = None,
+    chart_cache_dir: str | Path | None = CHART_CACHE_DIR,
+    timeout_s: int = 180,
+    use_llm_cache: bool = True,
+) -> dict[str, Any]:
+    """Parametros de `REPORT_STAGES` con sus valores por defecto."""
+    return {
+        "input": Path(input),
+        "sectors": Path(sectors),
+        "model": model,
+        "scoring": scoring or ScoringConfig(),
+        "source_url": source_url,
+        "cache_dir": cache_dir,
+        "chart_cache_dir": chart_cache_dir,
+        "timeout_s": timeout_s,
+        "use_llm_cache": use_llm_cache,
+    }
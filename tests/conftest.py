@@ -0,0 +1,21 @@
+"""Fixtures comunes: universos sinteticos reproducibles (`benchmarks/synthetic.py`)."""
+
+from __future__ import annotations
+
+from pathlib import Path
+import sys
+
+import pandas as pd
+import pytest
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+from benchmarks.synthetic import synthetic_prices
+
+
+@pytest.fixture
+def prices() -> pd.DataFrame:
+    """40 tickers x 300 dias con huecos NaN y altas tardias."""
+    return synthetic_prices(40, 300, seed=7)
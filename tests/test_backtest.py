@@ -0,0 +1,49 @@
+"""Backtest: metricas y seleccion en las fechas de rebalanceo (user-005)."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src import metrics
+from src.backtest import rebalance_positions, run_backtest
+from src.config import ScoringConfig
+from src.metrics import _WindowKernel, compute_metrics
+from src.pipeline import quality_flags, rank_results
+from src.scoring import add_score
+
+LOOKBACK = 63
+
+
+@pytest.mark.parametrize("dense", [False, True])
+def test_window_drawdowns_match_sliced_metrics(prices, monkeypatch, dense):
+    if dense:
+        # Fuerza el esquema movil sobre todas las filas.
+        monkeypatch.setattr(metrics, "_DENSE_WINDOWS", 0)
+    ends = rebalance_positions(prices.index, "W", min_row=LOOKBACK - 1)
+    got = _WindowKernel(prices.to_numpy()).drawdowns(ends, LOOKBACK)
+    for k, end in enumerate(ends):
+        expected = compute_metrics(prices.iloc[end - LOOKBACK + 1 : end + 1])["max_drawdown_pct"]
+        np.testing.assert_allclose(got[k], expected.to_numpy(), atol=1e-9, rtol=0)
+
+
+def test_holdings_follow_pipeline_ranking_on_past_window(prices):
+    cfg = ScoringConfig()
+    result = run_backtest(prices, cfg, top_k=5, lookback=LOOKBACK)
+    reb = rebalance_positions(prices.index, "M", min_row=LOOKBACK - 1)
+    assert list(result.holdings.index) == list(prices.index[reb])
+    for end, date in zip(reb, result.holdings.index):
+        window = prices.iloc[end - LOOKBACK + 1 : end + 1]
+        m = compute_metrics(window)
+        ranked = rank_results(add_score(m, cfg), quality_flags(window, m))
+        listed = prices.iloc[: end + 1].ffill().iloc[-1] > 0
+        expected = [t for t in ranked.index if listed[t]][:5]
+        assert list(result.holdings.loc[date]) == expected
+
+
+def test_equity_starts_at_100_and_matches_summary(prices):
+    result = run_backtest(prices, lookback=LOOKBACK)
+    assert result.equity.iloc[0] == pytest.approx(100.0)
+    assert result.summary["total_return_pct"] == pytest.approx(result.equity.iloc[-1] - 100.0)
+    assert result.summary["n_periods"] == len(result.periods)
+    growth = (1.0 + result.periods["return_pct"] / 100.0).prod()
+    assert result.equity.iloc[-1] == pytest.approx(100.0 * growth)
@@ -0,0 +1,60 @@
+"""Modo batch: expansion de entradas y filas de error (user-018)."""
+
+from benchmarks.synthetic import write_universe
+from src import batch
+from src.batch import expand_inputs, run_batch
+
+
+def test_missing_literal_input_is_kept_and_empty_glob_dropped(tmp_path):
+    (tmp_path / "a.xlsx").touch()
+    (tmp_path / "b.xlsx").touch()
+    jobs = expand_inputs([str(tmp_path / "*.xlsx"), str(tmp_path / "falta.xlsx"), str(tmp_path / "*.csv")])
+    assert [job.name for job in jobs] == ["a", "b", "falta"]
+
+
+def test_batch_reports_missing_input_as_error_row(tmp_path):
+    prices_path, sectors_path = write_universe(6, 40, seed=2, out_dir=tmp_path / "data")
+    jobs = expand_inputs([str(prices_path), str(tmp_path / "falta.xlsx")], sectors_path)
+    summary, batch_dir = run_batch(jobs, tmp_path / "outputs", workers=1, llm=False)
+    ok, missing = jobs[0].name, "falta"
+    assert summary.loc[ok, "status"] == "ok"
+    assert summary.loc[ok, "rows"] == 6
+    assert (batch_dir / ok / "metrics_scoring.xlsx").exists()
+    assert summary.loc[missing, "status"] == "error"
+    assert "FileNotFoundError" in summary.loc[missing, "error"]
+    assert (batch_dir / missing / "error.txt").exists()
+
+
+def test_llm_time_comes_from_section_end_times(tmp_path, monkeypatch):
+    # Sin clave, cada seccion termina al instante con un error controlado.
+    monkeypatch.delenv("GEMINI_API_KEY", raising=False)
+    prices_path, sectors_path = write_universe(6, 40, seed=2, out_dir=tmp_path / "data")
+    jobs = expand_inputs([str(prices_path)], sectors_path)
+    summary, batch_dir = run_batch(jobs, tmp_path / "outputs", workers=1, use_cache=False, pdf=False)
+    row = summary.loc[jobs[0].name]
+    assert row["status"] == "ok"
+    assert 0.0 <= row["llm_s"] < 60.0
+    assert row["llm_failed_sections"] == 3
+    assert (batch_dir / jobs[0].name / "informe.md").exists()
+
+
+def test_failing_pdf_only_marks_its_own_job(tmp_path, monkeypatch):
+    monkeypatch.delenv("GEMINI_API_KEY", raising=False)
+    good, sectors = write_universe(6, 40, seed=2, out_dir=tmp_path / "a")
+    bad, _ = write_universe(7, 40, seed=3, out_dir=tmp_path / "b")
+    real_build_pdf = batch.build_pdf
+
+    def build_pdf(summary, df, images):
+        if len(df) == 7:
+            raise RuntimeError("pdf roto")
+        return real_build_pdf(summary, df, images)
+
+    monkeypatch.setattr(batch, "build_pdf", build_pdf)
+    jobs = expand_inputs([str(bad), str(good)], sectors)
+    summary, batch_dir = run_batch(jobs, tmp_path / "outputs", workers=1, use_cache=False)
+    bad_name, good_name = jobs[0].name, jobs[1].name
+    assert summary.loc[bad_name, "status"] == "error"
+    assert "pdf roto" in summary.loc[bad_name, "error"]
+    assert summary.loc[good_name, "status"] == "ok"
+    assert (batch_dir / good_name / "informe.pdf").exists()
+    assert (batch_dir / "batch_summary.csv").exists()
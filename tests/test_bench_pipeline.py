@@ -0,0 +1,25 @@
+"""Suite de benchmarks: lectura a gran escala y casos omitidos (user-024)."""
+
+import pandas as pd
+
+from benchmarks.bench_pipeline import bench_size
+from benchmarks.synthetic import synthetic_prices, write_long_prices
+from src.io_long import read_prices_long
+
+
+def test_long_file_holds_the_synthetic_prices(tmp_path):
+    path = write_long_prices(15, 80, seed=4, out_dir=tmp_path)
+    expected = synthetic_prices(15, 80, seed=4).dropna(how="all")
+    pd.testing.assert_frame_equal(read_prices_long(path), expected, check_freq=False, check_names=False)
+    assert write_long_prices(15, 80, seed=4, out_dir=tmp_path) == path
+
+
+def test_skipped_excel_is_warned_and_reads_are_still_measured(tmp_path, capsys):
+    cases = ["read_prices_excel", "read_prices_long", "load_prices_cached"]
+    rows = bench_size("10x50", 0, 1, 1.0, 0, tmp_path, cases)
+    by_case = {row["case"]: row for row in rows}
+    assert by_case["read_prices_excel"]["seconds"] is None
+    assert "AVISO: read_prices_excel omitido en 10x50" in capsys.readouterr().err
+    assert by_case["read_prices_long"]["seconds"] > 0
+    assert by_case["load_prices_cached"]["seconds"] > 0
+    assert not list(tmp_path.glob("*_prices.xlsx"))
@@ -0,0 +1,51 @@
+"""Bootstrap por bloques: reproducibilidad, intervalos y huecos (user-009)."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.bootstrap import block_bootstrap
+
+METRICS = ("return_pct", "vol_pct", "max_drawdown_pct")
+
+
+def test_same_seed_gives_same_result_for_any_n_jobs(prices):
+    kwargs = dict(n_resamples=64, block_size=10, seed=3, batch_size=16)
+    serial = block_bootstrap(prices, n_jobs=1, **kwargs)
+    parallel = block_bootstrap(prices, n_jobs=2, **kwargs)
+    pd.testing.assert_frame_equal(serial.intervals, parallel.intervals)
+    pd.testing.assert_frame_equal(serial.rank_probabilities, parallel.rank_probabilities)
+    other = block_bootstrap(prices, n_jobs=1, **{**kwargs, "seed": 4})
+    assert not serial.intervals.equals(other.intervals)
+
+
+def test_intervals_contain_the_point_estimate(prices):
+    iv = block_bootstrap(prices, n_resamples=400, seed=1).intervals
+    for name in METRICS:
+        assert (iv[f"{name}_lo"] <= iv[f"{name}_median"]).all()
+        assert (iv[f"{name}_median"] <= iv[f"{name}_hi"]).all()
+        assert ((iv[f"{name}_lo"] <= iv[name]) & (iv[name] <= iv[f"{name}_hi"])).all()
+
+
+def test_rank_probabilities_are_distributions(prices):
+    result = block_bootstrap(prices, n_resamples=50, seed=0, top_k=5)
+    probs = result.rank_probabilities
+    np.testing.assert_allclose(probs.sum(axis=1), 1.0)
+    np.testing.assert_allclose(probs.sum(axis=0), 1.0)
+    np.testing.assert_allclose(result.intervals["top5_prob"], probs.loc[:, 1:5].sum(axis=1))
+
+
+def test_ticker_without_data_gets_nan_intervals(prices):
+    data = prices.assign(VACIO=np.nan)
+    iv = block_bootstrap(data, n_resamples=50, seed=0).intervals
+    assert iv.loc["VACIO", [f"{m}_{s}" for m in METRICS for s in ("lo", "median", "hi")]].isna().all()
+    assert iv.drop(index="VACIO")[[f"{m}_lo" for m in METRICS]].notna().all().all()
+
+
+def test_short_history(prices):
+    with pytest.raises(ValueError):
+        block_bootstrap(prices.iloc[:2], n_resamples=10)
+    # Tres fechas bastan: bloques mas largos que la historia se recortan.
+    short = prices.iloc[:3].dropna(axis=1)
+    iv = block_bootstrap(short, n_resamples=10, block_size=20).intervals
+    assert iv["return_pct_lo"].notna().all() and iv["vol_pct_lo"].notna().all()
@@ -0,0 +1,76 @@
+"""Graficas PNG: cache por contenido y dibujo en pool de procesos (user-019)."""
+
+import os
+
+import pytest
+
+from src import charts
+from src.charts import ChartSpec, chart_key, chart_lines, render_chart_bytes
+
+DPI = 40
+
+
+@pytest.fixture
+def specs(prices):
+    cols = list(prices.columns)
+    return [ChartSpec(f"g{i}.png", f"Grafica {i}", tuple(cols[3 * i : 3 * i + 3])) for i in range(4)]
+
+
+def test_cached_charts_are_not_redrawn(tmp_path, prices, specs, monkeypatch):
+    first = render_chart_bytes(prices, specs[:2], tmp_path, DPI, workers=1)
+    assert all(png.startswith(b"\x89PNG") for png in first.values())
+    assert len(list(tmp_path.glob("*.png"))) == 2
+
+    def fail(*args, **kwargs):
+        raise AssertionError("no deberia redibujar")
+
+    monkeypatch.setattr(charts, "render_png", fail)
+    assert render_chart_bytes(prices, specs[:2], tmp_path, DPI, workers=1) == first
+
+
+def test_key_follows_the_drawn_data(prices, specs):
+    spec = specs[0]
+    key = chart_key(spec, chart_lines(prices, spec))
+    changed = prices.copy()
+    changed.iloc[-1, changed.columns.get_loc(spec.tickers[0])] *= 1.01
+    assert chart_key(spec, chart_lines(changed, spec)) != key
+    # Un ticker que no se dibuja no cambia la clave.
+    other = prices.copy()
+    other[specs[1].tickers[0]] *= 2.0
+    assert chart_key(spec, chart_lines(other, spec)) == key
+
+
+def test_pool_and_inline_give_the_same_pngs(prices, specs, monkeypatch):
+    inline = render_chart_bytes(prices, specs, None, DPI, workers=1)
+    monkeypatch.setattr(charts, "POOL_MIN_CHARTS", 2)
+    try:
+        pooled = render_chart_bytes(prices, specs, None, DPI, workers=2)
+        pool = charts._pool
+        assert pool is not None
+        assert render_chart_bytes(prices, specs, None, DPI, workers=2) == pooled
+        assert charts._pool is pool  # reutilizado entre llamadas
+    finally:
+        charts.shutdown_render_pool()
+    assert pooled == inline
+
+
+def test_few_charts_are_drawn_inline(prices, specs):
+    charts.shutdown_render_pool()
+    render_chart_bytes(prices, specs[: charts.POOL_MIN_CHARTS - 1], None, DPI, workers=4)
+    assert charts._pool is None
+
+
+def test_missing_tickers_give_none(prices):
+    spec = ChartSpec("vacia.png", "Sin datos", ("NOEXISTE.MC",))
+    assert render_chart_bytes(prices, [spec], None) == {"vacia.png": None}
+
+
+def test_cache_evicts_least_recently_used(tmp_path, prices, specs):
+    render_chart_bytes(prices, specs[:3], tmp_path, DPI, workers=1)
+    paths = sorted(tmp_path.glob("*.png"))
+    for i, path in enumerate(paths):
+        os.utime(path, (1e9 + i, 1e9 + i))
+    new = len(render_chart_bytes(prices, specs[3:], None, DPI)["g3.png"])
+    render_chart_bytes(prices, specs[3:], tmp_path, DPI, workers=1, max_bytes=paths[-1].stat().st_size + new)
+    left = sorted(p.name for p in tmp_path.glob("*.png"))
+    assert len(left) == 2 and paths[-1].name in left
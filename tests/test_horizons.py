@@ -0,0 +1,20 @@
+"""Metricas multi-horizonte frente a `compute_metrics` sobre cada tramo (user-003)."""
+
+import pandas as pd
+
+from benchmarks.synthetic import synthetic_prices
+from src.metrics import compute_metrics, compute_metrics_horizons, horizon_bounds
+
+
+def test_each_horizon_matches_sliced_metrics():
+    prices = synthetic_prices(30, 600, seed=3)
+    long = compute_metrics_horizons(prices)
+    bounds = horizon_bounds(prices.index)
+    assert {"1M", "3M", "6M", "YTD", "1Y", "2024", "2025"} <= set(bounds)
+    for name, (start, end) in bounds.items():
+        expected = compute_metrics(prices.iloc[start : end + 1])
+        pd.testing.assert_frame_equal(long.loc[name], expected, check_names=False, atol=1e-9, rtol=0)
+
+
+def test_empty_prices_give_empty_frame():
+    assert compute_metrics_horizons(synthetic_prices(5, 10).iloc[:0]).empty
@@ -0,0 +1,83 @@
+"""Estado incremental frente al calculo completo (user-002)."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.incremental import MetricState, find_latest_state, resume_state
+from src.metrics import compute_metrics
+
+
+def _assert_metrics(state: MetricState, prices: pd.DataFrame) -> None:
+    pd.testing.assert_frame_equal(state.to_metrics(), compute_metrics(prices), check_names=False, atol=1e-9, rtol=0)
+
+
+def test_daily_updates_match_full(prices):
+    state = MetricState.from_prices(prices.iloc[:200])
+    for day in range(200, len(prices), 25):
+        state.update(prices.iloc[day : day + 25])
+    _assert_metrics(state, prices)
+    assert state.digest == MetricState.from_prices(prices).digest
+    pd.testing.assert_series_equal(state.has_na_prices(), prices.isna().any(axis=0), check_names=False)
+
+
+def test_digest_ignores_chunking_and_catches_tiny_revisions(prices):
+    full = MetricState.from_prices(prices)
+    state = MetricState.from_prices(prices.iloc[:1])
+    for day in range(1, len(prices)):
+        state.update(prices.iloc[day : day + 1])
+    assert state.digest == full.digest
+    revised = prices.copy()
+    revised.iloc[3, 5] = np.nextafter(revised.iloc[3, 5], np.inf)
+    assert full.mismatch(revised) is not None
+    filled = prices.copy()
+    filled.iloc[0] = filled.iloc[0].fillna(1.0)
+    assert full.mismatch(filled) is not None
+
+
+def test_save_load_round_trip(prices, tmp_path):
+    state = MetricState.from_prices(prices.iloc[:250], source="precios.xlsx")
+    state.save(tmp_path / "run" / "metrics_state.json")
+    loaded = MetricState.load(tmp_path / "run" / "metrics_state.json")
+    resumed, reason = resume_state(loaded, prices, "precios.xlsx")
+    assert reason is None
+    _assert_metrics(resumed, prices)
+
+
+def test_revised_history_rebuilds(prices):
+    state = MetricState.from_prices(prices.iloc[:250])
+    revised = prices.copy()
+    revised.iloc[10, 0] *= 1.01
+    assert "no coincide" in state.mismatch(revised)
+    resumed, reason = resume_state(state, revised)
+    assert reason is not None
+    _assert_metrics(resumed, revised)
+
+
+def test_file_ending_before_state_rebuilds(prices):
+    state = MetricState.from_prices(prices)
+    shorter = prices.iloc[:250]
+    assert state.mismatch(shorter) is not None
+    resumed, _ = resume_state(state, shorter)
+    _assert_metrics(resumed, shorter)
+
+
+def test_same_file_is_reused_without_new_rows(prices):
+    state = MetricState.from_prices(prices)
+    resumed, reason = resume_state(state, prices)
+    assert reason is None
+    _assert_metrics(resumed, prices)
+
+
+def test_find_latest_state_prefers_same_source(prices, tmp_path):
+    MetricState.from_prices(prices, source="a.xlsx").save(tmp_path / "20250101_000000" / "metrics_state.json")
+    MetricState.from_prices(prices, source="b.xlsx").save(tmp_path / "20250102_000000" / "metrics_state.json")
+    assert find_latest_state(tmp_path, "a.xlsx").parent.name == "20250101_000000"
+    assert find_latest_state(tmp_path).parent.name == "20250102_000000"
+
+
+def test_old_state_version_is_rejected(prices):
+    data = MetricState.from_prices(prices).to_dict()
+    data["version"] = 1
+    with pytest.raises(ValueError):
+        MetricState.from_dict(data)
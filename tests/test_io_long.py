@@ -0,0 +1,55 @@
+"""Lector por bloques de precios en formato largo (user-011)."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.io_long import is_long_format, read_prices_long
+
+
+def _to_long(wide: pd.DataFrame) -> pd.DataFrame:
+    long = wide.rename_axis("Date").reset_index().melt(id_vars="Date", var_name="Ticker", value_name="Close")
+    return long.dropna(subset=["Close"]).sample(frac=1.0, random_state=0)
+
+
+@pytest.mark.parametrize("chunk_rows", [97, 1_000_000])
+def test_long_csv_matches_wide_matrix(prices, tmp_path, chunk_rows):
+    path = tmp_path / "precios.csv"
+    _to_long(prices).to_csv(path, index=False)
+    got = read_prices_long(path, chunk_rows=chunk_rows)
+    expected = prices.dropna(how="all").sort_index(axis=1)
+    assert got.index.name == "Date"
+    pd.testing.assert_frame_equal(got, expected, check_freq=False, check_names=False)
+
+
+def test_intraday_bars_keep_last_valid_price_per_day(tmp_path):
+    bars = pd.DataFrame(
+        {
+            "timestamp": [
+                "2025-01-02 09:00", "2025-01-02 17:30", "2025-01-02 12:00",
+                "2025-01-03 10:00", "2025-01-03 16:00", "2025-01-02 17:30",
+            ],
+            "symbol": ["AAA", "AAA", "AAA", "AAA", "AAA", "BBB"],
+            "price": [10.0, 12.0, 11.0, 13.0, np.nan, 5.0],
+        }
+    )
+    path = tmp_path / "barras.csv"
+    bars.to_csv(path, index=False)
+    got = read_prices_long(path, chunk_rows=2)
+    assert list(got.columns) == ["AAA", "BBB"]
+    assert got.loc["2025-01-02", "AAA"] == 12.0
+    assert got.loc["2025-01-03", "AAA"] == 13.0
+    assert got.loc["2025-01-02", "BBB"] == 5.0
+    assert np.isnan(got.loc["2025-01-03", "BBB"])
+
+
+def test_missing_price_column_is_reported(tmp_path):
+    path = tmp_path / "malo.csv"
+    pd.DataFrame({"date": ["2025-01-02"], "ticker": ["AAA"], "volume": [1]}).to_csv(path, index=False)
+    with pytest.raises(ValueError, match="precio"):
+        read_prices_long(path)
+
+
+def test_is_long_format_by_extension():
+    assert is_long_format("x.csv.gz") and is_long_format("x.parquet")
+    assert not is_long_format("x.xlsx")
@@ -0,0 +1,84 @@
+"""Trabajos en segundo plano: estados, errores y memo compartido (user-022)."""
+
+import threading
+import time
+
+import pandas as pd
+import pytest
+
+from src.jobs import DONE, FAILED, PENDING, RUNNING, JobManager
+from src.stages import report_params
+
+
+@pytest.fixture
+def params(tmp_path, prices, monkeypatch):
+    # Sin clave: las secciones LLM terminan al momento con un error controlado.
+    monkeypatch.delenv("GEMINI_API_KEY", raising=False)
+    path = tmp_path / "precios.csv"
+    prices.rename_axis("Date").reset_index().melt(id_vars="Date", var_name="Ticker", value_name="Close").dropna().to_csv(
+        path, index=False
+    )
+    sectors = tmp_path / "sectores.xlsx"
+    pd.DataFrame({"Ticker": list(prices.columns), "Sector_BMEx": "Banca"}).to_excel(sectors, index=False)
+    return report_params(path, sectors, chart_cache_dir=None, use_llm_cache=False)
+
+
+@pytest.fixture
+def manager():
+    manager = JobManager(max_jobs=1, stage_workers=2)
+    yield manager
+    manager.shutdown()
+
+
+def _wait(manager: JobManager, job_id: str, timeout_s: float = 60.0):
+    deadline = time.monotonic() + timeout_s
+    while time.monotonic() < deadline:
+        view = manager.get(job_id).view()
+        if view.finished:
+            return view
+        time.sleep(0.02)
+    raise TimeoutError(job_id)
+
+
+def test_status_moves_from_pending_to_done(manager, params):
+    release = threading.Event()
+    started = threading.Event()
+
+    def finish(job):
+        started.set()
+        job.add_artifact("nota", "hecho")
+        release.wait(30)
+
+    first = manager.submit(params, finish=finish)
+    second = manager.submit(params)
+    assert started.wait(30)
+    assert manager.get(first).view().status == RUNNING
+    assert manager.get(second).view().status == PENDING  # un solo trabajo a la vez
+    release.set()
+
+    view = _wait(manager, first)
+    assert view.status == DONE and view.error is None
+    assert view.artifacts == {"nota": "hecho"}
+    assert {"prices", "ranked", "sections", "report", "charts"} <= set(view.outputs)
+    assert all(view.partial)  # texto de cada seccion publicado en streaming
+    assert _wait(manager, second).status == DONE
+    assert [job.job_id for job in manager.jobs()] == [second, first]
+
+
+def test_errors_are_captured_in_the_job(manager, params):
+    job_id = manager.submit({**params, "input": params["input"].with_name("falta.csv")})
+    view = _wait(manager, job_id)
+    assert view.status == FAILED
+    assert view.error.startswith("FileNotFoundError") and "falta.csv" in view.error
+    assert "Traceback" in view.error
+
+
+def test_jobs_share_the_stage_memo(manager, params):
+    first = _wait(manager, manager.submit(params))
+    assert not any(reused for reused, _ in first.stages.values())
+    second = _wait(manager, manager.submit(params))
+    reused = {name for name, (hit, _) in second.stages.items() if hit}
+    assert {"prices", "metrics", "ranked", "table", "charts"} <= reused
+    # Las secciones con error no se memorizan: se vuelven a pedir.
+    assert "sections" not in reused
+    pd.testing.assert_frame_equal(second.outputs["ranked"], first.outputs["ranked"])
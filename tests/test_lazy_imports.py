@@ -0,0 +1,42 @@
+"""Arranque perezoso: las dependencias pesadas no se cargan al importar (user-025)."""
+
+import json
+from pathlib import Path
+import subprocess
+import sys
+
+import pytest
+
+from benchmarks.bench_import import HEAVY
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+
+FORBIDDEN = ("google.genai", *HEAVY)
+
+
+def _loaded(code: str) -> set[str]:
+    """Modulos de `FORBIDDEN` cargados tras ejecutar `code` en un interprete nuevo."""
+    probe = f"{code}\nimport json, sys\nprint(json.dumps([m for m in {FORBIDDEN!r} if m in sys.modules]))"
+    proc = subprocess.run([sys.executable, "-c", probe], cwd=REPO_ROOT, capture_output=True, text=True, check=True)
+    return set(json.loads(proc.stdout.strip().splitlines()[-1]))
+
+
+def test_importing_the_cli_loads_nothing_heavy():
+    assert _loaded("import run_pipeline") == set()
+
+
+def test_cli_help_loads_nothing_heavy():
+    code = (
+        "import runpy, sys\n"
+        "sys.argv = ['run_pipeline.py', '--help']\n"
+        "try:\n"
+        "    runpy.run_path('run_pipeline.py', run_name='__main__')\n"
+        "except SystemExit:\n"
+        "    pass"
+    )
+    assert _loaded(code) == set()
+
+
+@pytest.mark.parametrize("module", ["src.stages", "src.jobs", "src.batch", "src.llm_summary"])
+def test_pipeline_modules_defer_heavy_imports(module):
+    assert _loaded(f"import {module}") == set()
@@ -0,0 +1,51 @@
+"""Cache en disco de respuestas del LLM (user-012)."""
+
+import os
+import time
+
+from src.llm_cache import INCOMPLETE_MARKER, UNAVAILABLE_PREFIX, LLMCache
+
+CONFIG = {"temperature": 0.2}
+
+
+def test_round_trip_keyed_by_model_prompt_and_config(tmp_path):
+    cache = LLMCache(tmp_path)
+    key = LLMCache.key("gemini-a", "prompt", CONFIG)
+    assert cache.get(key) is None
+    assert cache.put(key, "texto", model="gemini-a")
+    assert LLMCache(tmp_path).get(key) == "texto"
+    assert key != LLMCache.key("gemini-b", "prompt", CONFIG)
+    assert key != LLMCache.key("gemini-a", "otro prompt", CONFIG)
+    assert key != LLMCache.key("gemini-a", "prompt", {"temperature": 0.3})
+    assert cache.stats() == {"hits": 0, "misses": 1, "writes": 1, "evictions": 0}
+
+
+def test_errors_and_empty_answers_are_not_stored(tmp_path):
+    cache = LLMCache(tmp_path)
+    assert not cache.put("k1", f"{UNAVAILABLE_PREFIX}: timeout")
+    assert not cache.put("k2", "   ")
+    assert not cache.put("k4", f"Texto parcial\n\n[{INCOMPLETE_MARKER}. Error al invocar Gemini: timeout]")
+    assert not LLMCache(tmp_path, enabled=False).put("k3", "texto")
+    assert list(tmp_path.glob("*.json")) == []
+
+
+def test_expired_entries_are_misses(tmp_path):
+    cache = LLMCache(tmp_path, ttl_s=60)
+    cache.put("k", "texto")
+    path = tmp_path / "k.json"
+    old = time.time() - 120
+    path.write_text(path.read_text(encoding="utf-8").replace('"created_at": ', f'"created_at": {old}, "x": '), encoding="utf-8")
+    assert cache.get("k") is None
+    assert not path.exists()
+
+
+def test_lru_eviction_keeps_recently_used(tmp_path):
+    cache = LLMCache(tmp_path, max_bytes=1 << 20)
+    now = time.time()
+    for i in range(3):
+        cache.put(f"k{i}", "x" * 100)
+        os.utime(tmp_path / f"k{i}.json", (now - 300 + i, now - 300 + i))
+    cache.get("k0")  # uso reciente
+    cache.max_bytes = sum((tmp_path / f"k{i}.json").stat().st_size for i in (0, 2))
+    cache.evict()
+    assert sorted(p.stem for p in tmp_path.glob("*.json")) == ["k0", "k2"]
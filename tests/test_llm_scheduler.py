@@ -0,0 +1,110 @@
+"""Planificador LLM contra el servidor local de Gemini: concurrencia, 429 y cuotas (user-016)."""
+
+import threading
+import time
+
+import pytest
+
+from benchmarks.mock_gemini import MockConfig, MockGeminiServer
+from src import llm_summary
+from src.llm_summary import LLMScheduler, RetryPolicy, TokenBucket, generate_section
+
+
+class CountingScheduler(LLMScheduler):
+    """Anota cuantas peticiones HTTP hay en vuelo a la vez."""
+
+    def __init__(self, **kwargs) -> None:
+        super().__init__(**kwargs)
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._count_lock = threading.Lock()
+
+    def post(self, *args, **kwargs):
+        with self._count_lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            return super().post(*args, **kwargs)
+        finally:
+            with self._count_lock:
+                self.in_flight -= 1
+
+
+@pytest.fixture
+def gemini(monkeypatch):
+    """Arranca el mock y devuelve una funcion que instala un planificador de prueba."""
+    servers = []
+
+    def start(config: MockConfig, **kwargs) -> tuple[MockGeminiServer, CountingScheduler]:
+        server = MockGeminiServer(config).start()
+        servers.append(server)
+        monkeypatch.setenv("GEMINI_BASE_URL", server.base_url)
+        monkeypatch.setenv("GEMINI_API_KEY", "mock")
+        # Cuotas holgadas salvo que el test cambie los cubos.
+        scheduler = CountingScheduler(**{"rpm": 1e6, "tpm": 1e9, **kwargs})
+        monkeypatch.setattr(llm_summary, "_scheduler", scheduler)
+        return server, scheduler
+
+    yield start
+    llm_summary.get_llm_scheduler().shutdown()
+    for server in servers:
+        server.stop()
+
+
+def _run(scheduler: LLMScheduler, n: int) -> list:
+    futures = [scheduler.submit(generate_section, f"s{i}", f"prompt {i}", "mock", 10, False) for i in range(n)]
+    return [f.result() for f in futures]
+
+
+def test_concurrency_is_capped(gemini):
+    server, scheduler = gemini(MockConfig(latency_s=0.1, jitter_s=0.0), max_concurrency=2)
+    t0 = time.perf_counter()
+    results = _run(scheduler, 6)
+    assert all(r.ok for r in results)
+    assert scheduler.max_in_flight == 2
+    # 6 peticiones de 0.1 s de dos en dos.
+    assert time.perf_counter() - t0 >= 0.3
+    assert server.stats["requests"] == 6
+
+
+def test_429_is_retried_with_retry_after(gemini):
+    server, scheduler = gemini(
+        MockConfig(latency_s=0.0, jitter_s=0.0, rate_429=0.5, retry_after_s=0.01, seed=1),
+        retry=RetryPolicy(max_retries=20),
+    )
+    results = _run(scheduler, 8)
+    assert all(r.ok for r in results)
+    assert server.stats["throttled"] > 0
+    assert scheduler.stats()["retries"] == server.stats["throttled"]
+    assert server.stats["ok"] == 8
+
+
+def test_exhausted_retries_leave_an_error_section(gemini):
+    server, scheduler = gemini(
+        MockConfig(latency_s=0.0, jitter_s=0.0, rate_429=1.0, retry_after_s=0.0),
+        retry=RetryPolicy(max_retries=2),
+    )
+    (result,) = _run(scheduler, 1)
+    assert not result.ok and "429" in result.error
+    assert server.stats["requests"] == 3
+
+
+def test_rpm_bucket_throttles_bursts(gemini):
+    _, scheduler = gemini(MockConfig(latency_s=0.0, jitter_s=0.0), max_concurrency=6)
+    # Rafaga de 2 peticiones y despues una cada 0.05 s.
+    scheduler.limiter.requests = TokenBucket(2, 20.0)
+    t0 = time.perf_counter()
+    assert all(r.ok for r in _run(scheduler, 6))
+    assert time.perf_counter() - t0 >= 0.15
+    assert scheduler.stats()["throttled_s"] > 0
+
+
+def test_tpm_bucket_throttles_large_prompts(gemini):
+    _, scheduler = gemini(MockConfig(latency_s=0.0, jitter_s=0.0), max_concurrency=6, expected_output_tokens=1000)
+    tokens = scheduler.estimate_tokens("prompt 0")
+    # Caben 2 peticiones de golpe; cada una mas espera ~0.05 s.
+    scheduler.limiter.tokens = TokenBucket(2 * tokens, tokens / 0.05)
+    t0 = time.perf_counter()
+    assert all(r.ok for r in _run(scheduler, 6))
+    assert time.perf_counter() - t0 >= 0.15
+    assert scheduler.stats()["throttled_s"] > 0
@@ -0,0 +1,217 @@
+"""Generacion de secciones LLM con Gemini simulado (user-013, user-014, user-015, user-021)."""
+
+import json
+import threading
+
+import numpy as np
+import pytest
+
+from benchmarks.mock_gemini import MockConfig, MockGeminiServer, canned_text
+from src import llm_summary
+from src.jobs import Job, _streaming_sections
+from src.llm_cache import UNAVAILABLE_PREFIX, LLMCache
+from src.llm_summary import SUMMARY_SECTIONS, LLMScheduler, generate_sections, stream_sections
+from src.metrics import compute_metrics
+from src.stages import _sections_ok
+
+
+def _sse(text: str) -> list[str]:
+    return [f"data: {json.dumps({'candidates': [{'content': {'parts': [{'text': text}]}}]})}", ""]
+
+
+class FakeResponse:
+    """Respuesta SSE: emite `chunks` y, si `fail_after` no es None, falla tras ese numero."""
+
+    def __init__(self, chunks: list[str], fail_after: int | None = None) -> None:
+        self.chunks = chunks
+        self.fail_after = fail_after
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def iter_lines(self, chunk_size=None, decode_unicode=False):
+        for i, chunk in enumerate(self.chunks):
+            if i == self.fail_after:
+                raise ConnectionError("conexion cortada")
+            yield from _sse(chunk)
+
+
+class JsonResponse:
+    """Respuesta de `generateContent` (sin streaming)."""
+
+    def __init__(self, text: str) -> None:
+        self.text = text
+
+    def json(self) -> dict:
+        return {"candidates": [{"content": {"parts": [{"text": self.text}]}}], "usageMetadata": {"totalTokenCount": 7}}
+
+
+class FakeScheduler(LLMScheduler):
+    """Planificador real (cola y pool) con un `post` que no sale a la red."""
+
+    def __init__(self, make_response) -> None:
+        super().__init__(rpm=1e6, tpm=1e9)
+        self.make_response = make_response
+
+    def post(self, url, data, tokens, timeout_s, stream=False, api_key=None):
+        return self.make_response()
+
+
+@pytest.fixture
+def table(prices):
+    return compute_metrics(prices)
+
+
+@pytest.fixture
+def gemini(tmp_path, monkeypatch):
+    """Cache en `tmp_path` y clave falsa; devuelve la cache para inspeccionarla."""
+    cache = LLMCache(tmp_path)
+    monkeypatch.setenv("GEMINI_API_KEY", "test")
+    monkeypatch.setattr(llm_summary, "get_llm_cache", lambda: cache)
+    return cache
+
+
+def test_stream_cut_after_first_chunk_is_not_ok_nor_cached(table, gemini, monkeypatch):
+    scheduler = FakeScheduler(lambda: FakeResponse(["Primer trozo. ", "segundo"], fail_after=1))
+    monkeypatch.setattr(llm_summary, "get_llm_scheduler", lambda: scheduler)
+
+    results = _streaming_sections(Job("j", {}))(table, "mock")
+
+    assert len(results) == len(SUMMARY_SECTIONS)
+    for section in results:
+        assert section.text.startswith("Primer trozo.")
+        assert "Respuesta incompleta" in section.text
+        assert not section.ok and "conexion cortada" in section.error
+    assert not _sections_ok(results)
+    assert list(gemini.cache_dir.glob("*.json")) == []
+
+
+def test_complete_stream_is_ok_and_cached(table, gemini, monkeypatch):
+    scheduler = FakeScheduler(lambda: FakeResponse(["Hola ", "mundo."]))
+    monkeypatch.setattr(llm_summary, "get_llm_scheduler", lambda: scheduler)
+
+    done = [e for e in stream_sections(table, "mock") if e.done]
+
+    assert [e.text for e in done] == ["Hola mundo."] * len(SUMMARY_SECTIONS)
+    assert all(e.usage.error is None for e in done)
+    assert len(list(gemini.cache_dir.glob("*.json"))) == len(SUMMARY_SECTIONS)
+
+
+def test_sections_run_concurrently_and_keep_their_order(table, gemini, monkeypatch):
+    # Cada llamada espera a las demas: solo termina si las tres estan en vuelo a la vez.
+    barrier = threading.Barrier(len(SUMMARY_SECTIONS), timeout=5)
+    calls = []
+
+    def respond():
+        calls.append(threading.get_ident())
+        barrier.wait()
+        return JsonResponse(f"Texto {len(calls)}")
+
+    scheduler = FakeScheduler(respond)
+    monkeypatch.setattr(llm_summary, "get_llm_scheduler", lambda: scheduler)
+
+    results = generate_sections(table, "mock", use_cache=False)
+
+    assert [r.title for r in results] == [title for title, _ in SUMMARY_SECTIONS]
+    assert all(r.ok and r.text.startswith("Texto ") for r in results)
+    assert len(set(calls)) == len(SUMMARY_SECTIONS)
+    assert all(r.usage.total_tokens == 7 for r in results)
+
+
+@pytest.fixture
+def mock_server(monkeypatch):
+    server = MockGeminiServer(MockConfig(latency_s=0.02, jitter_s=0.0, stream_chunks=5)).start()
+    monkeypatch.setenv("GEMINI_BASE_URL", server.base_url)
+    monkeypatch.setenv("GEMINI_API_KEY", "mock")
+    scheduler = LLMScheduler(rpm=1e6, tpm=1e9)
+    monkeypatch.setattr(llm_summary, "_scheduler", scheduler)
+    yield server
+    scheduler.shutdown()
+    server.stop()
+
+
+def test_sse_chunks_assemble_the_full_answer(table, mock_server):
+    events = list(stream_sections(table, "mock", use_cache=False))
+    done = {e.index: e for e in events if e.done}
+    for index, (title, build) in enumerate(SUMMARY_SECTIONS):
+        chunks = [e.chunk for e in events if e.index == index and not e.done]
+        expected = canned_text(build(table))
+        assert len(chunks) == 5
+        assert "".join(chunks) == expected
+        assert done[index].text == expected and done[index].title == title
+        assert done[index].usage.error is None
+        assert done[index].usage.output_tokens == len(expected) // 4
+    # Mismo texto que sin streaming.
+    assert [r.text for r in generate_sections(table, "mock", use_cache=False)] == [done[i].text for i in sorted(done)]
+
+
+def test_job_records_first_chunk_time_and_partial_text(table, mock_server):
+    job = Job("j", {})
+    results = _streaming_sections(job)(table, "mock", use_llm_cache=False)
+    for index, result in enumerate(results):
+        assert result.ok
+        assert 0.0 < result.first_chunk_s < result.elapsed_s
+        assert job.partial[index].strip() == result.text
+
+
+def test_sse_parser_joins_multiline_events_and_a_trailing_event(table, gemini, monkeypatch):
+    first = {"candidates": [{"content": {"parts": [{"text": "Uno, "}, {"text": "dos"}]}}]}
+    last = {"candidates": [{"content": {"parts": [{"text": " y tres."}]}}], "usageMetadata": {"candidatesTokenCount": 3}}
+    # Un evento en varias lineas "data:" (se unen con salto de linea) y el ultimo sin linea vacia.
+    lines = [": comentario", *("data: " + line for line in json.dumps(first, indent=1).splitlines()), "", "data: " + json.dumps(last)]
+
+    class Lines(FakeResponse):
+        def iter_lines(self, chunk_size=None, decode_unicode=False):
+            yield from lines
+
+    scheduler = FakeScheduler(lambda: Lines([]))
+    monkeypatch.setattr(llm_summary, "get_llm_scheduler", lambda: scheduler)
+    usage = llm_summary.LLMUsage()
+    assert list(llm_summary._gemini_stream("p", "mock", usage=usage)) == ["Uno, dos", " y tres."]
+    assert usage.error is None and usage.output_tokens == 3
+
+
+def test_stream_error_before_any_chunk_is_unavailable(table, gemini, monkeypatch):
+    scheduler = FakeScheduler(lambda: FakeResponse(["nunca"], fail_after=0))
+    monkeypatch.setattr(llm_summary, "get_llm_scheduler", lambda: scheduler)
+    done = [e for e in stream_sections(table, "mock") if e.done]
+    assert all(e.text.startswith(UNAVAILABLE_PREFIX) and e.usage.error for e in done)
+    assert list(gemini.cache_dir.glob("*.json")) == []
+
+
+def _prompt_table(prompt: str) -> list[list[str]]:
+    body = prompt.split("Tabla completa (separador |, metricas en %):\n", 1)[1]
+    return [line.split("|") for line in body.strip().splitlines()]
+
+
+@pytest.mark.parametrize("build", [build for _, build in SUMMARY_SECTIONS])
+def test_compact_table_keeps_every_row_and_value(table, build):
+    df = table.assign(sector="Banca", score=table["return_pct"] / 10.0)
+    df.loc[df.index[0], "sector"] = "Energia | Gas"
+    df.loc[df.index[1], "vol_pct"] = float("nan")
+    rows = _prompt_table(build(df))
+    header, body = rows[0], rows[1:]
+    assert header[0] == "ticker"
+    assert [r[0] for r in body] == [str(t) for t in df.index]
+    for col in header[1:]:
+        got = [r[header.index(col)] for r in body]
+        if col == "sector":
+            assert got[0] == "Energia / Gas" and set(got[1:]) == {"Banca"}
+            continue
+        values = df[col].to_numpy()
+        for text, value in zip(got, values):
+            if np.isnan(value):
+                assert text == "NA"
+            else:
+                assert float(text) == pytest.approx(round(value, 2), abs=1e-9)
+
+
+def test_analysis_prompt_lists_top_and_bottom_tickers(table):
+    prompt = llm_summary.build_analysis_prompt(table)
+    top = table.sort_values("return_pct", ascending=False).index[:5]
+    bottom = table.sort_values("return_pct").index[:5]
+    assert f"Top 5 por rentabilidad: {', '.join(top)}\n" in prompt
+    assert f"Bottom 5 por rentabilidad: {', '.join(bottom)}\n" in prompt
@@ -0,0 +1,31 @@
+"""Motor vectorizado de metricas frente al bucle por ticker (user-001)."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.metrics import compute_metrics, compute_metrics_loop
+
+
+def _assert_same(prices: pd.DataFrame) -> None:
+    fast = compute_metrics(prices)
+    slow = compute_metrics_loop(prices) if len(prices.columns) else fast
+    pd.testing.assert_frame_equal(fast, slow, check_names=False, atol=1e-9, rtol=0)
+
+
+def test_matches_loop(prices):
+    _assert_same(prices)
+
+
+@pytest.mark.parametrize("n_rows", [0, 1])
+def test_empty_and_single_row(prices, n_rows):
+    sliced = prices.iloc[:n_rows]
+    _assert_same(sliced)
+    assert compute_metrics(sliced).isna().all().all()
+
+
+def test_all_nan_column(prices):
+    prices = prices.copy()
+    prices.iloc[:, 3] = np.nan
+    _assert_same(prices)
+    assert compute_metrics(prices).iloc[3].isna().all()
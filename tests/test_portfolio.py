@@ -0,0 +1,51 @@
+"""Analitica de carteras: serie, metricas y reparto del riesgo (user-008)."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.metrics import max_drawdown_pct
+from src.portfolio import PortfolioAnalytics
+
+TICKERS = ["S0000.MC", "S0003.MC", "S0005.MC", "S0011.MC"]
+WEIGHTS = [0.4, 0.3, 0.2, 0.1]
+
+
+@pytest.fixture
+def analytics(prices):
+    return PortfolioAnalytics(prices, TICKERS)
+
+
+def test_evaluate_matches_portfolio_series(analytics):
+    series = analytics.series(WEIGHTS)
+    got = analytics.evaluate(WEIGHTS).iloc[0]
+    simple = series.pct_change().dropna()
+    assert got["return_pct"] == pytest.approx(series.iloc[-1] / series.iloc[0] * 100.0 - 100.0)
+    assert got["vol_pct"] == pytest.approx(simple.std(ddof=1) * np.sqrt(252) * 100.0)
+    assert got["max_drawdown_pct"] == pytest.approx(max_drawdown_pct(series))
+
+
+def test_risk_contributions_add_up_to_evaluated_vol(analytics):
+    vol = analytics.evaluate(WEIGHTS)["vol_pct"].iloc[0]
+    risk = analytics.risk_contributions(WEIGHTS)
+    assert risk["vol_contribution_pct"].sum() == pytest.approx(vol)
+    assert risk["risk_contribution_pct"].sum() == pytest.approx(100.0)
+    np.testing.assert_allclose(risk["weight_pct"], np.array(WEIGHTS) * 100.0)
+
+
+def test_missing_tickers_are_dropped_and_weights_renormalized(prices, analytics):
+    weights = dict(zip(TICKERS + ["NOEXISTE.MC"], WEIGHTS + [0.5]))
+    subset = PortfolioAnalytics(prices, list(weights))
+    assert subset.tickers == TICKERS
+    pd.testing.assert_frame_equal(subset.evaluate(weights), analytics.evaluate(WEIGHTS))
+    assert subset.risk_contributions(weights)["weight_pct"].sum() == pytest.approx(100.0)
+
+
+def test_many_portfolios_evaluate_in_one_call(analytics):
+    rng = np.random.default_rng(0)
+    w = rng.random((7, len(TICKERS)))
+    batch = analytics.evaluate(w)
+    for k in range(len(w)):
+        pd.testing.assert_frame_equal(
+            batch.iloc[[k]].reset_index(drop=True), analytics.evaluate(w[k]), check_exact=False
+        )
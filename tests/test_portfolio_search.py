@@ -0,0 +1,54 @@
+"""Busqueda exhaustiva de carteras equiponderadas (user-007)."""
+
+import numpy as np
+import pytest
+
+from src.portfolio import PortfolioAnalytics
+from src.portfolio_search import search_equal_weight_portfolios
+
+K = 5
+
+
+@pytest.fixture
+def universe(prices):
+    return prices.iloc[:, :12]
+
+
+@pytest.fixture
+def portfolios(universe):
+    return search_equal_weight_portfolios(universe, k=K, efficient_only=False)
+
+
+def _dominated_by_any(row, others) -> bool:
+    weakly = (
+        (others["return_pct"] >= row["return_pct"])
+        & (others["vol_pct"] <= row["vol_pct"])
+        & (others["max_drawdown_pct"] >= row["max_drawdown_pct"])
+    )
+    strictly = (
+        (others["return_pct"] > row["return_pct"])
+        | (others["vol_pct"] < row["vol_pct"])
+        | (others["max_drawdown_pct"] > row["max_drawdown_pct"])
+    )
+    return bool((weakly & strictly).any())
+
+
+def test_frontier_is_exactly_the_non_dominated_set(portfolios):
+    assert portfolios["efficient"].any()
+    for _, row in portfolios.iterrows():
+        assert row["efficient"] == (not _dominated_by_any(row, portfolios))
+
+
+def test_metrics_match_portfolio_analytics(universe, portfolios):
+    for _, row in portfolios.sample(5, random_state=0).iterrows():
+        tickers = row["tickers"].split(", ")
+        expected = PortfolioAnalytics(universe, tickers, align="pad").evaluate([1.0 / K] * K).iloc[0]
+        for col in ("return_pct", "vol_pct", "max_drawdown_pct"):
+            assert row[col] == pytest.approx(expected[col], rel=1e-9, abs=1e-9)
+
+
+def test_efficient_only_returns_the_frontier_sorted_by_score(universe, portfolios):
+    frontier = search_equal_weight_portfolios(universe, k=K)
+    assert len(frontier) == portfolios["efficient"].sum()
+    assert frontier["efficient"].all()
+    assert np.all(np.diff(frontier["score"].to_numpy()) <= 0)
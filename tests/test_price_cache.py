@@ -0,0 +1,89 @@
+"""Cache en disco de la matriz de precios (user-010)."""
+
+import shutil
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmarks.synthetic import write_universe
+from src.io_excel import read_prices_excel
+from src.price_cache import load_prices_cached
+
+
+def _no_parse(path):
+    raise AssertionError("deberia servirse desde la cache")
+
+
+# Mismo nombre que el lector real: la clave de cache incluye `reader.__name__`.
+_no_parse.__name__ = "read_prices_excel"
+
+
+def test_cached_read_matches_excel_and_survives_renames(tmp_path):
+    prices_path, _ = write_universe(12, 60, seed=3, out_dir=tmp_path / "data")
+    cache_dir = tmp_path / "cache"
+    expected = read_prices_excel(prices_path)
+
+    first = load_prices_cached(prices_path, cache_dir)
+    pd.testing.assert_frame_equal(first, expected)
+    assert len(list(cache_dir.iterdir())) == 1
+
+    # Mismo contenido con otro nombre: se sirve desde la cache sin parsear.
+    copy = tmp_path / "copia.xlsx"
+    shutil.copy(prices_path, copy)
+    for mmap in (True, False):
+        pd.testing.assert_frame_equal(load_prices_cached(copy, cache_dir, mmap=mmap, reader=_no_parse), expected)
+    assert len(list(cache_dir.iterdir())) == 1
+
+
+def test_corrupt_entry_is_rebuilt(tmp_path):
+    prices_path, _ = write_universe(5, 30, seed=1, out_dir=tmp_path / "data")
+    cache_dir = tmp_path / "cache"
+    load_prices_cached(prices_path, cache_dir)
+    (entry,) = cache_dir.iterdir()
+    (entry / "values.npy").write_bytes(b"roto")
+    pd.testing.assert_frame_equal(load_prices_cached(prices_path, cache_dir), read_prices_excel(prices_path))
+
+
+def test_eviction_keeps_total_under_budget(tmp_path):
+    cache_dir = tmp_path / "cache"
+    paths = [write_universe(8, 40, seed=s, out_dir=tmp_path / "data")[0] for s in range(3)]
+    for path in paths:
+        load_prices_cached(path, cache_dir, max_bytes=1)
+    # Solo sobrevive la ultima entrada escrita (la que se acaba de usar).
+    assert len(list(cache_dir.iterdir())) == 1
+
+
+def _frame_reader(frame):
+    def read_prices_excel(path):
+        return frame.copy()
+
+    return read_prices_excel
+
+
+@pytest.mark.parametrize(
+    "columns",
+    [
+        pd.DatetimeIndex(["2024-01-31", "2024-02-29", "2024-03-29"], name="fecha"),
+        pd.Index(np.array([101, 202, 303], dtype=np.int64)),
+    ],
+)
+def test_non_string_labels_round_trip(tmp_path, columns):
+    index = pd.DatetimeIndex(["2025-01-02", "2025-01-03", "2025-01-06", "2025-01-07"], name="Date")
+    frame = pd.DataFrame(np.arange(12, dtype=float).reshape(4, 3), index=index, columns=columns)
+    path = tmp_path / "precios.bin"
+    path.write_bytes(b"x")
+    cache_dir = tmp_path / "cache"
+    pd.testing.assert_frame_equal(load_prices_cached(path, cache_dir, reader=_frame_reader(frame)), frame)
+    pd.testing.assert_frame_equal(load_prices_cached(path, cache_dir, reader=_no_parse), frame)
+
+
+def test_unrestorable_labels_skip_the_cache_with_a_warning(tmp_path):
+    # Etiquetas mixtas (texto y Timestamp): el texto no devolveria el tipo original.
+    frame = pd.DataFrame([[1.0, 2.0]], index=pd.DatetimeIndex(["2025-01-02"]), columns=["A.MC", pd.Timestamp("2024-01-31")])
+    path = tmp_path / "precios.bin"
+    path.write_bytes(b"x")
+    with pytest.warns(UserWarning, match="Precios sin cache"):
+        got = load_prices_cached(path, tmp_path / "cache", reader=_frame_reader(frame))
+    pd.testing.assert_frame_equal(got, frame)
+    assert not (tmp_path / "cache").exists()
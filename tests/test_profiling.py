@@ -0,0 +1,49 @@
+"""Perfil por etapa: memoria Python relativa y limpieza de tracemalloc (user-023)."""
+
+import json
+import tracemalloc
+
+import numpy as np
+
+from src.profiling import RunProfiler
+
+
+def test_python_peak_is_relative_to_stage_start(tmp_path):
+    profiler = RunProfiler(trace_memory=True)
+    ballast = np.ones(4_000_000)  # 32 MB vivos antes de las etapas
+    with profiler.stage("grande"):
+        tmp = np.ones(1_000_000)  # pico de ~8 MB dentro de la etapa
+        del tmp
+    with profiler.stage("vacia"):
+        pass
+    del ballast
+    grande, vacia = profiler.stages
+    assert 7_000_000 < grande.python_peak_bytes < 12_000_000
+    assert vacia.python_peak_bytes < 1_000_000
+    assert grande.process_peak_rss_bytes is None or grande.process_peak_rss_bytes > 0
+
+    path = profiler.write(tmp_path)
+    assert not tracemalloc.is_tracing()
+    stages = json.loads(path.read_text(encoding="utf-8"))["stages"]
+    assert [s["name"] for s in stages] == ["grande", "vacia"]
+    assert "process_peak_rss_bytes" in stages[0] and "peak_rss_bytes" not in stages[0]
+
+
+def test_tracing_started_elsewhere_is_left_running(tmp_path):
+    tracemalloc.start()
+    try:
+        profiler = RunProfiler(trace_memory=True)
+        with profiler.stage("etapa"):
+            pass
+        profiler.write(tmp_path)
+        assert tracemalloc.is_tracing()
+    finally:
+        tracemalloc.stop()
+
+
+def test_without_trace_memory_python_peak_is_not_measured(tmp_path):
+    profiler = RunProfiler()
+    with profiler.stage("etapa"):
+        pass
+    assert profiler.stages[0].python_peak_bytes is None
+    profiler.write(tmp_path)
@@ -0,0 +1,64 @@
+"""PDF en memoria con graficas vectoriales (user-020)."""
+
+import numpy as np
+import pytest
+
+from src import reporting
+from src.charts import ChartSpec, chart_lines, render_chart_bytes
+from src.metrics import compute_metrics
+from src.pipeline import rank_prices
+from src.reporting import build_pdf, report_chart_drawings
+
+SUMMARY = "## Analisis general\n\nTexto **en negrita**.\n\n- punto uno\n- punto dos\n"
+
+
+@pytest.fixture
+def ranked(prices):
+    return rank_prices(prices)
+
+
+@pytest.fixture
+def specs(prices):
+    cols = list(prices.columns)
+    return [
+        ChartSpec("top.png", "Top", tuple(cols[:5])),
+        ChartSpec("cartera.png", "Cartera", tuple(cols[:3]), (0.5, 0.3, 0.2)),
+        ChartSpec("vacia.png", "Vacia", ("NOEXISTE.MC",)),
+    ]
+
+
+def test_drawings_plot_the_same_series_as_the_png_charts(prices, specs):
+    drawings = report_chart_drawings(prices, specs)
+    assert [title for title, _ in drawings] == [spec.title for spec in specs]
+    assert drawings[2][1] is None
+    for spec, (_, drawing) in zip(specs[:2], drawings):
+        lines = chart_lines(prices, spec)
+        (plot,) = [c for c in drawing.contents if c.__class__.__name__ == "LinePlot"]
+        assert len(plot.data) == len(lines)
+        for (_, _, values), points in zip(lines, plot.data):
+            assert len(points) <= reporting.MAX_CHART_POINTS + 1
+            assert points[0][1] == pytest.approx(values[0])
+            assert points[-1][1] == pytest.approx(values[-1])
+
+
+def test_long_series_are_thinned_keeping_the_last_point():
+    x = np.arange(5000, dtype=float)
+    points = reporting._thin(x, x * 2.0)
+    assert len(points) <= reporting.MAX_CHART_POINTS + 1
+    assert points[0] == (0.0, 0.0) and points[-1] == (4999.0, 9998.0)
+
+
+def test_vector_pdf_has_no_embedded_images_and_is_smaller(prices, ranked, specs):
+    vector = build_pdf(SUMMARY, ranked, report_chart_drawings(prices, specs))
+    pngs = render_chart_bytes(prices, specs, None, dpi=100, workers=1)
+    raster = build_pdf(SUMMARY, ranked, [(spec.title, pngs[spec.filename]) for spec in specs])
+    assert vector.startswith(b"%PDF") and raster.startswith(b"%PDF")
+    assert b"/Subtype /Image" not in vector
+    assert b"/Subtype /Image" in raster
+    assert len(vector) < len(raster)
+
+
+def test_pdf_survives_missing_charts_and_columns(prices):
+    table = compute_metrics(prices).assign(rank=range(1, prices.shape[1] + 1))
+    data = build_pdf(SUMMARY, table, [("Sin datos", None), ("Ruta rota", "no/existe.png")])
+    assert data.startswith(b"%PDF") and data.rstrip().endswith(b"%%EOF")
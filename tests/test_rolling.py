@@ -0,0 +1,56 @@
+"""Metricas moviles, score por fecha y ranking matricial (user-004)."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.config import ScoringConfig
+from src.metrics import compute_metrics, rolling_metrics
+from src.pipeline import quality_flags, rank_results
+from src.scoring import add_score, add_score_panel, rank_order_matrix
+
+WINDOW = 63
+
+
+@pytest.fixture
+def panel(prices):
+    return rolling_metrics(prices, WINDOW)
+
+
+def test_rolling_matches_sliced_windows(prices, panel):
+    assert panel["return_pct"].iloc[: WINDOW - 1].isna().all().all()
+    for end in range(WINDOW - 1, len(prices), 17):
+        expected = compute_metrics(prices.iloc[end - WINDOW + 1 : end + 1])
+        got = pd.DataFrame({name: frame.iloc[end] for name, frame in panel.items()})
+        pd.testing.assert_frame_equal(got, expected, check_names=False, atol=1e-9, rtol=0)
+
+
+def test_rolling_rejects_tiny_window(prices):
+    with pytest.raises(ValueError):
+        rolling_metrics(prices, 1)
+
+
+def test_score_panel_matches_add_score_per_date(panel):
+    cfg = ScoringConfig()
+    scores = add_score_panel(panel, cfg)
+    for date in scores.index[WINDOW - 1 :: 29]:
+        metrics = pd.DataFrame({name: frame.loc[date] for name, frame in panel.items()})
+        expected = add_score(metrics, cfg)["score"]
+        np.testing.assert_array_equal(scores.loc[date].to_numpy(), expected.to_numpy())
+
+
+def test_month_end_panel_keeps_last_day_of_each_month(panel):
+    scores = add_score_panel(panel, ScoringConfig(), month_end=True)
+    assert scores.index.to_period("M").is_unique
+    assert scores.index[-1] == panel["return_pct"].index[-1]
+
+
+def test_rank_order_matrix_matches_pipeline_ranking(prices, panel):
+    cfg = ScoringConfig()
+    scores = add_score_panel(panel, cfg)
+    ret, vol, dd = (panel[k].to_numpy() for k in ("return_pct", "vol_pct", "max_drawdown_pct"))
+    order = rank_order_matrix(scores.to_numpy(), ret, vol, dd)
+    for row in range(WINDOW - 1, len(prices), 23):
+        metrics = pd.DataFrame({name: frame.iloc[row] for name, frame in panel.items()})
+        ranked = rank_results(add_score(metrics, cfg), quality_flags(prices, metrics))
+        assert list(prices.columns[order[row]]) == list(ranked.index)
@@ -0,0 +1,86 @@
+"""Sensibilidad del ranking: barrido de configuraciones y tau de Kendall (user-006)."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.config import ScoringConfig
+from src.metrics import compute_metrics
+from src.pipeline import quality_flags, rank_results
+from src.scoring import add_score
+from src.sensitivity import kendall_tau, random_configs, rank_stability, sweep_scores
+
+
+def _tau_pairs(a: np.ndarray, b: np.ndarray) -> float:
+    """Referencia O(n^2): concordantes menos discordantes sobre todos los pares."""
+    i, j = np.triu_indices(len(a), k=1)
+    s = np.sign(a[i] - a[j]) * np.sign(b[i] - b[j])
+    return float(s.sum() / len(i))
+
+
+@pytest.mark.parametrize("n", [2, 3, 8, 35, 257])
+def test_kendall_tau_matches_pairwise_reference(n):
+    rng = np.random.default_rng(n)
+    base = rng.permutation(n) + 1
+    ranks = np.array([rng.permutation(n) + 1 for _ in range(20)] + [base, n + 1 - base])
+    got = kendall_tau(ranks, base, max_cells=64)
+    expected = [_tau_pairs(r, base) for r in ranks]
+    np.testing.assert_allclose(got, expected, atol=1e-12)
+    assert got[-2] == 1.0 and got[-1] == -1.0
+
+
+def test_kendall_tau_single_ticker_is_nan():
+    assert np.isnan(kendall_tau(np.array([[1], [1]]), np.array([1]))).all()
+
+
+def test_sweep_matches_pipeline_ranking(prices):
+    metrics = compute_metrics(prices)
+    configs = random_configs(5, seed=3)
+    scores, ranks = sweep_scores(metrics, configs)
+    flags = quality_flags(prices, metrics)
+    for cfg, score_row, rank_row in zip(configs, scores, ranks):
+        ranked = rank_results(add_score(metrics, cfg), flags)
+        np.testing.assert_array_equal(score_row, ranked.loc[metrics.index, "score"].to_numpy())
+        np.testing.assert_array_equal(rank_row, ranked.loc[metrics.index, "rank"].to_numpy())
+
+
+def test_baseline_config_has_unit_tau(prices):
+    metrics = compute_metrics(prices)
+    _, tau = rank_stability(metrics, [ScoringConfig()] + random_configs(3))
+    assert tau.iloc[0] == 1.0
+    assert ((tau >= -1.0) & (tau <= 1.0)).all()
+
+
+def test_chunked_sweep_matches_single_block(prices):
+    metrics = compute_metrics(prices)
+    configs = random_configs(23, seed=5)
+    scores, ranks = sweep_scores(metrics, configs)
+    small_scores, small_ranks = sweep_scores(metrics, configs, max_cells=3 * len(metrics))
+    np.testing.assert_array_equal(small_scores, scores)
+    np.testing.assert_array_equal(small_ranks, ranks)
+
+    table, tau = rank_stability(metrics, configs)
+    chunked, chunked_tau = rank_stability(metrics, configs, max_cells=3 * len(metrics))
+    pd.testing.assert_frame_equal(chunked, table)
+    pd.testing.assert_series_equal(chunked_tau, tau)
+    np.testing.assert_allclose(table.loc[metrics.index, "rank_std"], ranks.std(axis=0))
+    np.testing.assert_allclose(table.loc[metrics.index, "score_mean"], scores.mean(axis=0))
+    np.testing.assert_array_equal(table.loc[metrics.index, "rank_min"], ranks.min(axis=0))
+
+
+def test_cli_grid_includes_hardstops(prices, tmp_path, monkeypatch):
+    import run_pipeline
+
+    path = tmp_path / "precios.csv"
+    prices.rename_axis("Date").reset_index().melt(id_vars="Date", var_name="Ticker", value_name="Close").dropna().to_csv(
+        path, index=False
+    )
+    output = tmp_path / "sens.xlsx"
+    argv = ["run_pipeline.py", "sweep", "--input", str(path), "--output", str(output), "--no-cache",
+            "--hardstop-return-lt", "-5", "0", "--hardstop-vol-gt", "40", "50", "60"]
+    monkeypatch.setattr("sys.argv", argv)
+    run_pipeline.main()
+    configs = pd.read_excel(output, sheet_name="configs")
+    assert len(configs) == 6
+    assert sorted(set(configs["hardstop_return_lt"])) == [-5.0, 0.0]
+    assert sorted(set(configs["hardstop_vol_gt"])) == [40.0, 50.0, 60.0]
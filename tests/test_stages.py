@@ -0,0 +1,78 @@
+"""Grafo de etapas: memo en disco y titulos del informe (user-021)."""
+
+import os
+
+import pandas as pd
+
+from src.llm_summary import SUMMARY_SECTIONS, SectionResult
+from src.stages import REPORT_STAGES, DiskStageMemo, report_params
+
+
+def _params(tmp_path, prices):
+    path = tmp_path / "precios.csv"
+    prices.rename_axis("Date").reset_index().melt(id_vars="Date", var_name="Ticker", value_name="Close").dropna().to_csv(
+        path, index=False
+    )
+    sectors = tmp_path / "sectores.xlsx"
+    pd.DataFrame({"Ticker": list(prices.columns), "Sector_BMEx": "Banca"}).to_excel(sectors, index=False)
+    return report_params(path, sectors, cache_dir=tmp_path / "prices", chart_cache_dir=None)
+
+
+def test_disk_memo_survives_new_instances(tmp_path, prices):
+    params = _params(tmp_path, prices)
+    first = REPORT_STAGES.run(params, ["ranked"], DiskStageMemo(tmp_path / "memo"))
+    assert first.reused == []
+    again = REPORT_STAGES.run(params, ["ranked"], DiskStageMemo(tmp_path / "memo"))
+    # Los precios no van al memo de disco: se releen de la cache de precios.
+    assert again.computed == ["prices"]
+    pd.testing.assert_frame_equal(again["ranked"], first["ranked"])
+    pd.testing.assert_frame_equal(again["prices"], first["prices"])
+    assert not (tmp_path / "memo" / f"{first.keys['prices']}.pkl").exists()
+    assert (tmp_path / "memo" / f"{first.keys['ranked']}.pkl").exists()
+
+
+def test_disk_memo_skips_corrupt_and_expired_entries(tmp_path):
+    memo = DiskStageMemo(tmp_path, ttl_s=60)
+    memo.put("a", {"x": 1})
+    memo.put("b", [1, 2])
+    (tmp_path / "a.pkl").write_bytes(b"roto")
+    os.utime(tmp_path / "b.pkl", (0, 0))
+    fresh = DiskStageMemo(tmp_path, ttl_s=60)
+    assert fresh.get("a") == (False, None)
+    assert fresh.get("b") == (False, None)
+    assert not (tmp_path / "a.pkl").exists() and not (tmp_path / "b.pkl").exists()
+    assert fresh.misses == 2
+
+
+def test_disk_memo_evicts_least_recently_used(tmp_path):
+    memo = DiskStageMemo(tmp_path, ttl_s=float("inf"))
+    for i, key in enumerate("abc"):
+        memo.put(key, "x" * 1000)
+        os.utime(tmp_path / f"{key}.pkl", (1e9 + i, 1e9 + i))
+    memo.max_bytes = 2 * (tmp_path / "a.pkl").stat().st_size
+    memo.put("d", "x" * 1000)
+    assert sorted(p.stem for p in tmp_path.glob("*.pkl")) == ["c", "d"]
+
+
+def test_report_uses_summary_section_titles(prices):
+    sections = [SectionResult(title, f"Texto de {title}.", 0.0) for title, _ in SUMMARY_SECTIONS]
+    ranked = pd.DataFrame({"rank": range(1, 4)}, index=["A.MC", "B.MC", "C.MC"])
+    report = REPORT_STAGES.stages["report"].fn(sections=sections, ranked=ranked)
+    headings = [line[3:] for line in report.text.splitlines() if line.startswith("## ")]
+    assert headings[: len(SUMMARY_SECTIONS)] == [title for title, _ in SUMMARY_SECTIONS]
+
+
+def test_cli_report_lists_the_prices_stage(tmp_path, prices, monkeypatch, capsys):
+    import run_pipeline
+
+    params = _params(tmp_path, prices)
+    monkeypatch.delenv("GEMINI_API_KEY", raising=False)
+    monkeypatch.setattr("sys.argv", [
+        "run_pipeline.py", "--input", str(params["input"]), "--sectors", str(tmp_path / "sectores.xlsx"),
+        "--output", str(tmp_path / "out.xlsx"), "--summary-out", str(tmp_path / "resumen.txt"),
+        "--outputs-dir", str(tmp_path / "runs"), "--cache-dir", str(tmp_path / "prices"), "--no-stage-cache",
+        "--no-llm-cache",
+    ])
+    run_pipeline.main()
+    (line,) = [l for l in capsys.readouterr().out.splitlines() if l.startswith("Etapas:")]
+    assert [part.split()[0] for part in line[len("Etapas: "):].split(", ")][:2] == ["prices", "metrics"]